@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""性能基准：在 offscreen Qt 平台下无界面运行，记录各操作的耗时与内存峰值。
+
+合成比赛覆盖到输入框上限（n 最多 9999，m+w 约 2 万，前三、前五、前八与加权团体规则混合），
+结果与 baseline.json 比较，任何一项超出容差即以非零状态退出：
+
+    python benchmarks/bench_scoring.py                    # 全部规模，与基线比较
+    python benchmarks/bench_scoring.py --sizes small      # 只跑小规模
+    python benchmarks/bench_scoring.py --update-baseline  # 以本次结果覆盖基线
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from scoring_engine import ScoringEngine, MAX_PLACES  # noqa: E402
+from scoring_rules import RULE_TOP3, RULE_TOP5, RuleBook, RuleSet  # noqa: E402
+from scoring_io import import_results, save_competition, load_competition  # noqa: E402
+from scoring_journal import Journal  # noqa: E402
+from scoring_aggregate import aggregate, make_shards  # noqa: E402
+from scoring_medals import medal_table  # noqa: E402
+from scoring_export import export  # noqa: E402
+from scoring_leaderboard import Leaderboard  # noqa: E402
+from scoring_project import build_problem, run_projection  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# 规模：(国家数 n, 男子项目数 m, 女子项目数 w)
+SIZES: Dict[str, Tuple[int, int, int]] = {
+    "small": (200, 500, 500),
+    "medium": (2000, 5000, 5000),
+    "large": (9999, 10000, 10000),
+}
+
+
+# --------------------------- 合成数据 ---------------------------
+# 合成比赛使用的规则表：内置前三/前五之外再加前八与加权团体项目
+RULES = RuleBook([RuleSet("前八", (10, 8, 6, 5, 4, 3, 2, 1)), RuleSet("团体前三", (5, 3, 2), 2)])
+
+
+def synthetic_arrays(n: int, m: int, w: int, seed: int = 0):
+    """随机生成 (gender, rule, results)：规则按 前三/前五/前八/团体 混合，名次为互不相同的国家。"""
+    rng = np.random.default_rng(seed)
+    e = m + w
+    gender = np.concatenate([np.zeros(m, np.int8), np.ones(w, np.int8)])
+    rule = rng.choice(np.array([RULE_TOP3, RULE_TOP5, 2, 3], dtype=np.int16), size=e, p=[0.4, 0.4, 0.1, 0.1])
+    # 每行取 5 个互不相同的国家：随机键排序后取前 5（n 很大时按块生成以控制内存）
+    results = np.empty((e, MAX_PLACES), dtype=np.int32)
+    block = max(1, 2_000_000 // max(n, 1))
+    for start in range(0, e, block):
+        stop = min(e, start + block)
+        keys = rng.random((stop - start, n))
+        results[start:stop] = np.argpartition(keys, MAX_PLACES - 1, axis=1)[:, :MAX_PLACES] + 1
+    results[np.arange(MAX_PLACES)[None, :] >= RULES.places_table()[rule][:, None]] = 0
+    return gender, rule, results
+
+
+def synthetic_engine(n: int, m: int, w: int) -> ScoringEngine:
+    engine = ScoringEngine()
+    gender, rule, results = synthetic_arrays(n, m, w)
+    engine.load_arrays(n, gender, rule, results, rules=RULES)
+    return engine
+
+
+def write_csv(path: str, engine: ScoringEngine):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("event_id,gender,rule," + ",".join(f"p{i + 1}" for i in range(MAX_PLACES)) + "\n")
+        names = engine.rules.names
+        for row in range(engine.n_events):
+            ranks = ",".join(str(c) if c else "" for c in engine.results[row].tolist())
+            f.write(f"{row + 1},{'男' if engine.gender[row] == 0 else '女'},{names[engine.rule[row]]},{ranks}\n")
+
+
+# --------------------------- 计时 ---------------------------
+def measure(fn: Callable[[], None], repeat: int = 3) -> Dict[str, float]:
+    """取 repeat 次中的最短耗时；内存峰值用 tracemalloc 单独测一次。"""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time": round(best, 6), "peak_kb": round(peak / 1024, 1)}
+
+
+# --------------------------- 基准项 ---------------------------
+def engine_cases(n: int, m: int, w: int, tmpdir: str) -> Dict[str, Callable[[], None]]:
+    engine = synthetic_engine(n, m, w)
+    rng = np.random.default_rng(1)
+    edits = list(zip(rng.integers(0, engine.n_events, 1000).tolist(),
+                     rng.integers(0, 3, 1000).tolist(),
+                     rng.integers(1, n + 1, 1000).tolist()))
+    countries = rng.integers(1, n + 1, 1000).tolist()
+    csv_path = os.path.join(tmpdir, "results.csv")
+    olys_path = os.path.join(tmpdir, "game.olys")
+    write_csv(csv_path, engine)
+    save_competition(olys_path, engine)
+
+    def alternating_edits(target: ScoringEngine) -> Callable[[], None]:
+        # 轮流写入与清空：重复测量时每一轮的 1000 次编辑仍都是真实改动
+        rounds = [0]
+
+        def run():
+            clear = rounds[0] % 2
+            rounds[0] += 1
+            for row, place, cid in edits:
+                target.set_place(row, place, 0 if clear else cid)
+        return run
+
+    edit_cells = alternating_edits(engine)
+
+    def sort_all():
+        for key in ("id", "total", "male", "female"):
+            engine.sort_permutation(key, key == "id")
+
+    def validate_all():
+        engine.mark_all_dirty()
+        engine.validate_dirty()
+
+    def country_queries():
+        for cid in countries:
+            engine.country_placings(cid)
+
+    # 挂有实时排行榜的引擎：编辑时同步维护三项有序索引
+    board_engine = synthetic_engine(n, m, w)
+    board = Leaderboard(board_engine)
+
+    board_edit_cells = alternating_edits(board_engine)
+
+    def board_ranks():
+        for cid in countries:
+            for key in Leaderboard.KEYS:
+                board.rank(key, cid)
+
+    def board_top():
+        for key in Leaderboard.KEYS:
+            board.top(key, 100)
+            board.range(key, n // 2, n // 2 + 99)
+
+    # 形势预测：最后 2% 的项目尚未录入；单进程运行，耗时不受核心数影响
+    gender, rule, results = synthetic_arrays(n, m, w)
+    results[-max(1, (m + w) // 50):] = 0
+    project_engine = ScoringEngine()
+    project_engine.load_arrays(n, gender, rule, results, rules=RULES)
+
+    def project():
+        run_projection(build_problem(project_engine, model="strength"), 1000, workers=1, seed=0)
+
+    # 录入日志：编辑耗时只含引擎线程上的记录开销；恢复为快照加 1000 条日志回放
+    journal_engine = synthetic_engine(n, m, w)
+    journal = Journal(tempfile.mkdtemp(dir=tmpdir))
+    journal.attach(journal_engine)
+
+    journal_edit_cells = alternating_edits(journal_engine)
+
+    recover_dir = tempfile.mkdtemp(dir=tmpdir)
+    recorded = Journal(recover_dir, snapshot_every=len(edits) + 1)
+    recorded.attach(synthetic_engine(n, m, w))
+    for row, place, cid in edits:
+        recorded.engine.set_place(row, place, cid)
+    recorded.close(final_snapshot=False)
+
+    # 多场累计：同一存档复制 50 份作为分片；单进程运行，耗时不受核心数影响
+    shard_paths = []
+    for k in range(50):
+        shard_paths.append(os.path.join(tmpdir, f"shard-{n}-{k:02d}.olys"))
+        save_competition(shard_paths[-1], engine)
+
+    def import_csv():
+        target = ScoringEngine()
+        target.set_rules(RULES)
+        import_results(csv_path, target, n_countries=n)
+
+    return {
+        "engine.initialize": lambda: ScoringEngine().initialize(n, m, w),
+        "engine.compute_scores": engine.compute_scores,
+        "engine.edit_1000_cells": edit_cells,
+        "engine.validate_all": validate_all,
+        "engine.sort_permutations": sort_all,
+        "engine.query_1000_countries": country_queries,
+        "medals.table_all_scopes": lambda: [medal_table(engine, scope) for scope in ("all", "male", "female")],
+        "leaderboard.build": lambda: Leaderboard(engine).close(),
+        "leaderboard.edit_1000_cells": board_edit_cells,
+        "leaderboard.rank_1000_countries": board_ranks,
+        "leaderboard.top_and_range_100": board_top,
+        "project.1000_sims": project,
+        "journal.edit_1000_cells": journal_edit_cells,
+        "journal.recover": lambda: Journal(recover_dir).recover(ScoringEngine()),
+        "aggregate.50_shards": lambda: aggregate(make_shards(shard_paths), workers=1),
+        "io.import_csv": import_csv,
+        "io.save": lambda: save_competition(olys_path, engine),
+        "io.load": lambda: load_competition(olys_path, ScoringEngine()),
+        "export.results_csv": lambda: export(engine, os.path.join(tmpdir, "export.csv"), "results"),
+        "export.placings_columns": lambda: export(engine, os.path.join(tmpdir, "export.olyc"), "placings"),
+    }
+
+
+def gui_cases(n: int, m: int, w: int) -> Dict[str, Callable[[], None]]:
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+    from scoring_gui import OlympicsScoringApp
+
+    app = QApplication.instance() or QApplication([])
+    # 基准中不弹出模态对话框
+    QMessageBox.information = staticmethod(lambda *a, **k: None)
+    QMessageBox.warning = staticmethod(lambda *a, **k: None)
+
+    win = OlympicsScoringApp()
+    win.show()
+    gender, rule, results = synthetic_arrays(n, m, w)
+
+    def settle():
+        while win.tasks.busy:
+            win.tasks.wait(10)
+            app.processEvents()
+        app.processEvents()
+
+    def initialize():
+        win.edit_n.setText(str(n)); win.edit_m.setText(str(m)); win.edit_w.setText(str(w))
+        win.on_initialize()
+        app.processEvents()
+
+    def load():
+        win.engine.load_arrays(n, gender.copy(), rule.copy(), results.copy(), rules=RULES)
+        app.processEvents()
+
+    def validate_all_rows():
+        win.engine.mark_all_dirty()
+        win.validate_all_rows()
+        settle()
+
+    def refresh_stats_table():
+        for key in (("total", False), ("male", False), ("female", False), ("id", True)):
+            win.refresh_stats_table(sort_key=key)
+            app.processEvents()
+
+    def query_by_country():
+        for cid in range(1, min(n, 200) + 1):
+            win.edit_query_country.setText(str(cid))
+            win.query_by_country()
+
+    load()
+    return {
+        "gui.on_initialize": initialize,
+        "gui.load_arrays": load,
+        "gui.validate_all_rows": validate_all_rows,
+        "gui.refresh_stats_table": refresh_stats_table,
+        "gui.query_by_country_x200": query_by_country,
+    }
+
+
+def run(sizes: List[str], with_gui: bool) -> Dict[str, Dict[str, float]]:
+    out: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in sizes:
+            n, m, w = SIZES[size]
+            cases = engine_cases(n, m, w, tmpdir)
+            if with_gui:
+                cases.update(gui_cases(n, m, w))
+            for name, fn in cases.items():
+                key = f"{size}/{name}"
+                out[key] = measure(fn)
+                print(f"{key:<40} {out[key]['time'] * 1000:10.2f} ms {out[key]['peak_kb']:12.1f} KiB", flush=True)
+    return out
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float, slack_ms: float) -> List[str]:
+    """返回超出容差的项目；耗时允许 slack_ms 的绝对抖动。"""
+    problems = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if cur["time"] > base["time"] * tolerance + slack_ms / 1000:
+            problems.append(f"{key}: 耗时 {cur['time'] * 1000:.2f} ms，基线 {base['time'] * 1000:.2f} ms")
+        if cur["peak_kb"] > base["peak_kb"] * tolerance + 64:
+            problems.append(f"{key}: 内存峰值 {cur['peak_kb']:.1f} KiB，基线 {base['peak_kb']:.1f} KiB")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="奥运会积分统计器性能基准")
+    parser.add_argument("--sizes", default=",".join(SIZES), help="逗号分隔的规模：" + "/".join(SIZES))
+    parser.add_argument("--no-gui", action="store_true", help="只测引擎与文件读写，不加载 PyQt5")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="相对基线的允许倍数（默认 1.5）")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="耗时的绝对容差（毫秒，默认 5）")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument("--update-baseline", action="store_true", help="以本次结果覆盖基线中的对应项")
+    parser.add_argument("-o", "--output", help="把本次结果写入 JSON 文件")
+    args = parser.parse_args(argv)
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"未知规模: {', '.join(unknown)}")
+    results = run(sizes, with_gui=not args.no_gui)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    baseline: Dict[str, Dict[str, float]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"已更新基线 {args.baseline}")
+        return 0
+
+    problems = compare(results, baseline, args.tolerance, args.slack_ms)
+    if problems:
+        print("\n性能回退：", file=sys.stderr)
+        for p in problems:
+            print("  " + p, file=sys.stderr)
+        return 1
+    print("\n全部项目均在基线容差之内。" if baseline else "\n没有基线可比较（可用 --update-baseline 生成）。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
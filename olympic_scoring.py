@@ -1,556 +1,422 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
-
-from PyQt5.QtCore import Qt, QEvent, QTimer
-from PyQt5.QtGui import QIntValidator
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QTabWidget, QTableWidget, QTableWidgetItem,
-    QComboBox, QMessageBox, QGroupBox, QFormLayout, QHeaderView
-)
-
-# 计分规则常量
-POINTS_TOP3 = [5, 3, 2]
-POINTS_TOP5 = [7, 5, 3, 2, 1]
-
-@dataclass
-class EventConfig:
-    event_id: int
-    gender: str  # '男' or '女'
-    top_n: int   # 3 or 5
-
-class OlympicsScoringApp(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("奥运会积分统计器")
-        self.resize(1100, 700)
-
-        # 全局参数
-        self.n_countries: int = 0
-        self.m_men: int = 0
-        self.w_women: int = 0
-
-        # 项目配置（行号 -> EventConfig）
-        self.event_configs: Dict[int, EventConfig] = {}
-
-        # UI
-        self._build_ui()
-
-    # --------------------------- UI 构建 ---------------------------
-    def _build_ui(self):
-        central = QWidget()
-        self.setCentralWidget(central)
-        root = QVBoxLayout(central)
-
-        # 顶部初始化区域
-        init_box = QGroupBox("比赛规模设置")
-        init_layout = QFormLayout(init_box)
-        self.edit_n = QLineEdit(); self.edit_n.setValidator(QIntValidator(1, 9999))
-        self.edit_m = QLineEdit(); self.edit_m.setValidator(QIntValidator(0, 9999))
-        self.edit_w = QLineEdit(); self.edit_w.setValidator(QIntValidator(0, 9999))
-        self.edit_n.setPlaceholderText("国家数量 n (>=1)")
-        self.edit_m.setPlaceholderText("男子项目数 m (>=0)")
-        self.edit_w.setPlaceholderText("女子项目数 w (>=0)")
-        init_layout.addRow("国家数量 n:", self.edit_n)
-        init_layout.addRow("男子项目数 m:", self.edit_m)
-        init_layout.addRow("女子项目数 w:", self.edit_w)
-        btn_init = QPushButton("初始化比赛与录入表")
-        btn_init.clicked.connect(self.on_initialize)
-        init_layout.addRow(btn_init)
-        root.addWidget(init_box)
-
-        # 选项卡
-        self.tabs = QTabWidget()
-        root.addWidget(self.tabs, 1)
-        # 选项卡切换时，确保录入表列宽立即刷新
-        self.tabs.currentChanged.connect(self._on_tab_changed)
-
-        # 录入页
-        self.tab_entry = QWidget(); self.tabs.addTab(self.tab_entry, "① 成绩录入")
-        self._build_entry_tab()
-
-        # 统计页
-        self.tab_stats = QWidget(); self.tabs.addTab(self.tab_stats, "② 排名统计")
-        self._build_stats_tab()
-
-        # 查询页
-        self.tab_query = QWidget(); self.tabs.addTab(self.tab_query, "③ 条件查询")
-        self._build_query_tab()
-
-    def _build_entry_tab(self):
-        layout = QVBoxLayout(self.tab_entry)
-        tip = QLabel("提示：初始化后在下表逐行录入各项目的名次(国家编号 1..n)。选择‘前三/前五’会自动启用/禁用第4/5名列。")
-        tip.setWordWrap(True)
-        layout.addWidget(tip)
-
-        # 成绩录入表
-        self.table_entry = QTableWidget(0, 9)
-        self.table_entry.setHorizontalHeaderLabels([
-            "项目ID", "性别", "前三/前五", "第一名", "第二名", "第三名", "第四名", "第五名", "校验状态"
-        ])
-        # 录入表列宽：前8列等宽，最后一列更宽；并随窗口宽度自适应
-        self.table_entry.setEditTriggers(QTableWidget.AllEditTriggers)
-        layout.addWidget(self.table_entry, 1)
-        self._configure_entry_header()
-
-        # 操作区
-        ops = QHBoxLayout()
-        self.btn_validate = QPushButton("快速校验全部")
-        self.btn_validate.clicked.connect(self.validate_all_rows)
-        self.btn_compute = QPushButton("统计得分")
-        self.btn_compute.clicked.connect(self.compute_scores_and_refresh)
-        self.btn_fill = QPushButton("填充示例数据（含初始化）")
-        self.btn_fill.clicked.connect(self.fill_example_data)
-        ops.addWidget(self.btn_validate)
-        ops.addWidget(self.btn_compute)
-        ops.addWidget(self.btn_fill)
-        ops.addStretch(1)
-        layout.addLayout(ops)
-
-    def _build_stats_tab(self):
-        layout = QVBoxLayout(self.tab_stats)
-
-        # 排序按钮区
-        sort_bar = QHBoxLayout()
-        sort_bar.addWidget(QLabel("排序方式："))
-        self.btn_sort_id = QPushButton("按国家编号↑")
-        self.btn_sort_total = QPushButton("按总分↓")
-        self.btn_sort_male = QPushButton("按男团总分↓")
-        self.btn_sort_female = QPushButton("按女团总分↓")
-        for b in (self.btn_sort_id, self.btn_sort_total, self.btn_sort_male, self.btn_sort_female):
-            sort_bar.addWidget(b)
-        sort_bar.addStretch(1)
-        layout.addLayout(sort_bar)
-
-        self.btn_sort_id.clicked.connect(lambda: self.refresh_stats_table(sort_key=("id", True)))
-        self.btn_sort_total.clicked.connect(lambda: self.refresh_stats_table(sort_key=("total", False)))
-        self.btn_sort_male.clicked.connect(lambda: self.refresh_stats_table(sort_key=("male", False)))
-        self.btn_sort_female.clicked.connect(lambda: self.refresh_stats_table(sort_key=("female", False)))
-
-        # 统计表
-        self.table_stats = QTableWidget(0, 4)
-        self.table_stats.setHorizontalHeaderLabels(["国家编号", "总分", "男团总分", "女团总分"])
-        # 让所有列等比例分配宽度
-        self.table_stats.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        layout.addWidget(self.table_stats, 1)
-
-    def _build_query_tab(self):
-        layout = QVBoxLayout(self.tab_query)
-
-        # 按国家查
-        box_country = QGroupBox("按国家编号查询")
-        f1 = QFormLayout(box_country)
-        self.edit_query_country = QLineEdit(); self.edit_query_country.setValidator(QIntValidator(1, 999999))
-        btn_q1 = QPushButton("查询国家参赛情况")
-        btn_q1.clicked.connect(self.query_by_country)
-        f1.addRow("国家编号:", self.edit_query_country)
-        f1.addRow(btn_q1)
-        layout.addWidget(box_country)
-
-        self.table_q_country = QTableWidget(0, 5)
-        self.table_q_country.setHorizontalHeaderLabels(["项目ID", "性别", "名次", "得分", "说明"])
-        # 让所有列等比例分配宽度
-        self.table_q_country.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        layout.addWidget(self.table_q_country)
-
-        # 按项目查
-        box_event = QGroupBox("按项目编号查询")
-        f2 = QFormLayout(box_event)
-        self.edit_query_event = QLineEdit(); self.edit_query_event.setValidator(QIntValidator(1, 10**9))
-        btn_q2 = QPushButton("查询该项目获奖国家")
-        btn_q2.clicked.connect(self.query_by_event)
-        f2.addRow("项目编号:", self.edit_query_event)
-        f2.addRow(btn_q2)
-        layout.addWidget(box_event)
-
-        self.table_q_event = QTableWidget(0, 3)
-        self.table_q_event.setHorizontalHeaderLabels(["名次", "国家编号", "得分"])
-        # 让所有列等比例分配宽度
-        self.table_q_event.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        layout.addWidget(self.table_q_event)
-
-    # --------------------------- 列宽控制（录入表） ---------------------------
-    def _configure_entry_header(self):
-        """将录入表设置为可交互列宽，并做比例分配：0..7 等宽，列8为双倍。"""
-        header = self.table_entry.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.Interactive)
-        header.setMinimumSectionSize(60)
-        # 监听视口尺寸变化，避免初次显示时留白
-        self.table_entry.viewport().installEventFilter(self)
-        self._resize_entry_columns()
-
-    def _resize_entry_columns(self):
-        if not hasattr(self, 'table_entry'):
-            return
-        # 优先用 viewport 宽度；若为 0，退化为表格宽度估计
-        total_w = self.table_entry.viewport().width()
-        if total_w <= 0:
-            total_w = max(0, self.table_entry.width() - self.table_entry.verticalHeader().width() - 4)
-        # 10 份：前8列各1份，最后一列2份
-        unit = max(1, total_w // 10)
-        for c in range(8):
-            self.table_entry.setColumnWidth(c, unit)
-        self.table_entry.setColumnWidth(8, unit * 2)
-
-    def _on_tab_changed(self, idx: int):
-        # 切到录入页立即刷新列宽，避免初次显示留白
-        w = self.tabs.widget(idx)
-        if w is self.tab_entry:
-            QTimer.singleShot(0, self._resize_entry_columns)
-
-    def showEvent(self, event):
-        super().showEvent(event)
-        # 窗口首次显示后，等布局稳定再拉伸一次，修复初始右侧留白
-        QTimer.singleShot(0, self._resize_entry_columns)
-
-    def eventFilter(self, obj, event):
-        # 视口尺寸变化时重算列宽（例如首次布局、切换 DPI、显示滚动条等）
-        if obj is getattr(self, 'table_entry', None) and event.type() == QEvent.Resize:
-            self._resize_entry_columns()
-        if hasattr(self, 'table_entry') and obj is self.table_entry.viewport() and event.type() == QEvent.Resize:
-            self._resize_entry_columns()
-        return super().eventFilter(obj, event)
-
-    def _resize_entry_columns(self):
-        if not hasattr(self, 'table_entry'):
-            return
-        total_w = max(0, self.table_entry.viewport().width())
-        # 10 份：前8列各1份，最后一列2份
-        unit = max(1, total_w // 10)
-        for c in range(8):
-            self.table_entry.setColumnWidth(c, unit)
-        self.table_entry.setColumnWidth(8, unit * 2)
-
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        # 窗口尺寸变化时，重新按比例分配录入表列宽
-        if hasattr(self, 'table_entry'):
-            self._resize_entry_columns()
-
-    # --------------------------- 初始化/构表 ---------------------------
-    def on_initialize(self):
-        try:
-            n = int(self.edit_n.text())
-            m = int(self.edit_m.text())
-            w = int(self.edit_w.text())
-        except ValueError:
-            QMessageBox.warning(self, "参数错误", "请正确输入 n / m / w 为整数。")
-            return
-        if n < 1 or m < 0 or w < 0:
-            QMessageBox.warning(self, "参数错误", "需满足 n>=1, m>=0, w>=0。")
-            return
-        if m == 0 and w == 0:
-            QMessageBox.warning(self, "参数错误", "至少需要 1 个项目。")
-            return
-
-        self.n_countries, self.m_men, self.w_women = n, m, w
-        total_events = m + w
-
-        # 重置录入表
-        self.table_entry.setRowCount(total_events)
-        self.event_configs.clear()
-
-        for row in range(total_events):
-            event_id = row + 1
-            gender = '男' if event_id <= m else '女'
-            # 项目ID
-            self._set_item(self.table_entry, row, 0, str(event_id), editable=False)
-            # 性别
-            self._set_item(self.table_entry, row, 1, gender, editable=False)
-            # 前三/前五
-            combo = QComboBox()
-            combo.addItems(["前三", "前五"])  # 默认前三
-            combo.currentIndexChanged.connect(lambda _i, r=row: self.on_topn_changed(r))
-            self.table_entry.setCellWidget(row, 2, combo)
-            # 排名输入(1..5)
-            for col in range(3, 8):  # 第1名~第5名
-                le = QLineEdit(); le.setPlaceholderText("国家编号")
-                le.setValidator(QIntValidator(1, self.n_countries))
-                self.table_entry.setCellWidget(row, col, le)
-            # 校验状态
-            self._set_item(self.table_entry, row, 8, "未校验", editable=False)
-
-            # 保存配置，默认前三
-            self.event_configs[row] = EventConfig(event_id=event_id, gender=gender, top_n=3)
-            self._apply_topn_ui(row)
-
-        # 初始化后立即按比例设置列宽
-        self._resize_entry_columns()
-        QMessageBox.information(self, "初始化完成", f"已创建 {total_events} 个项目（男 {m}、女 {w}），国家数 {n}。")
-
-    def on_topn_changed(self, row: int):
-        combo: QComboBox = self.table_entry.cellWidget(row, 2)  # type: ignore
-        top_n = 3 if combo.currentText() == "前三" else 5
-        cfg = self.event_configs.get(row)
-        if cfg:
-            cfg.top_n = top_n
-        self._apply_topn_ui(row)
-
-    def _apply_topn_ui(self, row: int):
-        """根据 top_n 启/禁用第4/5名输入。"""
-        cfg = self.event_configs[row]
-        enable_4_5 = (cfg.top_n == 5)
-        for col in (6, 7):  # 第四名、第 五名列
-            widget = self.table_entry.cellWidget(row, col)
-            if widget:
-                widget.setEnabled(enable_4_5)
-                if not enable_4_5:
-                    # 清空以防误统计
-                    widget.setProperty('text', '')
-                    if isinstance(widget, QLineEdit):
-                        widget.clear()
-
-    # --------------------------- 校验与读表 ---------------------------
-    def validate_row(self, row: int) -> Tuple[bool, str]:
-        cfg = self.event_configs[row]
-        # 读取名次
-        ranks: List[Optional[int]] = []
-        for idx in range(5):
-            col = 3 + idx
-            widget = self.table_entry.cellWidget(row, col)
-            if isinstance(widget, QLineEdit) and widget.isEnabled():
-                txt = widget.text().strip()
-                ranks.append(int(txt) if txt else None)
-            else:
-                ranks.append(None)
-
-        # 至少前三应完整；如选择前五，则前四/前五也应完整
-        need = 3 if cfg.top_n == 3 else 5
-        # 基础完整性
-        for i in range(need):
-            if ranks[i] is None:
-                return False, f"缺少第{i+1}名"
-            if not (1 <= ranks[i] <= self.n_countries):
-                return False, f"第{i+1}名超范围(1..{self.n_countries})"
-
-        # 不得重复
-        seen = set()
-        for i in range(need):
-            r = ranks[i]
-            if r in seen:
-                return False, f"国家编号重复: {r}"
-            seen.add(r)
-
-        return True, "通过"
-
-    def validate_all_rows(self):
-        total = self.table_entry.rowCount()
-        all_ok = True
-        for row in range(total):
-            ok, msg = self.validate_row(row)
-            self._set_item(self.table_entry, row, 8, msg, editable=False)
-            if not ok:
-                all_ok = False
-        if all_ok:
-            QMessageBox.information(self, "校验完成", "所有项目录入有效。")
+"""奥运会积分统计器入口。
+
+不带参数运行时启动图形界面；带子命令时以命令行批处理方式运行，不加载 PyQt5：
+
+    python olympic_scoring.py                              # 图形界面
+    python olympic_scoring.py score results.csv --sort total
+    python olympic_scoring.py score game.olys -o standings.csv
+    python olympic_scoring.py medals game.olys --scope female --by gold,silver,bronze
+    python olympic_scoring.py query game.olys --where "country == 5 and place <= 3"
+    python olympic_scoring.py project game.olys --sims 1000000 --model strength
+    python olympic_scoring.py export game.olys --what placings -o placings.olyc   # 流式导出
+    python olympic_scoring.py aggregate seasons/ --map countries.csv --top 20   # 多场累计
+    python olympic_scoring.py serve game.olys --port 8765       # 发布排名，另开终端 watch 查看推送
+    python olympic_scoring.py recover ~/.olympic_scoring/journal -o game.olys   # 从录入日志恢复
+    python olympic_scoring.py --profile timings.prof score results.csv   # 记录各阶段耗时
+"""
+import argparse
+import csv
+import sys
+from typing import Iterable, List, Optional, Sequence
+
+SORT_KEYS = {
+    # 与统计页按钮一致：编号升序，各项得分降序
+    "id": ("id", True),
+    "total": ("total", False),
+    "male": ("male", False),
+    "female": ("female", False),
+}
+
+
+def positive_int(text: str) -> int:
+    """argparse 类型：不小于 1 的整数。"""
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"应为整数: {text!r}")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"应为不小于 1 的整数: {value}")
+    return value
+
+
+def _write_table(header: List[str], rows: Iterable[Sequence], output: Optional[str] = None):
+    """output 非空时写成 CSV 文件，否则以制表符分隔输出到标准输出。"""
+    if output:
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    else:
+        out = sys.stdout
+        out.write("\t".join(header) + "\n")
+        out.writelines("\t".join(map(str, row)) + "\n" for row in rows)
+
+
+def load_engine(path: str, n_countries: Optional[int] = None, rules_path: Optional[str] = None):
+    """按扩展名读入比赛：.olys 为二进制存档，其余按成绩文件导入。导入错误写到 stderr。
+
+    rules_path 指定的规则文件会替换存档中的规则表（按名称对应），或用于识别导入文件中的规则。
+    """
+    from scoring_engine import ScoringEngine
+    from scoring_io import import_results, load_competition
+    from scoring_rules import load_rules
+
+    engine = ScoringEngine()
+    rules = load_rules(rules_path) if rules_path else None
+    if path.lower().endswith(".olys"):
+        load_competition(path, engine)
+        if rules is not None:
+            engine.set_rules(rules)
+        return engine
+    if rules is not None:
+        engine.set_rules(rules)
+    report = import_results(path, engine, n_countries=n_countries)
+    for line_no, msg in report.errors:
+        print(f"{path}:{line_no}: {msg}", file=sys.stderr)
+    if report.error_count > len(report.errors):
+        print(f"……另有 {report.error_count - len(report.errors)} 行错误未列出", file=sys.stderr)
+    return engine
+
+
+def cmd_score(args) -> int:
+    try:
+        engine = load_engine(args.file, args.countries, args.rules)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.file}: {e}", file=sys.stderr)
+        return 2
+    perm = engine.sort_permutation(*SORT_KEYS[args.sort])
+    if args.top is not None:
+        perm = perm[:args.top]
+
+    header = ["国家编号", "总分", "男团总分", "女团总分"]
+    rows = zip((perm + 1).tolist(), engine.total[perm].tolist(),
+               engine.male[perm].tolist(), engine.female[perm].tolist())
+    _write_table(header, rows, args.output)
+    return 0
+
+
+def cmd_medals(args) -> int:
+    from scoring_medals import medal_rows, medal_table, parse_tiebreak
+    try:
+        keys = parse_tiebreak(args.by)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    try:
+        engine = load_engine(args.file, args.countries, args.rules)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.file}: {e}", file=sys.stderr)
+        return 2
+    header, rows = medal_rows(medal_table(engine, args.scope, keys), args.top)
+    _write_table(header, rows, args.output)
+    return 0
+
+
+def cmd_query(args) -> int:
+    from scoring_query import QueryEngine, QueryError
+    try:
+        engine = load_engine(args.file, args.countries, args.rules)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.file}: {e}", file=sys.stderr)
+        return 2
+    query = QueryEngine(engine)
+    try:
+        for column in args.index or ():
+            query.create_index(args.table, column)
+        group_by = [c for c in (args.group_by or "").split(",") if c.strip()]
+        if group_by or args.agg != "count" or args.value:
+            result = query.aggregate(args.table, args.where, group_by, args.agg, args.value)
         else:
-            QMessageBox.warning(self, "校验完成", "存在录入问题，请根据‘校验状态’列逐项修正。")
-
-    def _read_event_row(self, row: int) -> Tuple[EventConfig, List[int]]:
-        cfg = self.event_configs[row]
-        ranks: List[int] = []
-        need = 3 if cfg.top_n == 3 else 5
-        for i in range(need):
-            col = 3 + i
-            widget = self.table_entry.cellWidget(row, col)
-            val = 0
-            if isinstance(widget, QLineEdit):
-                txt = widget.text().strip()
-                if txt:
-                    val = int(txt)
-            ranks.append(val)
-        return cfg, ranks
-
-    # --------------------------- 统计与展示 ---------------------------
-    def compute_scores(self) -> Tuple[Dict[int, int], Dict[int, int], Dict[int, int]]:
-        if self.n_countries <= 0:
-            return {}, {}, {}
-        total_scores = {i: 0 for i in range(1, self.n_countries + 1)}
-        male_scores = {i: 0 for i in range(1, self.n_countries + 1)}
-        female_scores = {i: 0 for i in range(1, self.n_countries + 1)}
-
-        total_events = self.table_entry.rowCount()
-        for row in range(total_events):
-            cfg, ranks = self._read_event_row(row)
-            if cfg.top_n == 3 and len(ranks) == 3:
-                pts = POINTS_TOP3
-            else:
-                pts = POINTS_TOP5
-
-            for pos, country in enumerate(ranks):
-                if country is None or country == 0:
-                    # 该项目尚未完整录入，跳过
-                    continue
-                if not (1 <= country <= self.n_countries):
-                    continue
-                score = pts[pos]
-                total_scores[country] += score
-                if cfg.gender == '男':
-                    male_scores[country] += score
-                else:
-                    female_scores[country] += score
-        return total_scores, male_scores, female_scores
-
-    def compute_scores_and_refresh(self):
-        self.validate_all_rows()
-        self.s_total, self.s_male, self.s_female = self.compute_scores()
-        self.refresh_stats_table()
-        self.tabs.setCurrentWidget(self.tab_stats)
-
-    def refresh_stats_table(self, sort_key: Tuple[str, bool] = ("id", True)):
-        if not hasattr(self, 's_total'):
-            self.s_total, self.s_male, self.s_female = self.compute_scores()
-        rows = []
-        for cid in range(1, self.n_countries + 1):
-            rows.append({
-                'id': cid,
-                'total': self.s_total.get(cid, 0),
-                'male': self.s_male.get(cid, 0),
-                'female': self.s_female.get(cid, 0)
-            })
-        key, asc = sort_key
-        rows.sort(key=lambda x: x[key], reverse=not asc)
-
-        self.table_stats.setRowCount(len(rows))
-        for r, rec in enumerate(rows):
-            self._set_item(self.table_stats, r, 0, str(rec['id']))
-            self._set_item(self.table_stats, r, 1, str(rec['total']))
-            self._set_item(self.table_stats, r, 2, str(rec['male']))
-            self._set_item(self.table_stats, r, 3, str(rec['female']))
-
-    # --------------------------- 示例数据填充 ---------------------------
-    def fill_example_data(self):
-        """一键填充示例：n=7, m=3, w=2，并预置每个项目的名次。"""
-        # 1) 设置规模并初始化
-        self.edit_n.setText("7"); self.edit_m.setText("3"); self.edit_w.setText("2")
-        self.on_initialize()
-
-        # 2) 逐项目配置：("前三"/"前五", [第一, 第二, 第三, (可选)第四, (可选)第五])
-        sample = [
-            ("前五", [1, 2, 3, 4, 5]),
-            ("前三", [3, 1, 2]),
-            ("前五", [2, 4, 6, 1, 7]),
-            ("前三", [5, 4, 1]),
-            ("前五", [7, 5, 2, 3, 6]),
-        ]
-        for row, (mode, ranks) in enumerate(sample):
-            combo = self.table_entry.cellWidget(row, 2)
-            if isinstance(combo, QComboBox):
-                combo.setCurrentText(mode)
-                self.on_topn_changed(row)
-            for i, val in enumerate(ranks):
-                w = self.table_entry.cellWidget(row, 3 + i)
-                if isinstance(w, QLineEdit):
-                    w.setText(str(val))
-
-        # 3) 校验并统计，切换到统计页
-        self.validate_all_rows()
-        self.compute_scores_and_refresh()
-        self.tabs.setCurrentWidget(self.tab_stats)
-
-    # --------------------------- 查询 ---------------------------
-    def query_by_country(self):
-        if self.n_countries <= 0:
-            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
-            return
-        try:
-            cid = int(self.edit_query_country.text())
-        except ValueError:
-            QMessageBox.warning(self, "输入错误", "请输入有效的国家编号。")
-            return
-        if not (1 <= cid <= self.n_countries):
-            QMessageBox.warning(self, "输入错误", f"国家编号需在 1..{self.n_countries}。")
-            return
-
-        # 统计（确保最新）
-        self.s_total, self.s_male, self.s_female = self.compute_scores()
-
-        # 遍历每个项目，找到该国家的名次与得分
-        out: List[Tuple[int, str, Optional[int], int, str]] = []
-        total_events = self.table_entry.rowCount()
-        for row in range(total_events):
-            cfg, ranks = self._read_event_row(row)
-            pts = POINTS_TOP3 if cfg.top_n == 3 else POINTS_TOP5
-            place = None; score = 0; note = ""
-            if ranks:
-                for i, c in enumerate(ranks):
-                    if c == cid:
-                        place = i + 1
-                        score = pts[i]
-                        break
-            if place is None:
-                note = "未上榜"
-            out.append((cfg.event_id, cfg.gender, place, score, note))
-
-        # 填表
-        self.table_q_country.setRowCount(len(out))
-        for r, (eid, g, place, score, note) in enumerate(out):
-            self._set_item(self.table_q_country, r, 0, str(eid))
-            self._set_item(self.table_q_country, r, 1, g)
-            self._set_item(self.table_q_country, r, 2, (str(place) if place else "-"))
-            self._set_item(self.table_q_country, r, 3, str(score))
-            self._set_item(self.table_q_country, r, 4, note)
-
-    def query_by_event(self):
-        if self.n_countries <= 0:
-            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
-            return
+            result = query.select(args.table, args.where, args.order_by, args.desc, args.limit)
+    except QueryError as e:
+        print(f"查询条件有误: {e}", file=sys.stderr)
+        return 2
+
+    out = sys.stdout
+    out.write("\t".join(result.columns) + "\n")
+    for values in result.rows():
+        out.write("\t".join(query.format_value(c, v) for c, v in zip(result.columns, values)) + "\n")
+    return 0
+
+
+def cmd_project(args) -> int:
+    from scoring_project import build_problem, projection_rows, run_projection
+    try:
+        engine = load_engine(args.file, args.countries, args.rules)
+        problem = build_problem(engine, args.key, args.model, args.power)
+        proj = run_projection(problem, args.sims, args.max_rank, args.workers, args.seed)
+    except (OSError, ValueError) as e:
+        print(f"无法完成预测 {args.file}: {e}", file=sys.stderr)
+        return 2
+    print(f"{len(problem.rows)} 个项目共 {problem.open_slots} 个名次待定，已模拟 {proj.n_sims} 次",
+          file=sys.stderr)
+
+    header, rows = projection_rows(proj, args.top)
+    rows = [[cid, score] + [f"{p:.6f}" for p in rest[:2]] + [f"{rest[2]:.3f}"] + [f"{p:.6f}" for p in rest[3:]]
+            for cid, score, *rest in rows]
+    _write_table(header, rows, args.output)
+    return 0
+
+
+def cmd_aggregate(args) -> int:
+    from scoring_aggregate import aggregate, aggregate_rows, expand_paths, load_country_map, make_shards
+    from scoring_rules import load_rules
+    try:
+        country_map = load_country_map(args.map) if args.map else None
+        rules = load_rules(args.rules) if args.rules else None
+    except (OSError, ValueError) as e:
+        print(f"无法读取对照表或规则: {e}", file=sys.stderr)
+        return 2
+    paths = expand_paths(args.files)
+    if not paths:
+        print("没有找到可累计的成绩文件", file=sys.stderr)
+        return 2
+    agg = aggregate(make_shards(paths, country_map), rules, args.workers)
+    for path, msg in agg.failed:
+        print(f"跳过 {path}: {msg}", file=sys.stderr)
+    print(agg.summary(), file=sys.stderr)
+    if agg.n_shards == 0:
+        return 2
+
+    perm = agg.sort_permutation(*SORT_KEYS[args.sort])
+    if args.top is not None:
+        perm = perm[:args.top]
+    header, rows = aggregate_rows(agg, perm)
+    _write_table(header, rows, args.output)
+    return 0
+
+
+def cmd_export(args) -> int:
+    from scoring_export import export
+    try:
+        engine = load_engine(args.file, args.countries, args.rules)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.file}: {e}", file=sys.stderr)
+        return 2
+    try:
+        rows = export(engine, args.output, args.what, args.format, SORT_KEYS[args.sort])
+    except OSError as e:
+        print(f"无法写入 {args.output}: {e}", file=sys.stderr)
+        return 2
+    print(f"已导出 {rows} 行到 {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args) -> int:
+    from scoring_server import LiveServer
+    try:
+        engine = load_engine(args.file, args.countries, args.rules)
+    except (OSError, ValueError) as e:
+        print(f"无法读取 {args.file}: {e}", file=sys.stderr)
+        return 2
+    server = LiveServer(engine, args.host, args.port)
+    print(f"正在发布 {args.file}：http://{args.host}:{args.port}/standings ，按 Ctrl+C 停止", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"无法监听 {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def cmd_watch(args) -> int:
+    """订阅实时发布并逐条打印摘要（用于检查服务端或充当显示端的替身）。"""
+    import asyncio
+    from scoring_server import LiveClient
+
+    async def follow() -> int:
+        client = LiveClient()
         try:
-            eid = int(self.edit_query_event.text())
-        except ValueError:
-            QMessageBox.warning(self, "输入错误", "请输入有效的项目编号。")
-            return
-        total_events = self.table_entry.rowCount()
-        if not (1 <= eid <= total_events):
-            QMessageBox.warning(self, "输入错误", f"项目编号需在 1..{total_events}。")
-            return
-
-        row = eid - 1
-        cfg, ranks = self._read_event_row(row)
-        pts = POINTS_TOP3 if cfg.top_n == 3 else POINTS_TOP5
-
-        # 输出该项目的上榜国家
-        self.table_q_event.setRowCount(len(ranks))
-        for i, cid in enumerate(ranks):
-            self._set_item(self.table_q_event, i, 0, f"第{i+1}名")
-            self._set_item(self.table_q_event, i, 1, str(cid) if cid else "-")
-            self._set_item(self.table_q_event, i, 2, str(pts[i]))
-
-    # --------------------------- 工具函数 ---------------------------
-    def _set_item(self, table: QTableWidget, row: int, col: int, text: str, editable: bool = True):
-        item = QTableWidgetItem(text)
-        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
-        if editable:
-            flags |= Qt.ItemIsEditable
-        item.setFlags(flags)
-        item.setTextAlignment(Qt.AlignCenter)
-        table.setItem(row, col, item)
-
-
-def main():
-    import sys
-    from PyQt5 import QtGui
-
-    app = QApplication(sys.argv)
-
-    if sys.platform.startswith("win"):
-        # 优先用 UI 版微软雅黑，更适合界面显示；没有就回退
-        families = ["Microsoft YaHei UI", "Microsoft YaHei"]
-        db = QtGui.QFontDatabase()
-        for fam in families:
-            if fam in db.families():
-                app.setFont(QtGui.QFont(fam, 11))  # 这里 11 是字号，可调整
+            await client.connect(args.host, args.port)
+        except OSError as e:
+            print(f"无法连接 {args.host}:{args.port}: {e}", file=sys.stderr)
+            return 2
+        received = 0
+        while args.count is None or received < args.count:
+            msg = await client.receive()
+            if msg is None:
                 break
-
-    # 针对高分屏做一点点优化
-    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
-    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
-    win = OlympicsScoringApp()
-    win.show()
-    sys.exit(app.exec_())
+            received += 1
+            kind = "快照" if msg["type"] == "snapshot" else "更新"
+            print(f"{kind} 版本 {msg['version']}：国家 {len(msg['standings'])} 个，项目 {len(msg['events'])} 个")
+            leaders = sorted(client.standings.items(), key=lambda kv: (-kv[1][0], kv[0]))[:args.top]
+            print("  " + "  ".join(f"{cid}:{score[0]}" for cid, score in leaders))
+        await client.close()
+        return 0
+
+    try:
+        return asyncio.run(follow())
+    except KeyboardInterrupt:
+        return 0
+
+
+def cmd_recover(args) -> int:
+    """从录入日志目录恢复比赛，写成存档。"""
+    from scoring_engine import ScoringEngine
+    from scoring_io import save_competition
+    from scoring_journal import Journal
+
+    engine = ScoringEngine()
+    try:
+        report = Journal(args.directory).recover(engine)
+        save_competition(args.output, engine)
+    except (OSError, ValueError) as e:
+        print(f"无法恢复 {args.directory}: {e}", file=sys.stderr)
+        return 2
+    print(report.summary(), file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="olympic_scoring", description="奥运会积分统计器；不带子命令时启动图形界面。")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="启用计时，退出时写入 FILE（.json 为 JSON，其余为 pstats 格式）")
+    parser.add_argument("--journal", metavar="DIR",
+                        help="图形界面的录入日志目录（默认 ~/.olympic_scoring/journal）")
+    parser.add_argument("--no-journal", action="store_true", help="图形界面不记录录入日志")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("score", help="读入成绩文件或存档，输出排名统计")
+    p.add_argument("file", help="成绩文件（.csv/.jsonl）或比赛存档（.olys）")
+    p.add_argument("--sort", choices=sorted(SORT_KEYS), default="id", help="排序方式（默认按国家编号）")
+    p.add_argument("-n", "--countries", type=positive_int, help="国家数量 n；省略时取文件中的最大编号")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.add_argument("--top", type=positive_int, help="只输出前 K 行")
+    p.add_argument("-o", "--output", help="写入 CSV 文件而不是标准输出")
+    p.set_defaults(func=cmd_score)
+
+    from scoring_medals import RANK_KEYS, SCOPES
+    p = sub.add_parser("medals", help="输出奖牌榜（金银铜，可按性别），并列的国家名次相同")
+    p.add_argument("file", help="成绩文件（.csv/.jsonl）或比赛存档（.olys）")
+    p.add_argument("--scope", choices=SCOPES, default="all", help="统计范围：全部/男子/女子项目（默认全部）")
+    p.add_argument("--by", default="total,gold,silver,bronze",
+                   help=f"依次比较的排名依据，逗号分隔，可用 {','.join(RANK_KEYS)}（默认 total,gold,silver,bronze）")
+    p.add_argument("--top", type=positive_int, help="只输出前 K 行")
+    p.add_argument("-n", "--countries", type=positive_int, help="国家数量 n；省略时取文件中的最大编号")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.add_argument("-o", "--output", help="写入 CSV 文件而不是标准输出")
+    p.set_defaults(func=cmd_medals)
+
+    from scoring_query import AGGREGATES, COUNTRIES, PLACINGS
+    p = sub.add_parser("query", help="按条件筛选名次或国家，可分组统计")
+    p.add_argument("file", help="成绩文件（.csv/.jsonl）或比赛存档（.olys）")
+    p.add_argument("-w", "--where", default="",
+                   help="条件表达式，如 \"gender == '女' and place <= 3\"；省略时为全部")
+    p.add_argument("--table", choices=(PLACINGS, COUNTRIES), default=PLACINGS, help="查询的表（默认名次表）")
+    p.add_argument("--group-by", help="分组列，逗号分隔")
+    p.add_argument("--agg", choices=AGGREGATES, default="count", help="分组统计方式（默认 count）")
+    p.add_argument("--value", help="sum/min/max/mean 统计的列")
+    p.add_argument("--order-by", help="按该列排序（不分组时）")
+    p.add_argument("--desc", action="store_true", help="降序排列")
+    p.add_argument("--limit", type=positive_int, help="最多输出的行数（不分组时）")
+    p.add_argument("--index", action="append", metavar="COL", help="为该列建立有序索引，可重复指定")
+    p.add_argument("-n", "--countries", type=positive_int, help="国家数量 n；省略时取文件中的最大编号")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.set_defaults(func=cmd_query)
+
+    from scoring_project import KEYS, MODELS
+    p = sub.add_parser("project", help="蒙特卡洛模拟未录入的名次，估计各国最终名次的概率")
+    p.add_argument("file", help="成绩文件（.csv/.jsonl）或比赛存档（.olys）")
+    p.add_argument("--sims", type=positive_int, default=100_000, help="模拟次数（默认 100000）")
+    p.add_argument("--model", choices=MODELS, default="uniform",
+                   help="uniform：各国机会均等；strength：按当前得分加权")
+    p.add_argument("--power", type=float, default=1.0, help="strength 模型的权重指数：(得分+1)^power")
+    p.add_argument("--key", choices=KEYS, default="total", help="排名依据（默认总分）")
+    p.add_argument("--max-rank", type=positive_int, default=10, help="统计到第几名，之后合并为一栏（默认 10）")
+    p.add_argument("--workers", type=positive_int, help="进程数（默认全部核心，1 为单进程）")
+    p.add_argument("--seed", type=int, help="随机种子；相同种子结果相同，与进程数无关")
+    p.add_argument("--top", type=positive_int, help="只输出夺冠概率最高的 K 个国家")
+    p.add_argument("-n", "--countries", type=positive_int, help="国家数量 n；省略时取文件中的最大编号")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.add_argument("-o", "--output", help="写入 CSV 文件而不是标准输出")
+    p.set_defaults(func=cmd_project)
+
+    p = sub.add_parser("aggregate", help="累计多场比赛（多个文件或目录）的总排名，各场在进程池中并行计分")
+    p.add_argument("files", nargs="+", help="成绩文件、比赛存档或包含它们的目录")
+    p.add_argument("--map", help="国家对照表（CSV：file,local_id,country），统一各场的国家编号")
+    p.add_argument("--sort", choices=sorted(SORT_KEYS), default="total", help="排序方式（默认按总分）")
+    p.add_argument("--workers", type=positive_int, help="进程数（默认全部核心，1 为单进程）")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.add_argument("--top", type=positive_int, help="只输出前 K 行")
+    p.add_argument("-o", "--output", help="写入 CSV 文件而不是标准输出")
+    p.set_defaults(func=cmd_aggregate)
+
+    from scoring_export import DATASETS, FORMATS
+    p = sub.add_parser("export", help="流式导出排名、各国上榜记录或各项目成绩（CSV/JSONL/列式）")
+    p.add_argument("file", help="成绩文件（.csv/.jsonl）或比赛存档（.olys）")
+    p.add_argument("--what", choices=DATASETS, default="standings",
+                   help="standings：各国得分；placings：各国上榜记录；results：各项目成绩（可再导入）")
+    p.add_argument("--format", choices=FORMATS, help="输出格式；省略时按扩展名判断（.jsonl、.olyc，其余为 CSV）")
+    p.add_argument("--sort", choices=sorted(SORT_KEYS), default="id", help="standings 的排序方式（默认按国家编号）")
+    p.add_argument("-n", "--countries", type=positive_int, help="国家数量 n；省略时取文件中的最大编号")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.add_argument("-o", "--output", required=True, help="输出文件")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("serve", help="通过 HTTP/WebSocket 发布排名与项目名次")
+    p.add_argument("file", help="成绩文件（.csv/.jsonl）或比赛存档（.olys）")
+    p.add_argument("--host", default="127.0.0.1", help="监听地址（默认仅本机；0.0.0.0 为全部网卡）")
+    p.add_argument("--port", type=int, default=8765, help="端口（默认 8765）")
+    p.add_argument("-n", "--countries", type=positive_int, help="国家数量 n；省略时取文件中的最大编号")
+    p.add_argument("--rules", help="计分规则文件（JSON），追加在内置的前三/前五之后")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("watch", help="订阅实时发布，打印收到的快照与更新")
+    p.add_argument("--host", default="127.0.0.1", help="服务地址（默认本机）")
+    p.add_argument("--port", type=int, default=8765, help="端口（默认 8765）")
+    p.add_argument("--top", type=positive_int, default=5, help="每条消息后显示总分前 K 名（默认 5）")
+    p.add_argument("--count", type=positive_int, help="收到 K 条消息后退出")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("recover", help="从录入日志目录恢复比赛并写成存档")
+    p.add_argument("directory", help="录入日志目录（界面默认 ~/.olympic_scoring/journal）")
+    p.add_argument("-o", "--output", required=True, help="输出的比赛存档（.olys）")
+    p.set_defaults(func=cmd_recover)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.profile:
+        from scoring_profile import INSTRUMENTATION
+        INSTRUMENTATION.enabled = True
+    try:
+        if args.command is None:
+            # 只有真正启动界面时才加载 PyQt5
+            from scoring_gui import run_gui
+            from scoring_journal import default_directory
+            return run_gui(journal_dir=None if args.no_journal else args.journal or default_directory())
+        return _run_command(args)
+    finally:
+        if args.profile:
+            _write_profile(args.profile)
+
+
+def _run_command(args) -> int:
+    """运行子命令；整个命令计为一个阶段（命令.<名称>），各步骤的计时挂在其下。"""
+    from scoring_profile import stage
+    with stage(f"命令.{args.command}"):
+        return args.func(args)
+
+
+def _write_profile(path: str):
+    from scoring_profile import INSTRUMENTATION
+    try:
+        if path.lower().endswith(".json"):
+            INSTRUMENTATION.export_json(path)
+        else:
+            INSTRUMENTATION.export_pstats(path)
+    except OSError as e:
+        print(f"无法写入计时数据 {path}: {e}", file=sys.stderr)
 
 
 if __name__ == "__main__":
-    main()
+    # 形势预测使用进程池；打包成可执行文件后子进程也从这里启动
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
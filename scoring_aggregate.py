@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""多场比赛的累计排名（不依赖 Qt）。
+
+每个成绩文件或存档是一个分片，在进程池中各自独立读入并计分。分片按组分配给子进程，
+组内编号无需对照的分片先在子进程里按国家编号相加，只把各国的总分/男团/女团向量
+送回主进程，再按到达顺序归并进累计表。
+
+各分片的国家编号可能不一致，由国家对照表统一（CSV，首行可为表头）：
+
+    file,local_id,country
+    qualifier-a.olys,1,CHN
+    qualifier-a.olys,2,USA
+    games-2024.csv,17,CHN
+
+file 可写文件名或与命令行一致的路径；country 为全局国家代码，写成数字时即全局编号。
+对照表中没有列出的国家保持原编号，因此编号本就一致的分片无需对照表。
+"""
+import csv
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from scoring_engine import OperationCancelled, ScoringEngine
+from scoring_io import import_results, load_competition
+from scoring_profile import timed
+from scoring_rules import RuleBook
+
+# 对照表中全局编号的上限，防止异常数据撑爆累计表
+MAX_COUNTRY_ID = 1_000_000
+# 分片按组交给进程池，组数约为进程数的这么多倍：分片很小时减少进程间往返，又能均衡负载
+_TASKS_PER_WORKER = 4
+
+# 目录中作为分片读入的文件
+SHARD_EXTENSIONS = (".olys", ".csv", ".jsonl")
+
+CountryKey = Union[int, str]
+
+
+@dataclass
+class Shard:
+    path: str
+    countries: Dict[int, str] = field(default_factory=dict)  # 本场编号 -> 全局国家代码
+
+
+@dataclass
+class ShardResult:
+    """一个分片（或已在子进程内合并的若干分片）的计分结果；读入失败或没有有效成绩时 error 非空，其余为空。"""
+    path: str
+    n_countries: int = 0
+    total: Optional[np.ndarray] = None
+    male: Optional[np.ndarray] = None
+    female: Optional[np.ndarray] = None
+    appearances: Optional[np.ndarray] = None  # 各国出现的分片数；None 表示各 1 次
+    merged: int = 1                           # 包含的分片数
+    import_errors: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class Aggregate:
+    """累计排名：第 i 行为国家 keys[i]，shards 为该国出现过的分片数。"""
+    keys: List[CountryKey]
+    total: np.ndarray
+    male: np.ndarray
+    female: np.ndarray
+    shards: np.ndarray
+    n_shards: int = 0
+    failed: List[Tuple[str, str]] = field(default_factory=list)   # (文件, 原因)
+    import_errors: int = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def sort_permutation(self, key: str, asc: bool) -> np.ndarray:
+        """与引擎排序一致（稳定排序，同分按国家）；国家顺序为数字编号在前、代码在后。"""
+        order = np.array(sorted(range(len(self.keys)), key=lambda i: _key_order(self.keys[i])), dtype=np.int64)
+        if key == "id":
+            return order if asc else order[::-1]
+        if key not in ("total", "male", "female"):
+            raise ValueError(f"未知的排序字段: {key}")
+        values = getattr(self, key)[order]
+        return order[np.argsort(values if asc else -values, kind="stable")]
+
+    def summary(self) -> str:
+        text = f"累计 {self.n_shards} 场比赛、{len(self.keys)} 个国家"
+        if self.failed:
+            text += f"；{len(self.failed)} 个文件无法读取或没有有效成绩，未计入"
+        if self.import_errors:
+            text += f"；导入错误共 {self.import_errors} 行"
+        return text + "。"
+
+
+def _key_order(key: CountryKey) -> Tuple[int, Union[int, str]]:
+    return (0, key) if isinstance(key, int) else (1, key)
+
+
+# --------------------------- 国家对照表 ---------------------------
+def load_country_map(path: str) -> Dict[str, Dict[int, str]]:
+    """读入对照表：文件 -> {本场编号: 全局国家代码}；格式错误时抛出 ValueError。"""
+    out: Dict[str, Dict[int, str]] = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for line_no, row in enumerate(csv.reader(f), 1):
+            if not row or not "".join(row).strip():
+                continue
+            if len(row) != 3:
+                raise ValueError(f"{path}:{line_no}: 应为 file,local_id,country 三列")
+            name, local, country = (c.strip() for c in row)
+            try:
+                local_id = int(local)
+            except ValueError:
+                if line_no == 1:
+                    continue  # 表头
+                raise ValueError(f"{path}:{line_no}: 本场编号应为整数: {local}")
+            if local_id < 1 or not country:
+                raise ValueError(f"{path}:{line_no}: 本场编号需 >= 1 且国家代码不能为空")
+            if country.isdigit() and int(country) > MAX_COUNTRY_ID:
+                raise ValueError(f"{path}:{line_no}: 全局编号不能超过 {MAX_COUNTRY_ID}")
+            out.setdefault(name, {})[local_id] = country
+    return out
+
+
+def expand_paths(paths: Sequence[str]) -> List[str]:
+    """目录展开为其中的成绩文件与存档（按文件名排序），文件原样保留。"""
+    out: List[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            out.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                       if name.lower().endswith(SHARD_EXTENSIONS))
+        else:
+            out.append(path)
+    return out
+
+
+def make_shards(paths: Sequence[str], country_map: Optional[Dict[str, Dict[int, str]]] = None) -> List[Shard]:
+    """为每个文件配上对照表中的条目（按原样路径或文件名匹配）。"""
+    country_map = country_map or {}
+    return [Shard(p, country_map.get(p) or country_map.get(os.path.basename(p)) or {}) for p in paths]
+
+
+# --------------------------- 分片计分（子进程） ---------------------------
+def score_shard(path: str, rules_json: Optional[str] = None) -> ShardResult:
+    """读入一个分片并计分；rules_json 为追加的规则表（同 --rules）。"""
+    engine = ScoringEngine()
+    try:
+        rules = RuleBook.from_json(rules_json) if rules_json is not None else None
+        errors = 0
+        if path.lower().endswith(".olys"):
+            load_competition(path, engine)
+            if rules is not None:
+                engine.set_rules(rules)
+        else:
+            if rules is not None:
+                engine.set_rules(rules)
+            report = import_results(path, engine)
+            if report.loaded == 0:
+                # 没有一行有效成绩的文件不算一场比赛，也不给任何国家记出场
+                return ShardResult(path, import_errors=report.error_count,
+                                   error=f"没有有效的成绩行（错误 {report.error_count} 行）")
+            errors = report.error_count
+    except (OSError, ValueError) as e:
+        return ShardResult(path, error=str(e))
+    # 存档读入的是内存映射，复制后再送回主进程
+    return ShardResult(path, engine.n_countries, np.array(engine.total), np.array(engine.male),
+                       np.array(engine.female), import_errors=errors)
+
+
+def _reduce(results: List[ShardResult]) -> ShardResult:
+    """把编号无需对照的分片按国家编号直接相加成一条结果。"""
+    n = max(r.n_countries for r in results)
+    sums = np.zeros((4, n), dtype=np.int64)
+    for r in results:
+        k = r.n_countries
+        sums[0, :k] += r.total
+        sums[1, :k] += r.male
+        sums[2, :k] += r.female
+        sums[3, :k] += 1
+    return ShardResult("", n, sums[0], sums[1], sums[2], appearances=sums[3], merged=len(results),
+                       import_errors=sum(r.import_errors for r in results))
+
+
+def _score_group(paths: List[str], mapped: List[bool], rules_json: Optional[str]) -> List[ShardResult]:
+    """计分一组分片并先在本进程内归并：不需要对照的合成一条，主进程只需归并少量向量。"""
+    results = [score_shard(p, rules_json) for p in paths]
+    plain = [r for r, m in zip(results, mapped) if r.error is None and not m]
+    rest = [r for r, m in zip(results, mapped) if r.error is not None or m]
+    if len(plain) > 1:
+        plain = [_reduce(plain)]
+    return rest + plain
+
+
+# --------------------------- 归并 ---------------------------
+class _Merger:
+    """累计表：数字国家按编号直接定位，代码国家查字典；容量按倍增扩展。"""
+
+    def __init__(self):
+        self.by_id = np.full(0, -1, dtype=np.int64)   # 全局编号 -> 行
+        self.by_code: Dict[str, int] = {}
+        self.keys: List[CountryKey] = []
+        self.sums = np.zeros((4, 1024), dtype=np.int64)  # total, male, female, shards
+
+    def _reserve(self, need: int):
+        if need > self.sums.shape[1]:
+            grown = np.zeros((4, max(need, 2 * self.sums.shape[1])), dtype=np.int64)
+            grown[:, :self.sums.shape[1]] = self.sums
+            self.sums = grown
+
+    def _rows_for_ids(self, ids: np.ndarray) -> np.ndarray:
+        top = int(ids.max(initial=0)) + 1
+        if top > len(self.by_id):
+            grown = np.full(max(top, 2 * len(self.by_id)), -1, dtype=np.int64)
+            grown[:len(self.by_id)] = self.by_id
+            self.by_id = grown
+        rows = self.by_id[ids]
+        new = np.unique(ids[rows < 0])
+        if len(new):
+            start = len(self.keys)
+            self.by_id[new] = np.arange(start, start + len(new))
+            self.keys.extend(new.tolist())
+            rows = self.by_id[ids]
+        return rows
+
+    def _row_for_code(self, code: str) -> int:
+        row = self.by_code.get(code)
+        if row is None:
+            row = self.by_code[code] = len(self.keys)
+            self.keys.append(code)
+        return row
+
+    def add(self, result: ShardResult, countries: Dict[int, str]):
+        n = result.n_countries
+        ids = np.arange(1, n + 1, dtype=np.int64)
+        codes = []
+        for local, country in countries.items():
+            if local > n:
+                continue
+            if country.isdigit() and int(country) >= 1:
+                ids[local - 1] = int(country)
+            else:
+                ids[local - 1] = 0
+                codes.append((local - 1, country))
+        rows = self._rows_for_ids(ids[ids > 0]) if n else np.zeros(0, dtype=np.int64)
+        targets = np.empty(n, dtype=np.int64)
+        targets[ids > 0] = rows
+        for i, code in codes:
+            targets[i] = self._row_for_code(code)
+        self._reserve(len(self.keys))
+        appearances = 1 if result.appearances is None else result.appearances
+        if not countries or len(np.unique(targets)) == n:
+            for k, values in enumerate((result.total, result.male, result.female, appearances)):
+                self.sums[k, targets] += values
+        else:
+            # 多个本场编号对应同一国家（如合并代表团）：得分按重复下标累加，出场只算一次
+            for k, values in enumerate((result.total, result.male, result.female)):
+                np.add.at(self.sums[k], targets, values)
+            self.sums[3, np.unique(targets)] += 1
+
+    def result(self) -> Tuple[List[CountryKey], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        k = len(self.keys)
+        total, male, female, shards = (self.sums[i, :k].copy() for i in range(4))
+        return self.keys, total, male, female, shards
+
+
+@timed("aggregate.run")
+def aggregate(shards: Sequence[Shard], rules: Optional[RuleBook] = None, workers: Optional[int] = None,
+              progress: Optional[Callable[[int, int], None]] = None,
+              cancelled: Optional[Callable[[], bool]] = None) -> Aggregate:
+    """在进程池中逐个分片计分并归并；workers 为进程数（默认全部核心，1 表示在本进程内运行）。
+
+    读入失败或没有有效成绩的分片记入 failed 后跳过，不计场数与出场。progress(已完成分片数, 总数) 在每组完成后调用；
+    cancelled() 返回真时停止并抛出 OperationCancelled。
+    """
+    by_path = {s.path: s.countries for s in shards}
+    by_path[""] = {}   # 子进程内已合并的结果
+    merger = _Merger()
+    out = Aggregate([], *(np.zeros(0, dtype=np.int64) for _ in range(4)))
+    rules_json = rules.to_json() if rules is not None else None
+    paths = [s.path for s in shards]
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    size = max(1, -(-len(paths) // (workers * _TASKS_PER_WORKER)))
+    groups = [(paths[i:i + size], [bool(by_path[p]) for p in paths[i:i + size]])
+              for i in range(0, len(paths), size)]
+    done = 0
+
+    def collect(results: List[ShardResult], count: int):
+        nonlocal done
+        for res in results:
+            if res.error is not None:
+                out.failed.append((res.path, res.error))
+                out.import_errors += res.import_errors
+                continue
+            merger.add(res, by_path[res.path])
+            out.n_shards += res.merged
+            out.import_errors += res.import_errors
+        done += count
+        if progress is not None:
+            progress(done, len(paths))
+
+    if workers <= 1:
+        for group, mapped in groups:
+            if cancelled is not None and cancelled():
+                raise OperationCancelled()
+            collect(_score_group(group, mapped, rules_json), len(group))
+    else:
+        # 与形势预测相同，用 spawn 启动子进程：界面进程里有 Qt 线程，fork 不安全
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=ctx) as pool:
+            pending = {pool.submit(_score_group, group, mapped, rules_json): len(group) for group, mapped in groups}
+            try:
+                while pending:
+                    finished, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        collect(fut.result(), pending.pop(fut))
+                    if cancelled is not None and cancelled():
+                        raise OperationCancelled()
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    out.keys, out.total, out.male, out.female, out.shards = merger.result()
+    out.failed.sort()
+    return out
+
+
+def aggregate_rows(agg: Aggregate, perm: np.ndarray) -> Tuple[List[str], List[list]]:
+    """整理成表格：(表头, 行)。"""
+    header = ["国家", "总分", "男团总分", "女团总分", "参赛场数"]
+    rows = [[agg.keys[i], int(agg.total[i]), int(agg.male[i]), int(agg.female[i]), int(agg.shards[i])]
+            for i in perm.tolist()]
+    return header, rows
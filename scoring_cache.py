@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""查询结果缓存（不依赖 Qt）。
+
+每条缓存带有一组依赖标签，引擎改动时只作废标签与改动相交的条目，其余继续命中：
+
+- ("event", 行号)：该项目的名次或规则变化
+- ("country", 国家编号)：该国的上榜记录变化
+- ("gender", 性别代码)：该性别任一项目变化
+- ANY：任何改动都作废；不带标签的条目只在整体重置（导入、读档、初始化）时作废
+
+条目数超过上限时按最近最少使用淘汰。写入时核对引擎版本，计算期间数据有变的结果不入缓存。
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from scoring_engine import ScoringEngine
+
+ANY = ("any",)
+
+Tag = Tuple
+
+
+def event_tag(row: int) -> Tag:
+    return ("event", row)
+
+
+def country_tag(cid: int) -> Tag:
+    return ("country", cid)
+
+
+def gender_tag(gender: int) -> Tag:
+    return ("gender", gender)
+
+
+class ResultCache:
+    """按依赖标签精确作废的 LRU 缓存。
+
+    作为引擎监听器注册，须在读取缓存的视图模型之前创建，保证视图取数时过期条目已清除。
+    """
+
+    def __init__(self, engine: ScoringEngine, capacity: int = 256):
+        self.engine = engine
+        self.capacity = capacity
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Tuple[Tag, ...]]]" = OrderedDict()
+        self._by_tag: Dict[Tag, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        engine.add_listener(self._on_engine_changed)
+
+    def close(self):
+        self.engine.remove_listener(self._on_engine_changed)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    # --------------------------- 读写 ---------------------------
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, tags: Iterable[Tag] = (ANY,), version: Optional[int] = None):
+        """写入一条结果；version 为计算开始时的引擎版本，与当前版本不符时不写入。"""
+        if version is not None and version != self.engine.version:
+            return
+        self._discard(key)
+        tags = tuple(tags)
+        self._entries[key] = (value, tags)
+        for tag in tags:
+            self._by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.capacity:
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], tags: Iterable[Tag] = (ANY,)) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        version = self.engine.version
+        value = compute()
+        self.put(key, value, tags, version)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._by_tag.clear()
+
+    def _discard(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[1]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    # --------------------------- 作废 ---------------------------
+    def invalidate(self, tags: Iterable[Tag]):
+        """作废依赖任一标签的条目。"""
+        stale: Set[Hashable] = set()
+        for tag in tags:
+            stale |= self._by_tag.get(tag, set())
+        for key in stale:
+            self._discard(key)
+        self.invalidations += len(stale)
+
+    def _on_engine_changed(self, rows, countries):
+        if rows is None:
+            self.invalidations += len(self._entries)
+            self.clear()
+            return
+        if not self._entries:
+            return
+        tags = [ANY]
+        gender = self.engine.gender
+        tags.extend(event_tag(r) for r in rows)
+        tags.extend({gender_tag(int(gender[r])) for r in rows})
+        tags.extend(country_tag(c) for c in countries or ())
+        self.invalidate(tags)
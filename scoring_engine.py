@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""奥运会积分计算引擎（不依赖 Qt）。
+
+成绩以稠密的 项目×名次 整数矩阵保存（0 表示未录入），另有每个项目的
+性别向量与计分规则编号向量；规则表编译为分值矩阵（见 scoring_rules），
+总分、男团、女团得分在一次向量化计算中得出。
+单个名次或规则变化时，引擎以 O(1) 增量维护各国的累计得分，
+以及 国家编号 -> 上榜名次 的倒排索引。
+"""
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+
+from scoring_profile import timed
+from scoring_rules import MAX_PLACES, RULE_TOP3, RuleBook, RuleSet
+
+# 性别编码：矩阵中以 0/1 保存，界面上显示为 '男'/'女'
+GENDER_MALE = 0
+GENDER_FEMALE = 1
+GENDER_LABELS = ('男', '女')
+
+# 校验状态码（每行一个），配合 status_detail 渲染为文字
+STATUS_UNCHECKED = 0
+STATUS_OK = 1
+STATUS_MISSING = 2       # detail: 缺少的名次(1 起)
+STATUS_OUT_OF_RANGE = 3  # detail: 超范围的名次(1 起)
+STATUS_DUPLICATE = 4     # detail: 重复的国家编号
+
+
+class OperationCancelled(Exception):
+    """耗时操作（导入、校验等）被调用方取消。"""
+
+
+@dataclass
+class EventConfig:
+    event_id: int
+    gender: str  # '男' or '女'
+    rule: str    # 计分规则名称
+    top_n: int   # 需录入的名次数
+
+
+def status_text(code: int, detail: int, n_countries: int) -> str:
+    """把校验状态码渲染为界面文字。"""
+    if code == STATUS_OK:
+        return "通过"
+    if code == STATUS_MISSING:
+        return f"缺少第{detail}名"
+    if code == STATUS_OUT_OF_RANGE:
+        return f"第{detail}名超范围(1..{n_countries})"
+    if code == STATUS_DUPLICATE:
+        return f"国家编号重复: {detail}"
+    return "未校验"
+
+
+@timed("engine.check_rows")
+def check_rows(ranks: np.ndarray, top_n: np.ndarray, n_countries: int,
+               cancelled: Optional[Callable[[], bool]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """对一批项目一次性检查缺名次、编号超范围、国家重复，返回 (状态码, 细节)。
+
+    ranks 为 int[k, MAX_PLACES]，top_n 为 int[k]。每行报告按名次顺序遇到的
+    第一个问题，与逐行校验的提示一致。纯函数，可在后台线程对快照调用。
+    """
+    k = len(ranks)
+    code = np.full(k, STATUS_OK, dtype=np.int8)
+    detail = np.zeros(k, dtype=np.int32)
+    if k == 0:
+        return code, detail
+    active = np.arange(MAX_PLACES)[None, :] < top_n[:, None]
+
+    missing = (ranks == 0) & active
+    out_of_range = ((ranks < 0) | (ranks > n_countries)) & active
+    bad = missing | out_of_range
+    has_bad = bad.any(axis=1)
+    first_bad = bad.argmax(axis=1)
+    code[has_bad] = np.where(missing[np.arange(k), first_bad], STATUS_MISSING, STATUS_OUT_OF_RANGE)[has_bad]
+    detail[has_bad] = first_bad[has_bad] + 1
+    if cancelled is not None and cancelled():
+        raise OperationCancelled()
+
+    # 第 j 名与前面某名次国家相同即为重复；报告第一个这样的 j
+    # 逐列与其前各列比较，避免构造 k×名次×名次 的比较立方体
+    dup_at = np.zeros((k, MAX_PLACES), dtype=bool)
+    for j in range(1, MAX_PLACES):
+        dup_at[:, j] = ((ranks[:, :j] == ranks[:, j:j + 1]) & active[:, :j]).any(axis=1) & active[:, j]
+    has_dup = dup_at.any(axis=1) & ~has_bad
+    first_dup = dup_at.argmax(axis=1)
+    code[has_dup] = STATUS_DUPLICATE
+    detail[has_dup] = ranks[np.arange(k), first_dup][has_dup]
+    return code, detail
+
+
+# 变更回调：(受影响的行号, 受影响的国家编号)；整体重建时两者均为 None
+ChangeListener = Callable[[Optional[Set[int]], Optional[Set[int]]], None]
+
+
+class ScoringEngine:
+    """一场比赛的全部成绩数据与计分逻辑。
+
+    - results: int32[events, MAX_PLACES]，第 i 行第 j 列为第 i+1 个项目第 j+1 名的国家编号
+    - gender:  int8[events]，GENDER_MALE / GENDER_FEMALE
+    - rule:    int16[events]，计分规则编号（rules 的下标）
+    - top_n:   int8[events]，各项目需录入的名次数，由规则导出
+    - total / male / female: int64[n]，各国累计得分（下标为 国家编号-1），随写入增量维护
+    - 倒排索引: 国家编号 -> {(行号, 名次下标)}，批量写入后按需重建
+    - status / status_detail: 每行的校验状态码，只对改动过的行重新校验
+    """
+
+    def __init__(self):
+        self.version: int = 0
+        self._listeners: List[ChangeListener] = []
+        self.rules = RuleBook()
+        self._compile_rules()
+        self.initialize(0, 0, 0)
+
+    # --------------------------- 变更通知 ---------------------------
+    def add_listener(self, fn: ChangeListener):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn: ChangeListener):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _notify(self, rows: Optional[Set[int]], countries: Optional[Set[int]]):
+        self.version += 1
+        if rows is None:
+            self._all_dirty = True
+        else:
+            self._dirty |= rows
+        for fn in list(self._listeners):
+            fn(rows, countries)
+
+    # --------------------------- 初始化 ---------------------------
+    @timed("engine.initialize")
+    def initialize(self, n: int, m: int, w: int):
+        """按规模重建空白成绩表（默认前三）：前 m 个项目为男子项目，其余 w 个为女子项目。"""
+        self.n_countries: int = n
+        self.m_men: int = m
+        self.w_women: int = w
+        total_events = m + w
+        self.results = np.zeros((total_events, MAX_PLACES), dtype=np.int32)
+        self.gender = np.full(total_events, GENDER_FEMALE, dtype=np.int8)
+        self.gender[:m] = GENDER_MALE
+        self.rule = np.full(total_events, RULE_TOP3, dtype=np.int16)
+        self.top_n = self._places[self.rule]
+        self.total = np.zeros(n, dtype=np.int64)
+        self.male = np.zeros(n, dtype=np.int64)
+        self.female = np.zeros(n, dtype=np.int64)
+        self._index: Optional[Dict[int, Set[Tuple[int, int]]]] = {}
+        self.status = np.full(total_events, STATUS_UNCHECKED, dtype=np.int8)
+        self.status_detail = np.zeros(total_events, dtype=np.int32)
+        self._dirty: Set[int] = set()
+        self._all_dirty = True
+        self._notify(None, None)
+
+    @timed("engine.load_arrays")
+    def load_arrays(self, n: int, gender: np.ndarray, rule: np.ndarray, results: np.ndarray,
+                    scores: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                    m_men: Optional[int] = None, rules: Optional[RuleBook] = None):
+        """直接采用整块数组（导入/读档），不逐格回放；项目性别可任意排列。
+
+        rules 为空时沿用当前规则表。读档时可一并传入已保存的得分与男子项目数，
+        从而跳过全量重算。
+        """
+        if rules is not None:
+            self.rules = rules
+            self._compile_rules()
+        if len(rule) and (int(rule.min()) < 0 or int(rule.max()) >= len(self.rules)):
+            raise ValueError("计分规则编号超出规则表")
+        self.n_countries = n
+        self.gender = gender
+        self.rule = rule
+        self.top_n = self._places[rule]
+        self.results = results
+        self.m_men = int(np.count_nonzero(gender == GENDER_MALE)) if m_men is None else m_men
+        self.w_women = len(gender) - self.m_men
+        self.status = np.zeros(len(gender), dtype=np.int8)  # STATUS_UNCHECKED
+        self.status_detail = np.zeros(len(gender), dtype=np.int32)
+        self._dirty = set()
+        if scores is None:
+            self.recompute()
+        else:
+            self.total, self.male, self.female = scores
+            self._index = None
+            self._notify(None, None)
+
+    @timed("engine.materialize")
+    def materialize(self):
+        """把内存映射的数组复制进内存，释放对存档文件的引用（数据不变，不发通知）。"""
+        for name in ("gender", "rule", "results", "total", "male", "female"):
+            arr = getattr(self, name)
+            if isinstance(arr, np.memmap):
+                setattr(self, name, np.array(arr))
+
+    @property
+    def n_events(self) -> int:
+        return self.results.shape[0]
+
+    # --------------------------- 计分规则 ---------------------------
+    def _compile_rules(self):
+        self._points = self.rules.points_table()
+        self._places = self.rules.places_table()
+
+    def _check_rule_id(self, rid: int):
+        if not 0 <= rid < len(self.rules):
+            raise ValueError(f"未知的计分规则编号: {rid}")
+
+    def add_rule(self, rule: RuleSet) -> int:
+        """追加一条计分规则并返回其编号；已有项目的得分不变。"""
+        rid = self.rules.add(rule)
+        self._compile_rules()
+        return rid
+
+    def set_rules(self, rules: RuleBook):
+        """换用新的规则表：各项目按规则名称对应，分值变化后全量重算。"""
+        mapping = np.array([-1 if rules.find(name) is None else rules.find(name)
+                            for name in self.rules.names], dtype=np.int16)
+        used = np.unique(self.rule)
+        missing = [self.rules[int(r)].name for r in used if mapping[r] < 0]
+        if missing:
+            raise ValueError(f"新规则表缺少正在使用的规则: {', '.join(missing)}")
+        self.rules = rules
+        self._compile_rules()
+        self.rule = mapping[self.rule]
+        self.top_n = self._places[self.rule]
+        # 名次数变少的规则：清空多出的名次以防误统计
+        self.results[np.arange(MAX_PLACES)[None, :] >= self.top_n[:, None]] = 0
+        self.recompute()
+
+    # --------------------------- 写入 ---------------------------
+    def set_rule(self, row: int, rid: int):
+        """切换计分规则；名次数变少时清空多出的名次以防误统计。"""
+        self._check_rule_id(rid)
+        if int(self.rule[row]) == rid:
+            return
+        touched = self._apply_row(row, -1)
+        self.rule[row] = rid
+        self.top_n[row] = self._places[rid]
+        self.results[row, self.top_n[row]:] = 0
+        touched |= self._apply_row(row, +1)
+        self._notify({row}, touched)
+
+    @timed("engine.set_place")
+    def set_place(self, row: int, place: int, country: int):
+        """写入第 place+1 名（place 从 0 开始），country=0 表示清空。"""
+        old = int(self.results[row, place])
+        if old == country:
+            return
+        touched = self._apply_cell(row, place, -1)
+        self.results[row, place] = country
+        touched |= self._apply_cell(row, place, +1)
+        self._notify({row}, touched)
+
+    @timed("engine.set_event")
+    def set_event(self, row: int, rid: int, ranks: List[int]):
+        """一次写入某项目的计分规则与全部名次。"""
+        self._check_rule_id(rid)
+        if len(ranks) > self._places[rid]:
+            raise ValueError(f"规则 {self.rules[rid].name} 只录入 {self._places[rid]} 个名次")
+        touched = self._apply_row(row, -1)
+        self.rule[row] = rid
+        self.top_n[row] = self._places[rid]
+        self.results[row, :] = 0
+        self.results[row, :len(ranks)] = ranks
+        touched |= self._apply_row(row, +1)
+        self._notify({row}, touched)
+
+    # --------------------------- 增量计分 ---------------------------
+    def _apply_cell(self, row: int, place: int, sign: int) -> Set[int]:
+        """把单个名次的得分加(sign=+1)或减(sign=-1)到累计得分，返回该名次上的国家。
+
+        即使该名次不计分，国家也计入返回值：其上榜记录同样变了。
+        """
+        country = int(self.results[row, place])
+        if not (1 <= country <= self.n_countries):
+            return set()
+        if self._index is not None:
+            if sign > 0:
+                self._index.setdefault(country, set()).add((row, place))
+            else:
+                entries = self._index.get(country)
+                if entries is not None:
+                    entries.discard((row, place))
+        score = int(self._points[self.rule[row], place])
+        if score == 0:
+            return {country}
+        self.total[country - 1] += sign * score
+        if self.gender[row] == GENDER_MALE:
+            self.male[country - 1] += sign * score
+        else:
+            self.female[country - 1] += sign * score
+        return {country}
+
+    def _apply_row(self, row: int, sign: int) -> Set[int]:
+        touched: Set[int] = set()
+        for place in range(MAX_PLACES):
+            touched |= self._apply_cell(row, place, sign)
+        return touched
+
+    @timed("engine.recompute")
+    def recompute(self):
+        """全量重算累计得分（批量写入 results 之后调用）。"""
+        self.total, self.male, self.female = self.compute_scores()
+        self._index = None
+        self._notify(None, None)
+
+    # --------------------------- 倒排索引 ---------------------------
+    @timed("engine.build_index")
+    def _build_index(self) -> Dict[int, Set[Tuple[int, int]]]:
+        """按国家编号分组全部有效名次，一次排序完成。"""
+        valid = (self.results >= 1) & (self.results <= self.n_countries)
+        rows, places = np.nonzero(valid)
+        countries = self.results[rows, places]
+        order = np.argsort(countries, kind="stable")
+        rows, places, countries = rows[order], places[order], countries[order]
+        cuts = np.flatnonzero(np.diff(countries)) + 1
+        index: Dict[int, Set[Tuple[int, int]]] = {}
+        for r, p, c in zip(np.split(rows, cuts), np.split(places, cuts), np.split(countries, cuts)):
+            if len(c):
+                index[int(c[0])] = set(zip(r.tolist(), p.tolist()))
+        return index
+
+    @timed("engine.country_placings")
+    def country_placings(self, cid: int) -> List[Tuple[int, int, int]]:
+        """某国的全部上榜记录 [(项目ID, 名次, 得分)]，按项目ID升序。
+
+        只访问该国自己的索引项，耗时与其上榜次数成正比。
+        """
+        if self._index is None:
+            self._index = self._build_index()
+        out = []
+        for row, place in sorted(self._index.get(cid, ())):
+            out.append((row + 1, place + 1, int(self._points[self.rule[row], place])))
+        return out
+
+    # --------------------------- 校验 ---------------------------
+    def validate_rows(self, rows: np.ndarray):
+        """校验指定行并写入 status/status_detail。"""
+        rows = np.asarray(rows, dtype=np.intp)
+        code, detail = check_rows(self.results[rows], self.top_n[rows], self.n_countries)
+        self.status[rows] = code
+        self.status_detail[rows] = detail
+
+    def mark_all_dirty(self):
+        """下次校验时重新检查全部行。"""
+        self._all_dirty = True
+
+    def dirty_rows(self) -> np.ndarray:
+        """上次校验后改动过、需要重新校验的行。"""
+        if self._all_dirty:
+            return np.arange(self.n_events)
+        return np.fromiter(self._dirty, dtype=np.intp, count=len(self._dirty))
+
+    def apply_status(self, rows: np.ndarray, code: np.ndarray, detail: np.ndarray, version: int) -> bool:
+        """写回在 version 时刻对 rows 的校验结果（可来自后台线程）；返回是否全部通过。
+
+        若期间数据又有改动，则保留脏行标记，下次校验时再覆盖可能过期的状态。
+        """
+        self.status[rows] = code
+        self.status_detail[rows] = detail
+        if version == self.version:
+            self._dirty.clear()
+            self._all_dirty = False
+        return bool((self.status == STATUS_OK).all())
+
+    @timed("engine.validate_dirty")
+    def validate_dirty(self) -> bool:
+        """只重新校验上次校验后改动过的行；返回是否全部通过。"""
+        rows = self.dirty_rows()
+        code, detail = check_rows(self.results[rows], self.top_n[rows], self.n_countries)
+        return self.apply_status(rows, code, detail, self.version)
+
+    def status_message(self, row: int) -> str:
+        return status_text(int(self.status[row]), int(self.status_detail[row]), self.n_countries)
+
+    # --------------------------- 读取 ---------------------------
+    def event_config(self, row: int) -> EventConfig:
+        return EventConfig(
+            event_id=row + 1,
+            gender=GENDER_LABELS[int(self.gender[row])],
+            rule=self.rules[int(self.rule[row])].name,
+            top_n=int(self.top_n[row]),
+        )
+
+    def event_ranks(self, row: int) -> List[int]:
+        """返回该项目需录入的名次（长度为 top_n），未录入为 0。"""
+        need = int(self.top_n[row])
+        return [int(c) for c in self.results[row, :need]]
+
+    def event_points(self, row: int) -> List[int]:
+        """该项目第 1..top_n 名的分值（已乘倍率）。"""
+        return self._points[self.rule[row], :self.top_n[row]].tolist()
+
+    def points_matrix(self) -> np.ndarray:
+        """每个项目每个名次对应的分值，形状与 results 相同（按规则编号整块取行）。"""
+        return self._points[self.rule]
+
+    # --------------------------- 计分 ---------------------------
+    def scores(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """当前累计的 (总分, 男团总分, 女团总分)，无需重算。"""
+        return self.total, self.male, self.female
+
+    @timed("engine.sort_permutation")
+    def sort_permutation(self, key: str, asc: bool) -> np.ndarray:
+        """按 id/total/male/female 排序后的国家下标排列（稳定排序，同分按编号升序）。"""
+        if key == "id":
+            col = np.arange(1, self.n_countries + 1)
+        elif key in ("total", "male", "female"):
+            col = getattr(self, key)
+        else:
+            raise ValueError(f"未知的排序字段: {key}")
+        return np.argsort(col if asc else -col, kind="stable")
+
+    @timed("engine.compute_scores")
+    def compute_scores(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """向量化计算 (总分, 男团总分, 女团总分)，下标为 国家编号-1。
+
+        未录入(0)或超出 1..n 的国家编号不计分。
+        """
+        n = self.n_countries
+        if n <= 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty.copy(), empty.copy()
+        valid = (self.results >= 1) & (self.results <= n)
+        countries = self.results[valid] - 1
+        pts = self.points_matrix()[valid]
+        is_male = np.broadcast_to((self.gender == GENDER_MALE)[:, None], self.results.shape)[valid]
+
+        male = np.bincount(countries[is_male], weights=pts[is_male], minlength=n).astype(np.int64)
+        female = np.bincount(countries[~is_male], weights=pts[~is_male], minlength=n).astype(np.int64)
+        return male + female, male, female
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""排名与成绩的流式导出（不依赖 Qt）。
+
+三类数据，均直接从引擎数组按块取出，不经过界面表格：
+
+- standings：各国得分  country,total,male,female（按指定排序）
+- placings： 各国上榜记录  country,event_id,gender,place,points（按项目顺序，未录入与越界编号略过）
+- results：  各项目成绩  event_id,gender,rule,p1..p8（与成绩文件的导入格式相同，可再导入）
+
+三种格式：CSV、JSON Lines，以及列式二进制（.olyc）。列式文件为固定文件头、列目录、
+元数据 JSON 与各列连续的小端整数数组（8 字节对齐），可用 read_columns 内存映射读回；
+性别与规则以编号存放，对应的文字在元数据的 labels 中。
+
+导出时每次只处理 chunk_rows 行，内存占用与比赛规模无关。
+"""
+import csv
+import json
+import os
+import struct
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import GENDER_LABELS, MAX_PLACES, OperationCancelled, ScoringEngine
+from scoring_profile import timed
+
+DATASETS = ("standings", "placings", "results")
+FORMATS = ("csv", "jsonl", "columns")
+# 各格式的默认扩展名
+EXTENSIONS = {"csv": ".csv", "jsonl": ".jsonl", "columns": ".olyc"}
+CHUNK_ROWS = 16384
+
+# 列式文件：魔数, 格式版本, 列数, 行数, 元数据字节数；之后每列一项目录：列名, 类型, 偏移
+_COL_HEADER = struct.Struct("<4sHHqq")
+_COL_ENTRY = struct.Struct("<32s8sq")
+_COL_MAGIC = b"OLYC"
+_COL_VERSION = 1
+
+Chunk = Dict[str, np.ndarray]
+
+_dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+# --------------------------- 数据集 ---------------------------
+class _Dataset:
+    """一类导出数据：列定义、按块取数，以及转成 CSV 行 / JSON 记录的方式。"""
+    name = ""
+    columns: List[Tuple[str, str]] = []   # (列名, 小端类型)
+
+    def __init__(self, engine: ScoringEngine, chunk_rows: int):
+        self.engine = engine
+        self.chunk_rows = max(1, chunk_rows)
+
+    @property
+    def header(self) -> List[str]:
+        return [name for name, _ in self.columns]
+
+    def labels(self) -> Dict[str, List[str]]:
+        return {}
+
+    def n_rows(self) -> int:
+        raise NotImplementedError
+
+    def n_chunks(self) -> int:
+        return -(-self.n_rows() // self.chunk_rows)
+
+    def chunks(self) -> Iterator[Chunk]:
+        raise NotImplementedError
+
+    def csv_rows(self, chunk: Chunk) -> List[list]:
+        return list(zip(*(chunk[name].tolist() for name in self.header)))
+
+    def json_records(self, chunk: Chunk) -> List[dict]:
+        names = self.header
+        return [dict(zip(names, row)) for row in zip(*(chunk[name].tolist() for name in names))]
+
+    def jsonl_text(self, chunk: Chunk) -> str:
+        return "".join(_dumps(rec) + "\n" for rec in self.json_records(chunk))
+
+    def _format_lines(self, template: str, rows: List[tuple]) -> str:
+        """只含数字与固定文字的行直接按模板拼接，省去逐条 JSON 编码。"""
+        return "".join(template % row for row in rows)
+
+
+class _Standings(_Dataset):
+    name = "standings"
+    columns = [("country", "<i4"), ("total", "<i8"), ("male", "<i8"), ("female", "<i8")]
+
+    def __init__(self, engine: ScoringEngine, chunk_rows: int, sort: Tuple[str, bool] = ("id", True)):
+        super().__init__(engine, chunk_rows)
+        self.sort = sort
+
+    def n_rows(self) -> int:
+        return self.engine.n_countries
+
+    def chunks(self) -> Iterator[Chunk]:
+        eng = self.engine
+        perm = eng.sort_permutation(*self.sort)
+        for start in range(0, len(perm), self.chunk_rows):
+            idx = perm[start:start + self.chunk_rows]
+            yield {"country": idx + 1, "total": eng.total[idx], "male": eng.male[idx], "female": eng.female[idx]}
+
+    def jsonl_text(self, chunk: Chunk) -> str:
+        return self._format_lines('{"country":%d,"total":%d,"male":%d,"female":%d}\n', self.csv_rows(chunk))
+
+
+class _Placings(_Dataset):
+    name = "placings"
+    columns = [("country", "<i4"), ("event_id", "<i4"), ("gender", "<i1"), ("place", "<i1"), ("points", "<i8")]
+
+    def labels(self) -> Dict[str, List[str]]:
+        return {"gender": list(GENDER_LABELS)}
+
+    @property
+    def _step(self) -> int:
+        """每块的项目数：每个项目至多 MAX_PLACES 行。"""
+        return max(1, self.chunk_rows // MAX_PLACES)
+
+    def _blocks(self) -> Iterator[Tuple[int, np.ndarray]]:
+        step = self._step
+        results = self.engine.results
+        for start in range(0, len(results), step):
+            block = results[start:start + step]
+            yield start, (block >= 1) & (block <= self.engine.n_countries)
+
+    def n_rows(self) -> int:
+        return sum(int(np.count_nonzero(valid)) for _start, valid in self._blocks())
+
+    def n_chunks(self) -> int:
+        return -(-self.engine.n_events // self._step)
+
+    def chunks(self) -> Iterator[Chunk]:
+        eng = self.engine
+        table = eng.rules.points_table()
+        for start, valid in self._blocks():
+            rows, places = np.nonzero(valid)
+            rows += start
+            yield {"country": eng.results[rows, places], "event_id": rows + 1, "gender": eng.gender[rows],
+                   "place": places + 1, "points": table[eng.rule[rows], places]}
+
+    def csv_rows(self, chunk: Chunk) -> List[list]:
+        genders = np.array(GENDER_LABELS)[chunk["gender"]].tolist()
+        return list(zip(chunk["country"].tolist(), chunk["event_id"].tolist(), genders,
+                        chunk["place"].tolist(), chunk["points"].tolist()))
+
+    def json_records(self, chunk: Chunk) -> List[dict]:
+        return [dict(zip(self.header, row)) for row in self.csv_rows(chunk)]
+
+    def jsonl_text(self, chunk: Chunk) -> str:
+        return self._format_lines('{"country":%d,"event_id":%d,"gender":"%s","place":%d,"points":%d}\n',
+                                  self.csv_rows(chunk))
+
+
+class _Results(_Dataset):
+    name = "results"
+    columns = ([("event_id", "<i4"), ("gender", "<i1"), ("rule", "<i2")]
+               + [(f"p{i + 1}", "<i4") for i in range(MAX_PLACES)])
+
+    def labels(self) -> Dict[str, List[str]]:
+        return {"gender": list(GENDER_LABELS), "rule": self.engine.rules.names}
+
+    def n_rows(self) -> int:
+        return self.engine.n_events
+
+    def chunks(self) -> Iterator[Chunk]:
+        eng = self.engine
+        for start in range(0, eng.n_events, self.chunk_rows):
+            stop = min(start + self.chunk_rows, eng.n_events)
+            chunk = {"event_id": np.arange(start + 1, stop + 1), "gender": eng.gender[start:stop],
+                     "rule": eng.rule[start:stop]}
+            for i in range(MAX_PLACES):
+                chunk[f"p{i + 1}"] = eng.results[start:stop, i]
+            yield chunk
+
+    def _text_columns(self, chunk: Chunk) -> Tuple[list, list, list, np.ndarray]:
+        names = np.array(self.engine.rules.names, dtype=object)
+        ranks = np.stack([chunk[f"p{i + 1}"] for i in range(MAX_PLACES)], axis=1)
+        return (chunk["event_id"].tolist(), np.array(GENDER_LABELS)[chunk["gender"]].tolist(),
+                names[chunk["rule"]].tolist(), ranks)
+
+    def csv_rows(self, chunk: Chunk) -> List[list]:
+        # 未录入的名次写成空白，与导入格式一致
+        eids, genders, rules, ranks = self._text_columns(chunk)
+        cells = np.where(ranks == 0, "", ranks.astype(str)).tolist()
+        return [[e, g, r] + c for e, g, r, c in zip(eids, genders, rules, cells)]
+
+    def json_records(self, chunk: Chunk) -> List[dict]:
+        # 名次只列出规则需录入的个数，未录入为 0
+        eids, genders, rules, ranks = self._text_columns(chunk)
+        places = self.engine.rules.places_table()[chunk["rule"]].tolist()
+        return [{"event_id": e, "gender": g, "rule": r, "placings": row[:k]}
+                for e, g, r, row, k in zip(eids, genders, rules, ranks.tolist(), places)]
+
+
+def _dataset(engine: ScoringEngine, what: str, sort: Tuple[str, bool], chunk_rows: int) -> _Dataset:
+    if what == "standings":
+        return _Standings(engine, chunk_rows, sort)
+    if what == "placings":
+        return _Placings(engine, chunk_rows)
+    if what == "results":
+        return _Results(engine, chunk_rows)
+    raise ValueError(f"未知的导出内容: {what}")
+
+
+# --------------------------- 写出 ---------------------------
+def guess_format(path: str) -> str:
+    """按扩展名判断格式：.jsonl/.ndjson 为 JSON Lines，.olyc 为列式，其余为 CSV。"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".olyc":
+        return "columns"
+    return "csv"
+
+
+def _write_csv(f, ds: _Dataset, chunks: Iterator[Chunk]):
+    writer = csv.writer(f)
+    writer.writerow(ds.header)
+    for chunk in chunks:
+        writer.writerows(ds.csv_rows(chunk))
+
+
+def _write_jsonl(f, ds: _Dataset, chunks: Iterator[Chunk]):
+    for chunk in chunks:
+        f.write(ds.jsonl_text(chunk))
+
+
+def _write_columns(f, ds: _Dataset, chunks: Iterator[Chunk]):
+    """先写文件头与列目录，再把每块的各列写到各自区段的对应位置。"""
+    n = ds.n_rows()
+    meta = json.dumps({"dataset": ds.name, "labels": ds.labels()}, ensure_ascii=False).encode("utf-8")
+    offset = _COL_HEADER.size + _COL_ENTRY.size * len(ds.columns) + len(meta)
+    entries = []
+    for name, dtype in ds.columns:
+        offset = (offset + 7) // 8 * 8
+        entries.append((name, np.dtype(dtype), offset))
+        offset += np.dtype(dtype).itemsize * n
+    f.write(_COL_HEADER.pack(_COL_MAGIC, _COL_VERSION, len(entries), n, len(meta)))
+    for name, dtype, col_offset in entries:
+        f.write(_COL_ENTRY.pack(name.encode("utf-8"), dtype.str.encode("ascii"), col_offset))
+    f.write(meta)
+    row = 0
+    for chunk in chunks:
+        k = len(chunk[entries[0][0]])
+        for name, dtype, col_offset in entries:
+            f.seek(col_offset + row * dtype.itemsize)
+            f.write(np.ascontiguousarray(chunk[name], dtype=dtype).tobytes())
+        row += k
+    f.seek(offset)
+    f.truncate()
+
+
+@timed("export.write")
+def export(engine: ScoringEngine, path: str, what: str = "standings", fmt: Optional[str] = None,
+           sort: Tuple[str, bool] = ("id", True), chunk_rows: int = CHUNK_ROWS,
+           progress: Optional[Callable[[int, int], None]] = None,
+           cancelled: Optional[Callable[[], bool]] = None) -> int:
+    """把 what 指定的数据写到 path（先写临时文件再替换），返回写出的行数。
+
+    fmt 为空时按扩展名判断；sort 为 standings 的排序方式，同 ScoringEngine.sort_permutation。
+    每写完一块调用 progress(已写块数, 总块数)；cancelled() 为真时抛出 OperationCancelled，
+    原文件保持不变。
+    """
+    fmt = fmt or guess_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的导出格式: {fmt}")
+    ds = _dataset(engine, what, sort, chunk_rows)
+    written = 0
+
+    def counted() -> Iterator[Chunk]:
+        nonlocal written
+        total = ds.n_chunks() if progress is not None else 0
+        for i, chunk in enumerate(ds.chunks(), 1):
+            if cancelled is not None and cancelled():
+                raise OperationCancelled()
+            yield chunk
+            written += len(next(iter(chunk.values())))
+            if progress is not None:
+                progress(i, total)
+
+    tmp = path + ".tmp"
+    try:
+        if fmt == "columns":
+            with open(tmp, "wb") as f:
+                _write_columns(f, ds, counted())
+        else:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                (_write_csv if fmt == "csv" else _write_jsonl)(f, ds, counted())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return written
+
+
+# --------------------------- 读回列式文件 ---------------------------
+def read_columns(path: str) -> Tuple[Dict[str, np.ndarray], dict]:
+    """内存映射读取列式文件，返回 (列名 -> 只读数组, 元数据)；格式不符时抛出 ValueError。"""
+    with open(path, "rb") as f:
+        head = f.read(_COL_HEADER.size)
+        if len(head) < _COL_HEADER.size:
+            raise ValueError("不是有效的列式导出文件：文件过短")
+        magic, version, n_cols, n_rows, meta_len = _COL_HEADER.unpack(head)
+        if magic != _COL_MAGIC:
+            raise ValueError("不是有效的列式导出文件：魔数不符")
+        if version != _COL_VERSION:
+            raise ValueError(f"不支持的列式文件版本: {version}")
+        entries = [_COL_ENTRY.unpack(f.read(_COL_ENTRY.size)) for _ in range(n_cols)]
+        meta = json.loads(f.read(meta_len).decode("utf-8"))
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+    columns: Dict[str, np.ndarray] = {}
+    for raw_name, raw_dtype, offset in entries:
+        name = raw_name.rstrip(b"\0").decode("utf-8")
+        dtype = np.dtype(raw_dtype.rstrip(b"\0").decode("ascii"))
+        if offset + dtype.itemsize * n_rows > file_size:
+            raise ValueError("不是有效的列式导出文件：文件已截断")
+        if n_rows == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n_rows,))
+    return columns, meta
@@ -0,0 +1,964 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""奥运会积分统计器的 PyQt5 图形界面（由 olympic_scoring.py 按需加载）。"""
+import os
+from datetime import datetime
+from typing import List, Tuple, Optional
+
+import numpy as np
+from PyQt5.QtCore import Qt, QEvent, QTimer
+from PyQt5.QtGui import QIntValidator
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+    QLineEdit, QPushButton, QTabWidget, QTableWidget, QTableWidgetItem,
+    QAbstractItemView, QMessageBox, QGroupBox, QFormLayout, QHeaderView,
+    QFileDialog, QProgressBar, QCheckBox, QComboBox, QStackedWidget, QInputDialog
+)
+
+from scoring_cache import ResultCache, country_tag, event_tag
+from scoring_engine import EventConfig, ScoringEngine, check_rows
+from scoring_export import EXTENSIONS, export, guess_format
+from scoring_io import import_results, save_competition, load_competition
+from scoring_journal import Journal
+from scoring_leaderboard import Leaderboard
+from scoring_medals import SCOPE_LABELS
+from scoring_models import (
+    EntryTableModel, StatsTableModel, MedalTableModel, RuleDelegate, CountryDelegate, TimedTableView,
+    COL_RULE, COL_FIRST_PLACE, COL_STATUS
+)
+from scoring_profile import INSTRUMENTATION, stage, timed
+from scoring_project import build_problem, projection_rows, run_projection
+from scoring_query import AGGREGATES, COUNTRIES, PLACINGS, QueryEngine, QueryError
+from scoring_rules import RuleBook, load_rules
+from scoring_server import LiveServer
+from scoring_workers import TaskRunner
+
+class OlympicsScoringApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("奥运会积分统计器")
+        self.resize(1100, 700)
+
+        # 成绩数据与计分逻辑（界面只是它的视图）
+        self.engine = ScoringEngine()
+        # 查询与排序结果缓存：改动只作废受影响的条目；须最先注册监听，视图取数时不会读到过期结果
+        self.cache = ResultCache(self.engine)
+        # 实时排行榜：须先于统计表模型注册监听，模型取数时排行已是最新
+        self.leaderboard = Leaderboard(self.engine)
+        # 条件查询：列式表按引擎版本缓存
+        self.query = QueryEngine(self.engine, self.cache)
+
+        # 导入、校验等耗时操作放到线程池执行
+        self.tasks = TaskRunner(self)
+        # 录入日志：由 open_journal 启用，崩溃后可恢复
+        self.journal: Optional[Journal] = None
+
+        # UI
+        self._build_ui()
+        self.engine.add_listener(self._on_engine_reset)
+
+    # 全局参数
+    @property
+    def n_countries(self) -> int:
+        return self.engine.n_countries
+
+    @property
+    def m_men(self) -> int:
+        return self.engine.m_men
+
+    @property
+    def w_women(self) -> int:
+        return self.engine.w_women
+
+    # --------------------------- UI 构建 ---------------------------
+    def _build_ui(self):
+        central = QWidget()
+        self.setCentralWidget(central)
+        root = QVBoxLayout(central)
+
+        # 顶部初始化区域
+        init_box = QGroupBox("比赛规模设置")
+        init_layout = QFormLayout(init_box)
+        self.edit_n = QLineEdit(); self.edit_n.setValidator(QIntValidator(1, 9999))
+        self.edit_m = QLineEdit(); self.edit_m.setValidator(QIntValidator(0, 9999))
+        self.edit_w = QLineEdit(); self.edit_w.setValidator(QIntValidator(0, 9999))
+        self.edit_n.setPlaceholderText("国家数量 n (>=1)")
+        self.edit_m.setPlaceholderText("男子项目数 m (>=0)")
+        self.edit_w.setPlaceholderText("女子项目数 w (>=0)")
+        init_layout.addRow("国家数量 n:", self.edit_n)
+        init_layout.addRow("男子项目数 m:", self.edit_m)
+        init_layout.addRow("女子项目数 w:", self.edit_w)
+        btn_init = QPushButton("初始化比赛与录入表")
+        btn_init.clicked.connect(lambda: self.on_initialize())
+        init_layout.addRow(btn_init)
+        root.addWidget(init_box)
+
+        # 选项卡
+        self.tabs = QTabWidget()
+        root.addWidget(self.tabs, 1)
+        # 选项卡切换时，确保录入表列宽立即刷新
+        self.tabs.currentChanged.connect(self._on_tab_changed)
+
+        # 录入页
+        self.tab_entry = QWidget(); self.tabs.addTab(self.tab_entry, "① 成绩录入")
+        self._build_entry_tab()
+
+        # 统计页
+        self.tab_stats = QWidget(); self.tabs.addTab(self.tab_stats, "② 排名统计")
+        self._build_stats_tab()
+
+        # 查询页
+        self.tab_query = QWidget(); self.tabs.addTab(self.tab_query, "③ 条件查询")
+        self._build_query_tab()
+
+        # 预测页
+        self.tab_project = QWidget(); self.tabs.addTab(self.tab_project, "④ 形势预测")
+        self._build_project_tab()
+
+        # 诊断页
+        self.tab_diag = QWidget(); self.tabs.addTab(self.tab_diag, "⑤ 诊断")
+        self._build_diag_tab()
+
+        # 状态栏：后台任务进度与取消
+        self.lbl_task = QLabel()
+        self.progress_task = QProgressBar(); self.progress_task.setMaximumWidth(240)
+        self.btn_cancel_task = QPushButton("取消")
+        self.btn_cancel_task.clicked.connect(lambda: self.tasks.cancel())
+        for w in (self.lbl_task, self.progress_task, self.btn_cancel_task):
+            self.statusBar().addPermanentWidget(w)
+            w.setVisible(False)
+        self.tasks.progress.connect(self._on_task_progress)
+        self.tasks.busy_changed.connect(self._on_tasks_busy)
+
+    def _build_entry_tab(self):
+        layout = QVBoxLayout(self.tab_entry)
+        tip = QLabel("提示：初始化后在下表逐行录入各项目的名次(国家编号 1..n)。选择计分规则会按其名次数启用/禁用名次列；"
+                     "可通过‘载入计分规则…’添加前八、团体加权等自定义规则。")
+        tip.setWordWrap(True)
+        layout.addWidget(tip)
+
+        # 成绩录入表：模型直接读写引擎，只绘制可见行，编辑器按需创建
+        self.entry_model = EntryTableModel(self.engine, self)
+        self.table_entry = TimedTableView("entry")
+        self.table_entry.setModel(self.entry_model)
+        self.table_entry.setItemDelegateForColumn(COL_RULE, RuleDelegate(self.engine, self.table_entry))
+        country_delegate = CountryDelegate(self.engine, self.table_entry)
+        for col in range(COL_FIRST_PLACE, COL_STATUS):
+            self.table_entry.setItemDelegateForColumn(col, country_delegate)
+        # 固定行高，避免大表按内容逐行测量
+        self.table_entry.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # 录入表列宽：状态列之前各列等宽，状态列双倍；并随窗口宽度自适应
+        self.table_entry.setEditTriggers(QAbstractItemView.AllEditTriggers)
+        layout.addWidget(self.table_entry, 1)
+        self._configure_entry_header()
+
+        # 操作区
+        ops = QHBoxLayout()
+        self.btn_validate = QPushButton("快速校验全部")
+        self.btn_validate.clicked.connect(lambda: self.validate_all_rows())
+        self.btn_compute = QPushButton("统计得分")
+        self.btn_compute.clicked.connect(lambda: self.compute_scores_and_refresh())
+        self.btn_fill = QPushButton("填充示例数据（含初始化）")
+        self.btn_fill.clicked.connect(lambda: self.fill_example_data())
+        self.btn_import = QPushButton("导入成绩文件…")
+        self.btn_import.clicked.connect(lambda: self.on_import())
+        ops.addWidget(self.btn_validate)
+        ops.addWidget(self.btn_compute)
+        ops.addWidget(self.btn_fill)
+        self.btn_save = QPushButton("保存比赛…")
+        self.btn_save.clicked.connect(lambda: self.on_save())
+        self.btn_open = QPushButton("打开比赛…")
+        self.btn_open.clicked.connect(lambda: self.on_open())
+        self.btn_rules = QPushButton("载入计分规则…")
+        self.btn_rules.clicked.connect(lambda: self.on_load_rules())
+        ops.addWidget(self.btn_import)
+        ops.addWidget(self.btn_save)
+        ops.addWidget(self.btn_open)
+        ops.addWidget(self.btn_rules)
+        ops.addStretch(1)
+        layout.addLayout(ops)
+
+    def _build_stats_tab(self):
+        layout = QVBoxLayout(self.tab_stats)
+
+        # 排序按钮区；奖牌榜视图下换成统计范围与排名依据
+        sort_bar = QHBoxLayout()
+        self.combo_stats_view = QComboBox()
+        self.combo_stats_view.addItems(["积分榜", "奖牌榜"])
+        self.combo_stats_view.currentIndexChanged.connect(self._on_stats_view_changed)
+        sort_bar.addWidget(self.combo_stats_view)
+        self.lbl_sort = QLabel("排序方式：")
+        sort_bar.addWidget(self.lbl_sort)
+        self.btn_sort_id = QPushButton("按国家编号↑")
+        self.btn_sort_total = QPushButton("按总分↓")
+        self.btn_sort_male = QPushButton("按男团总分↓")
+        self.btn_sort_female = QPushButton("按女团总分↓")
+        for b in (self.btn_sort_id, self.btn_sort_total, self.btn_sort_male, self.btn_sort_female):
+            sort_bar.addWidget(b)
+        self.combo_medal_scope = QComboBox()
+        for scope, label in SCOPE_LABELS.items():
+            self.combo_medal_scope.addItem(label, scope)
+        self.combo_medal_keys = QComboBox()
+        for label, keys in self._MEDAL_TIEBREAKS:
+            self.combo_medal_keys.addItem(label, keys)
+        self._medal_widgets = (self.combo_medal_scope, self.combo_medal_keys)
+        for w in self._medal_widgets:
+            w.currentIndexChanged.connect(self._on_medal_options_changed)
+            w.setVisible(False)
+            sort_bar.addWidget(w)
+        sort_bar.addStretch(1)
+        self.btn_export = QPushButton("导出…")
+        self.btn_export.clicked.connect(lambda: self.on_export())
+        sort_bar.addWidget(self.btn_export)
+        # 实时发布：供投影等显示端订阅，录入时只推送变化的行
+        self.live_server: Optional[LiveServer] = None
+        self.chk_live = QCheckBox("实时发布")
+        self.chk_live.toggled.connect(self._on_live_toggled)
+        self.lbl_live = QLabel()
+        self.lbl_live.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        sort_bar.addWidget(self.chk_live)
+        sort_bar.addWidget(self.lbl_live)
+        layout.addLayout(sort_bar)
+
+        self.btn_sort_id.clicked.connect(lambda: self.refresh_stats_table(sort_key=("id", True)))
+        self.btn_sort_total.clicked.connect(lambda: self.refresh_stats_table(sort_key=("total", False)))
+        self.btn_sort_male.clicked.connect(lambda: self.refresh_stats_table(sort_key=("male", False)))
+        self.btn_sort_female.clicked.connect(lambda: self.refresh_stats_table(sort_key=("female", False)))
+
+        # 统计表：模型直接读取得分数组，录入时实时更新
+        self.stats_model = StatsTableModel(self.engine, self.leaderboard, self.cache, self)
+        self.table_stats = TimedTableView("stats")
+        self.table_stats.setModel(self.stats_model)
+        # 奖牌榜：金银铜按性别统计，并列的国家名次相同
+        self.medal_model = MedalTableModel(self.engine, self.cache, self)
+        self.table_medals = TimedTableView("medals")
+        self.table_medals.setModel(self.medal_model)
+        self.stack_stats = QStackedWidget()
+        for table in (self.table_stats, self.table_medals):
+            table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+            # 让所有列等比例分配宽度
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            self.stack_stats.addWidget(table)
+        layout.addWidget(self.stack_stats, 1)
+
+    # 奖牌榜的排名依据：(显示名称, 依次比较的关键字)
+    _MEDAL_TIEBREAKS = (
+        ("总分→金→银→铜", ("total", "gold", "silver", "bronze")),
+        ("金→银→铜", ("gold", "silver", "bronze")),
+        ("奖牌总数→金→银→铜", ("medals", "gold", "silver", "bronze")),
+    )
+
+    def _on_stats_view_changed(self, index: int):
+        medals = index == 1
+        self.stack_stats.setCurrentIndex(index)
+        for w in (self.lbl_sort, self.btn_sort_id, self.btn_sort_total, self.btn_sort_male, self.btn_sort_female):
+            w.setVisible(not medals)
+        for w in self._medal_widgets:
+            w.setVisible(medals)
+
+    def _on_medal_options_changed(self):
+        self.medal_model.set_options(self.combo_medal_scope.currentData(), self.combo_medal_keys.currentData())
+
+    def _build_query_tab(self):
+        # 左侧按编号查询，右侧条件查询；并排放置，不抬高窗口的最小高度
+        row = QHBoxLayout(self.tab_query)
+        layout = QVBoxLayout()
+        row.addLayout(layout, 1)
+
+        # 按国家查
+        box_country = QGroupBox("按国家编号查询")
+        f1 = QFormLayout(box_country)
+        self.edit_query_country = QLineEdit(); self.edit_query_country.setValidator(QIntValidator(1, 999999))
+        btn_q1 = QPushButton("查询国家参赛情况")
+        btn_q1.clicked.connect(lambda: self.query_by_country())
+        f1.addRow("国家编号:", self.edit_query_country)
+        f1.addRow(btn_q1)
+        self.lbl_country_rank = QLabel()
+        f1.addRow(self.lbl_country_rank)
+        layout.addWidget(box_country)
+
+        self.table_q_country = QTableWidget(0, 5)
+        self.table_q_country.setHorizontalHeaderLabels(["项目ID", "性别", "名次", "得分", "说明"])
+        # 让所有列等比例分配宽度
+        self.table_q_country.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table_q_country)
+
+        # 按项目查
+        box_event = QGroupBox("按项目编号查询")
+        f2 = QFormLayout(box_event)
+        self.edit_query_event = QLineEdit(); self.edit_query_event.setValidator(QIntValidator(1, 10**9))
+        btn_q2 = QPushButton("查询该项目获奖国家")
+        btn_q2.clicked.connect(lambda: self.query_by_event())
+        f2.addRow("项目编号:", self.edit_query_event)
+        f2.addRow(btn_q2)
+        layout.addWidget(box_event)
+
+        self.table_q_event = QTableWidget(0, 3)
+        self.table_q_event.setHorizontalHeaderLabels(["名次", "国家编号", "得分"])
+        # 让所有列等比例分配宽度
+        self.table_q_event.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table_q_event)
+
+        # 条件查询
+        layout = QVBoxLayout()
+        row.addLayout(layout, 1)
+        box_where = QGroupBox("条件查询")
+        f3 = QFormLayout(box_where)
+        self.combo_q_table = QComboBox()
+        self.combo_q_table.addItem("名次表（项目/性别/规则/名次/国家/得分）", PLACINGS)
+        self.combo_q_table.addItem("国家表（国家/总分/男团/女团/金银铜/上榜次数）", COUNTRIES)
+        self.edit_q_where = QLineEdit()
+        self.edit_q_where.setPlaceholderText("例如：性别 == '女' and 名次 <= 3，留空为全部")
+        self.edit_q_where.returnPressed.connect(lambda: self.query_by_condition())
+        row_group = QHBoxLayout()
+        self.edit_q_group = QLineEdit(); self.edit_q_group.setPlaceholderText("分组列，逗号分隔（可空）")
+        self.combo_q_agg = QComboBox(); self.combo_q_agg.addItems(AGGREGATES)
+        self.edit_q_value = QLineEdit(); self.edit_q_value.setPlaceholderText("统计列")
+        for w in (self.edit_q_group, self.combo_q_agg, self.edit_q_value):
+            row_group.addWidget(w)
+        row_order = QHBoxLayout()
+        self.edit_q_order = QLineEdit(); self.edit_q_order.setPlaceholderText("排序列（可空）")
+        self.chk_q_desc = QCheckBox("降序")
+        self.edit_q_limit = QLineEdit("1000"); self.edit_q_limit.setValidator(QIntValidator(1, 10**7))
+        btn_q3 = QPushButton("查询")
+        btn_q3.clicked.connect(lambda: self.query_by_condition())
+        for w in (self.edit_q_order, self.chk_q_desc, QLabel("最多行数:"), self.edit_q_limit, btn_q3):
+            row_order.addWidget(w)
+        f3.addRow("数据表:", self.combo_q_table)
+        f3.addRow("条件:", self.edit_q_where)
+        f3.addRow("分组统计:", row_group)
+        f3.addRow("排序:", row_order)
+        layout.addWidget(box_where)
+
+        self.table_q_where = QTableWidget(0, 0)
+        self.table_q_where.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table_q_where)
+
+    def _build_project_tab(self):
+        layout = QVBoxLayout(self.tab_project)
+        tip = QLabel("保持已录入的名次不变，随机模拟尚未录入的名次，估计各国最终名次的分布。"
+                     "“按实力”模型中，当前得分越高的国家越容易获得待定名次。")
+        tip.setWordWrap(True)
+        layout.addWidget(tip)
+
+        bar = QHBoxLayout()
+        self.edit_proj_sims = QLineEdit("100000"); self.edit_proj_sims.setValidator(QIntValidator(1, 10**8))
+        self.combo_proj_model = QComboBox()
+        self.combo_proj_model.addItem("各国机会均等", "uniform")
+        self.combo_proj_model.addItem("按实力（当前得分）", "strength")
+        self.combo_proj_key = QComboBox()
+        for label, key in (("总分", "total"), ("男团", "male"), ("女团", "female")):
+            self.combo_proj_key.addItem(label, key)
+        self.edit_proj_ranks = QLineEdit("10"); self.edit_proj_ranks.setValidator(QIntValidator(1, 100))
+        btn_project = QPushButton("开始预测")
+        btn_project.clicked.connect(lambda: self.on_project())
+        for w in (QLabel("模拟次数:"), self.edit_proj_sims, QLabel("模型:"), self.combo_proj_model,
+                  QLabel("排名依据:"), self.combo_proj_key, QLabel("统计前几名:"), self.edit_proj_ranks, btn_project):
+            bar.addWidget(w)
+        bar.addStretch(1)
+        layout.addLayout(bar)
+
+        self.lbl_project = QLabel()
+        layout.addWidget(self.lbl_project)
+        self.table_project = QTableWidget(0, 0)
+        layout.addWidget(self.table_project, 1)
+
+    def _build_diag_tab(self):
+        layout = QVBoxLayout(self.tab_diag)
+        tip = QLabel("启用计时后，各操作及其内部阶段（读表、校验、计分、排序、重绘等）的调用次数与耗时"
+                     "按调用层级累计；未启用时几乎没有额外开销。")
+        tip.setWordWrap(True)
+        layout.addWidget(tip)
+
+        bar = QHBoxLayout()
+        self.chk_profile = QCheckBox("启用计时")
+        self.chk_profile.toggled.connect(self._on_profile_toggled)
+        btn_refresh = QPushButton("刷新")
+        btn_refresh.clicked.connect(lambda: self.refresh_diag_table())
+        btn_clear = QPushButton("清空")
+        btn_clear.clicked.connect(self._on_profile_clear)
+        btn_export = QPushButton("导出…")
+        btn_export.clicked.connect(lambda: self.on_export_profile())
+        for w in (self.chk_profile, btn_refresh, btn_clear, btn_export):
+            bar.addWidget(w)
+        bar.addStretch(1)
+        layout.addLayout(bar)
+
+        self.lbl_cache = QLabel()
+        layout.addWidget(self.lbl_cache)
+
+        self.table_diag = QTableWidget(0, 5)
+        self.table_diag.setHorizontalHeaderLabels(["阶段", "调用次数", "总耗时(ms)", "平均(ms)", "最长(ms)"])
+        self.table_diag.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table_diag.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        layout.addWidget(self.table_diag, 1)
+
+    # --------------------------- 列宽控制（录入表） ---------------------------
+    def _configure_entry_header(self):
+        """将录入表设置为可交互列宽，并做比例分配：0..7 等宽，列8为双倍。"""
+        header = self.table_entry.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setMinimumSectionSize(60)
+        # 监听视口尺寸变化，避免初次显示时留白
+        self.table_entry.viewport().installEventFilter(self)
+        self._resize_entry_columns()
+
+    def _resize_entry_columns(self):
+        if not hasattr(self, 'table_entry'):
+            return
+        # 优先用 viewport 宽度；若为 0，退化为表格宽度估计
+        total_w = self.table_entry.viewport().width()
+        if total_w <= 0:
+            total_w = max(0, self.table_entry.width() - self.table_entry.verticalHeader().width() - 4)
+        # 10 份：前8列各1份，最后一列2份
+        unit = max(1, total_w // 10)
+        for c in range(8):
+            self.table_entry.setColumnWidth(c, unit)
+        self.table_entry.setColumnWidth(8, unit * 2)
+
+    def _on_tab_changed(self, idx: int):
+        # 切到录入页立即刷新列宽，避免初次显示留白
+        w = self.tabs.widget(idx)
+        if w is self.tab_entry:
+            QTimer.singleShot(0, self._resize_entry_columns)
+        elif w is self.tab_diag:
+            self.refresh_diag_table()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # 窗口首次显示后，等布局稳定再拉伸一次，修复初始右侧留白
+        QTimer.singleShot(0, self._resize_entry_columns)
+
+    def eventFilter(self, obj, event):
+        # 视口尺寸变化时重算列宽（例如首次布局、切换 DPI、显示滚动条等）
+        if obj is getattr(self, 'table_entry', None) and event.type() == QEvent.Resize:
+            self._resize_entry_columns()
+        if hasattr(self, 'table_entry') and obj is self.table_entry.viewport() and event.type() == QEvent.Resize:
+            self._resize_entry_columns()
+        return super().eventFilter(obj, event)
+
+    def _resize_entry_columns(self):
+        if not hasattr(self, 'table_entry'):
+            return
+        total_w = max(0, self.table_entry.viewport().width())
+        # 状态列之前各列各1份，状态列2份
+        unit = max(1, total_w // (COL_STATUS + 2))
+        for c in range(COL_STATUS):
+            self.table_entry.setColumnWidth(c, unit)
+        self.table_entry.setColumnWidth(COL_STATUS, unit * 2)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 窗口尺寸变化时，重新按比例分配录入表列宽
+        if hasattr(self, 'table_entry'):
+            self._resize_entry_columns()
+
+    # --------------------------- 初始化/构表 ---------------------------
+    def on_initialize(self):
+        try:
+            n = int(self.edit_n.text())
+            m = int(self.edit_m.text())
+            w = int(self.edit_w.text())
+        except ValueError:
+            QMessageBox.warning(self, "参数错误", "请正确输入 n / m / w 为整数。")
+            return
+        if n < 1 or m < 0 or w < 0:
+            QMessageBox.warning(self, "参数错误", "需满足 n>=1, m>=0, w>=0。")
+            return
+        if m == 0 and w == 0:
+            QMessageBox.warning(self, "参数错误", "至少需要 1 个项目。")
+            return
+
+        # 计时只覆盖重建与重绘，不含对话框停留时间
+        with stage("操作.初始化"):
+            # 重建成绩数据（默认前三）；录入表模型随之重置
+            self.engine.initialize(n, m, w)
+            total_events = m + w
+
+            # 初始化后立即按比例设置列宽
+            self._resize_entry_columns()
+        QMessageBox.information(self, "初始化完成", f"已创建 {total_events} 个项目（男 {m}、女 {w}），国家数 {n}。")
+
+    # --------------------------- 校验与读表 ---------------------------
+    def validate_all_rows(self):
+        """批量校验：只重新检查改动过的行，状态列由模型按需渲染。"""
+        self._start_validation(show_stats=False)
+
+    def _start_validation(self, show_stats: bool):
+        """在后台线程校验脏行的快照；重复点击会合并为一次。"""
+        rows = self.engine.dirty_rows()
+        version = self.engine.version
+        ranks, top_n, n = self.engine.results[rows], self.engine.top_n[rows], self.n_countries
+
+        def job(progress, cancelled):
+            return check_rows(ranks, top_n, n, cancelled)
+
+        def done(result):
+            code, detail = result
+            all_ok = self.engine.apply_status(rows, code, detail, version)
+            self.entry_model.refresh_status()
+            if all_ok:
+                QMessageBox.information(self, "校验完成", "所有项目录入有效。")
+            else:
+                QMessageBox.warning(self, "校验完成", "存在录入问题，请根据‘校验状态’列逐项修正。")
+            if show_stats:
+                self.tabs.setCurrentWidget(self.tab_stats)
+
+        # 校验本身在工作线程中计时；界面线程上只是提交任务，几乎不耗时
+        self.tasks.submit("validate", "正在校验…", job, done, self._on_task_failed, stage_name="操作.快速校验")
+
+    @timed("gui._read_event_row")
+    def _read_event_row(self, row: int) -> Tuple[EventConfig, List[int]]:
+        return self.engine.event_config(row), self.engine.event_ranks(row)
+
+    # --------------------------- 统计与展示 ---------------------------
+    def compute_scores(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """返回 (总分, 男团总分, 女团总分) 数组，下标为 国家编号-1。"""
+        return self.engine.scores()
+
+    @timed("操作.统计得分")
+    def compute_scores_and_refresh(self):
+        # 得分由引擎实时维护；这里只需校验，完成后切到统计页
+        self.refresh_stats_table()
+        self._start_validation(show_stats=True)
+
+    @timed("操作.统计排序")
+    def refresh_stats_table(self, sort_key: Optional[Tuple[str, bool]] = None):
+        """切换统计表排序；得分本身由模型实时读取，无需重建表项。"""
+        self.stats_model.set_sort(sort_key if sort_key is not None else self.stats_model.sort_key)
+
+    # --------------------------- 示例数据填充 ---------------------------
+    def fill_example_data(self):
+        """一键填充示例：n=7, m=3, w=2，并预置每个项目的名次。"""
+        # 1) 设置规模并初始化
+        self.edit_n.setText("7"); self.edit_m.setText("3"); self.edit_w.setText("2")
+        self.on_initialize()
+
+        # 2) 逐项目配置：("前三"/"前五", [第一, 第二, 第三, (可选)第四, (可选)第五])
+        sample = [
+            ("前五", [1, 2, 3, 4, 5]),
+            ("前三", [3, 1, 2]),
+            ("前五", [2, 4, 6, 1, 7]),
+            ("前三", [5, 4, 1]),
+            ("前五", [7, 5, 2, 3, 6]),
+        ]
+        for row, (mode, ranks) in enumerate(sample):
+            self.engine.set_event(row, self.engine.rules.find(mode), ranks)
+
+        # 3) 校验并统计，完成后切换到统计页
+        self.compute_scores_and_refresh()
+
+    # --------------------------- 文件导入 ---------------------------
+    def on_import(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "导入成绩文件", "", "成绩文件 (*.csv *.jsonl *.ndjson);;所有文件 (*)")
+        if not path:
+            return
+        # 已填写国家数量则按其校验编号范围，否则取文件中的最大编号
+        n_text = self.edit_n.text().strip()
+        n = int(n_text) if n_text else None
+        rules = self.engine.rules
+
+        def job(progress, cancelled):
+            # 在独立引擎上解析（沿用当前规则表），完成后由界面线程整体接管数组
+            staging = ScoringEngine()
+            staging.set_rules(rules)
+            report = import_results(path, staging, n_countries=n, progress=progress, cancelled=cancelled)
+            return staging, report
+
+        def done(result):
+            staging, report = result
+            self.engine.load_arrays(staging.n_countries, staging.gender, staging.rule, staging.results,
+                                    scores=staging.scores(), m_men=staging.m_men, rules=staging.rules)
+            self._sync_scale_fields()
+            msg = report.summary()
+            if report.errors:
+                shown = "\n".join(f"第{ln}行：{err}" for ln, err in report.errors[:20])
+                more = "\n……" if report.error_count > 20 else ""
+                QMessageBox.warning(self, "导入完成（有错误行）", f"{msg}\n\n{shown}{more}")
+            else:
+                QMessageBox.information(self, "导入完成", msg)
+
+        self.tasks.submit("import", "正在导入…", job, done, self._on_task_failed)
+
+    def _sync_scale_fields(self):
+        """整体载入数据后，把规模回填到顶部输入框。"""
+        self.edit_n.setText(str(self.n_countries))
+        self.edit_m.setText(str(self.m_men))
+        self.edit_w.setText(str(self.w_women))
+        self._resize_entry_columns()
+
+    # --------------------------- 后台任务 ---------------------------
+    def _on_engine_reset(self, rows, countries):
+        # 数据被整体替换后，针对旧数据的校验结果已无意义
+        if rows is None:
+            self.tasks.cancel("validate")
+
+    def _on_task_progress(self, label: str, done: int, total: int):
+        self.lbl_task.setText(label)
+        self.progress_task.setRange(0, 100 if total else 0)  # 总量未知时显示忙碌动画
+        if total:
+            self.progress_task.setValue(int(done * 100 / total))
+
+    def _on_tasks_busy(self, busy: bool):
+        for w in (self.lbl_task, self.progress_task, self.btn_cancel_task):
+            w.setVisible(busy)
+
+    def _on_task_failed(self, msg: str):
+        QMessageBox.warning(self, "操作失败", msg)
+
+    # --------------------------- 存档 ---------------------------
+    def on_save(self):
+        if self.n_countries <= 0:
+            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "保存比赛", "", "比赛存档 (*.olys)")
+        if not path:
+            return
+        if not path.lower().endswith(".olys"):
+            path += ".olys"
+        try:
+            save_competition(path, self.engine)
+        except OSError as e:
+            QMessageBox.warning(self, "保存失败", f"无法写入文件：{e}")
+            return
+        QMessageBox.information(self, "保存完成", f"已保存到 {path}")
+
+    # 导出内容：(显示名称, 数据集)
+    _EXPORT_DATASETS = (
+        ("排名统计（各国得分，按当前排序）", "standings"),
+        ("各国上榜记录", "placings"),
+        ("各项目成绩（可再导入）", "results"),
+    )
+    _EXPORT_FILTERS = {"CSV (*.csv)": "csv", "JSON Lines (*.jsonl)": "jsonl", "列式二进制 (*.olyc)": "columns"}
+
+    def on_export(self):
+        """在后台按当前数据的副本流式写出，录入不受影响。"""
+        if self.n_countries <= 0:
+            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
+            return
+        labels = [label for label, _ in self._EXPORT_DATASETS]
+        label, ok = QInputDialog.getItem(self, "导出", "导出内容：", labels, 0, False)
+        if not ok:
+            return
+        what = dict(self._EXPORT_DATASETS)[label]
+        path, selected = QFileDialog.getSaveFileName(self, "导出", "", ";;".join(self._EXPORT_FILTERS))
+        if not path:
+            return
+        # 输入了扩展名时以扩展名为准，否则按所选的文件类型补上
+        if os.path.splitext(path)[1]:
+            fmt = guess_format(path)
+        else:
+            fmt = self._EXPORT_FILTERS.get(selected, "csv")
+            path += EXTENSIONS[fmt]
+
+        eng = self.engine
+        staging = ScoringEngine()
+        staging.load_arrays(eng.n_countries, np.array(eng.gender), np.array(eng.rule), np.array(eng.results),
+                            scores=tuple(np.array(a) for a in eng.scores()), m_men=eng.m_men,
+                            rules=RuleBook.from_json(eng.rules.to_json()))
+        sort = self.stats_model.sort_key
+
+        def job(progress, cancelled):
+            return export(staging, path, what, fmt, sort, progress=progress, cancelled=cancelled)
+
+        def done(rows):
+            QMessageBox.information(self, "导出完成", f"已导出 {rows} 行到 {path}")
+
+        self.tasks.submit("export", "正在导出…", job, done, self._on_task_failed)
+
+    def on_load_rules(self):
+        path, _ = QFileDialog.getOpenFileName(self, "载入计分规则", "", "规则文件 (*.json);;所有文件 (*)")
+        if not path:
+            return
+        try:
+            rules = load_rules(path)
+            self.engine.set_rules(rules)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "载入失败", str(e))
+            return
+        QMessageBox.information(self, "载入完成", "当前计分规则：" + "、".join(rules.names))
+
+    def on_open(self):
+        path, _ = QFileDialog.getOpenFileName(self, "打开比赛", "", "比赛存档 (*.olys);;所有文件 (*)")
+        if not path:
+            return
+        try:
+            load_competition(path, self.engine)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "打开失败", str(e))
+            return
+        self._sync_scale_fields()
+
+    # --------------------------- 查询 ---------------------------
+    @timed("操作.按国家查询")
+    def query_by_country(self):
+        if self.n_countries <= 0:
+            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
+            return
+        try:
+            cid = int(self.edit_query_country.text())
+        except ValueError:
+            QMessageBox.warning(self, "输入错误", "请输入有效的国家编号。")
+            return
+        if not (1 <= cid <= self.n_countries):
+            QMessageBox.warning(self, "输入错误", f"国家编号需在 1..{self.n_countries}。")
+            return
+
+        # 通过倒排索引只取该国家的上榜记录，耗时与其上榜次数成正比；该国上榜记录不变时直接取缓存
+        out = self.cache.get_or_compute(("gui.country", cid), lambda: self._country_rows(cid), (country_tag(cid),))
+        lb = self.leaderboard
+        self.lbl_country_rank.setText(
+            f"总分第 {lb.rank('total', cid)} 名（{lb.score('total', cid)} 分），"
+            f"男团第 {lb.rank('male', cid)} 名，女团第 {lb.rank('female', cid)} 名（同分并列）")
+
+        # 填表
+        self.table_q_country.setRowCount(len(out))
+        for r, (eid, g, place, score, note) in enumerate(out):
+            self._set_item(self.table_q_country, r, 0, (str(eid) if eid else "-"))
+            self._set_item(self.table_q_country, r, 1, g)
+            self._set_item(self.table_q_country, r, 2, (str(place) if place else "-"))
+            self._set_item(self.table_q_country, r, 3, str(score))
+            self._set_item(self.table_q_country, r, 4, note)
+
+    @timed("操作.按项目查询")
+    def query_by_event(self):
+        if self.n_countries <= 0:
+            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
+            return
+        try:
+            eid = int(self.edit_query_event.text())
+        except ValueError:
+            QMessageBox.warning(self, "输入错误", "请输入有效的项目编号。")
+            return
+        total_events = self.engine.n_events
+        if not (1 <= eid <= total_events):
+            QMessageBox.warning(self, "输入错误", f"项目编号需在 1..{total_events}。")
+            return
+
+        row = eid - 1
+        cfg, ranks, pts = self.cache.get_or_compute(
+            ("gui.event", row), lambda: self._read_event_row(row) + (self.engine.event_points(row),),
+            (event_tag(row),))
+
+        # 输出该项目的上榜国家
+        self.table_q_event.setRowCount(len(ranks))
+        for i, cid in enumerate(ranks):
+            self._set_item(self.table_q_event, i, 0, f"第{i+1}名")
+            self._set_item(self.table_q_event, i, 1, str(cid) if cid else "-")
+            self._set_item(self.table_q_event, i, 2, str(pts[i]))
+
+    def _country_rows(self, cid: int) -> List[Tuple[Optional[int], str, Optional[int], int, str]]:
+        out = [(eid, self.engine.event_config(eid - 1).gender, place, score, "")
+               for eid, place, score in self.engine.country_placings(cid)]
+        if not out:
+            out.append((None, "-", None, 0, "未上榜"))
+        return out
+
+    @timed("操作.条件查询")
+    def query_by_condition(self):
+        """有分组列或统计方式不是 count 时做分组统计，否则列出满足条件的行。"""
+        if self.n_countries <= 0:
+            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
+            return
+        table = self.combo_q_table.currentData()
+        where = self.edit_q_where.text().strip()
+        group_by = [c.strip() for c in self.edit_q_group.text().split(",") if c.strip()]
+        agg = self.combo_q_agg.currentText()
+        value = self.edit_q_value.text().strip() or None
+        limit = int(self.edit_q_limit.text()) if self.edit_q_limit.text() else None
+        try:
+            if group_by or agg != "count" or value:
+                result = self.query.aggregate(table, where, group_by, agg, value)
+            else:
+                result = self.query.select(table, where, self.edit_q_order.text().strip() or None,
+                                           self.chk_q_desc.isChecked(), limit)
+        except QueryError as e:
+            QMessageBox.warning(self, "查询条件有误", str(e))
+            return
+
+        rows = list(result.rows())[:limit]
+        self.table_q_where.setColumnCount(len(result.columns))
+        self.table_q_where.setHorizontalHeaderLabels(result.columns)
+        self.table_q_where.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            for c, (col, v) in enumerate(zip(result.columns, values)):
+                self._set_item(self.table_q_where, r, c, self.query.format_value(col, v), editable=False)
+
+    # --------------------------- 实时发布 ---------------------------
+    # 实时发布监听的端口（仅本机）
+    LIVE_PORT = 8765
+
+    def _on_live_toggled(self, on: bool):
+        if not on:
+            if self.live_server is not None:
+                self.live_server.stop()
+                self.live_server = None
+            self.lbl_live.clear()
+            return
+        server = LiveServer(self.engine, port=self.LIVE_PORT)
+        try:
+            server.start()
+        except OSError as e:
+            QMessageBox.warning(self, "无法启动实时发布", f"端口 {self.LIVE_PORT} 不可用：{e}")
+            self.chk_live.setChecked(False)
+            return
+        self.live_server = server
+        self.lbl_live.setText(f"{server.url}standings　ws://{server.host}:{server.port}/live")
+
+    def closeEvent(self, event):
+        if self.live_server is not None:
+            self.live_server.stop()
+            self.live_server = None
+        self.tasks.cancel()
+        if self.journal is not None:
+            self.journal.close()
+            if self.journal.error is not None:
+                QMessageBox.warning(self, "录入日志写入失败", f"最近的改动可能未记入日志：{self.journal.error}")
+            self.journal = None
+        super().closeEvent(event)
+
+    # --------------------------- 录入日志 ---------------------------
+    def open_journal(self, directory: str):
+        """启用录入日志；目录中有上次的记录时询问是否恢复。"""
+        journal = Journal(directory)
+        if journal.has_data():
+            when = datetime.fromtimestamp(journal.last_modified()).strftime("%Y-%m-%d %H:%M:%S")
+            answer = QMessageBox.question(
+                self, "恢复比赛数据",
+                f"发现上次的比赛记录（最后写入于 {when}），是否恢复？\n选择“否”将开始新的记录，旧记录会被覆盖。",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if answer == QMessageBox.Yes:
+                try:
+                    report = journal.recover(self.engine)
+                except (OSError, ValueError) as e:
+                    QMessageBox.warning(self, "恢复失败", str(e))
+                else:
+                    self._sync_scale_fields()
+                    self.statusBar().showMessage(report.summary(), 10000)
+        try:
+            journal.attach(self.engine)
+        except OSError as e:
+            QMessageBox.warning(self, "无法启用录入日志", f"{directory}：{e}")
+            return
+        self.journal = journal
+
+    # --------------------------- 预测 ---------------------------
+    # 预测表最多列出的国家数
+    _PROJECT_ROWS = 500
+
+    @timed("操作.形势预测")
+    def on_project(self):
+        """在后台按当前录入数据的快照做预测；子进程使用全部核心。"""
+        if self.n_countries <= 0:
+            QMessageBox.warning(self, "未初始化", "请先在顶部完成初始化并录入成绩。")
+            return
+        try:
+            n_sims = int(self.edit_proj_sims.text())
+            max_rank = int(self.edit_proj_ranks.text())
+        except ValueError:
+            QMessageBox.warning(self, "输入错误", "请输入模拟次数与统计的名次数。")
+            return
+        problem = build_problem(self.engine, self.combo_proj_key.currentData(), self.combo_proj_model.currentData())
+
+        def job(progress, cancelled):
+            return run_projection(problem, n_sims, max_rank, progress=progress, cancelled=cancelled)
+
+        self.tasks.submit("project", "正在预测…", job, self._show_projection, self._on_task_failed)
+
+    def _show_projection(self, proj):
+        problem = proj.problem
+        header, rows = projection_rows(proj, self._PROJECT_ROWS)
+        self.lbl_project.setText(
+            f"{len(problem.rows)} 个项目共 {problem.open_slots} 个名次待定，已模拟 {proj.n_sims} 次；"
+            f"列出至少一次进入前 {proj.max_rank} 名的国家（最多 {self._PROJECT_ROWS} 个），按夺冠概率排序。")
+        self.table_project.setColumnCount(len(header))
+        self.table_project.setHorizontalHeaderLabels(header)
+        self.table_project.setRowCount(len(rows))
+        for r, values in enumerate(rows):
+            cid, score, p_first, p_top, mean = values[:5]
+            texts = [str(cid), str(score), f"{p_first:.2%}", f"{p_top:.2%}", f"{mean:.2f}"]
+            texts += [f"{p:.2%}" for p in values[5:]]
+            for c, text in enumerate(texts):
+                self._set_item(self.table_project, r, c, text, editable=False)
+
+    # --------------------------- 诊断 ---------------------------
+    def _on_profile_toggled(self, on: bool):
+        INSTRUMENTATION.enabled = on
+
+    def _on_profile_clear(self):
+        INSTRUMENTATION.reset()
+        self.refresh_diag_table()
+
+    def refresh_diag_table(self):
+        """按调用层级列出各阶段；子阶段缩进显示在所属操作之下。"""
+        c = self.cache
+        self.lbl_cache.setText(f"结果缓存：{len(c)} 条，命中 {c.hits} 次，未命中 {c.misses} 次，"
+                               f"因改动作废 {c.invalidations} 条，超出容量淘汰 {c.evictions} 条")
+        snap = INSTRUMENTATION.snapshot()
+        self.table_diag.setRowCount(len(snap))
+        for r, (path, count, total, longest) in enumerate(snap):
+            self._set_item(self.table_diag, r, 0, "    " * (len(path) - 1) + path[-1], editable=False)
+            self._set_item(self.table_diag, r, 1, str(count), editable=False)
+            self._set_item(self.table_diag, r, 2, f"{total * 1000:.2f}", editable=False)
+            self._set_item(self.table_diag, r, 3, f"{total * 1000 / count:.3f}", editable=False)
+            self._set_item(self.table_diag, r, 4, f"{longest * 1000:.2f}", editable=False)
+
+    def on_export_profile(self):
+        path, chosen = QFileDialog.getSaveFileName(
+            self, "导出计时数据", "", "JSON (*.json);;cProfile/pstats (*.prof)")
+        if not path:
+            return
+        if not path.lower().endswith((".json", ".prof")):
+            path += ".json" if chosen.startswith("JSON") else ".prof"
+        try:
+            if path.lower().endswith(".json"):
+                INSTRUMENTATION.export_json(path)
+            else:
+                INSTRUMENTATION.export_pstats(path)
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", f"无法写入文件：{e}")
+            return
+        QMessageBox.information(self, "导出完成", f"已导出到 {path}")
+
+    # --------------------------- 工具函数 ---------------------------
+    @timed("gui._set_item")
+    def _set_item(self, table: QTableWidget, row: int, col: int, text: str, editable: bool = True):
+        item = QTableWidgetItem(text)
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if editable:
+            flags |= Qt.ItemIsEditable
+        item.setFlags(flags)
+        item.setTextAlignment(Qt.AlignCenter)
+        table.setItem(row, col, item)
+
+
+def run_gui(argv: Optional[List[str]] = None, journal_dir: Optional[str] = None) -> int:
+    """启动界面；journal_dir 为录入日志目录，None 时不记录。"""
+    import sys
+    from PyQt5 import QtGui
+
+    # 针对高分屏做一点点优化（需在创建 QApplication 之前设置）
+    QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
+    QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
+    app = QApplication(sys.argv if argv is None else argv)
+
+    if sys.platform.startswith("win"):
+        # 优先用 UI 版微软雅黑，更适合界面显示；没有就回退
+        families = ["Microsoft YaHei UI", "Microsoft YaHei"]
+        db = QtGui.QFontDatabase()
+        for fam in families:
+            if fam in db.families():
+                app.setFont(QtGui.QFont(fam, 11))  # 这里 11 是字号，可调整
+                break
+
+    win = OlympicsScoringApp()
+    win.show()
+    if journal_dir is not None:
+        win.open_journal(journal_dir)
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(run_gui())
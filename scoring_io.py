@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""成绩文件的导入与比赛存档（不依赖 Qt）。
+
+导入支持 CSV 与 JSON Lines 两种格式，按块流式解析后直接写入引擎数组：
+
+- CSV:  event_id,gender,rule,p1,p2,p3[,...,p8]，首行为表头（前三列为上述列名）时自动跳过
+- JSONL: {"event_id": 1, "gender": "男", "rule": "前五", "placings": [1, 2, 3, 4, 5]}
+
+gender 可写 男/女、M/F、men/women；rule 为引擎规则表中的规则名称，
+内置规则也可写 3/5（JSONL 中旧的 "top_n" 键同样识别）；
+名次留空或为 0 表示尚未录入。
+
+存档为固定文件头加连续整数数组（见 save_competition），读档时直接内存映射。
+"""
+import csv
+import json
+import os
+import struct
+from dataclasses import dataclass, field
+from itertools import islice, zip_longest
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import (
+    ScoringEngine, OperationCancelled, MAX_PLACES, GENDER_MALE, GENDER_FEMALE
+)
+from scoring_profile import timed
+from scoring_rules import RULE_TOP3, RuleBook
+
+# 单个文件允许的最大项目编号，防止异常数据撑爆数组
+MAX_EVENT_ID = 1_000_000
+
+# CSV 表头前三列可用的列名（小写）；首行与之相符才当作表头跳过
+CSV_HEADER_NAMES = (
+    {"event_id", "event", "项目id", "项目编号", "项目"},
+    {"gender", "性别"},
+    {"rule", "top_n", "规则", "计分规则"},
+)
+
+GENDER_ALIASES = {
+    '男': GENDER_MALE, 'm': GENDER_MALE, 'male': GENDER_MALE, 'men': GENDER_MALE,
+    '女': GENDER_FEMALE, 'f': GENDER_FEMALE, 'w': GENDER_FEMALE, 'female': GENDER_FEMALE, 'women': GENDER_FEMALE,
+}
+
+
+@dataclass
+class ImportReport:
+    n_countries: int = 0
+    n_events: int = 0
+    loaded: int = 0
+    error_count: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (行号, 说明)，最多保留 max_errors 条
+    missing_count: int = 0
+    missing: List[int] = field(default_factory=list)  # 文件中缺少的项目ID，最多保留 max_errors 个
+
+    def summary(self) -> str:
+        text = (f"导入 {self.loaded} 行，共 {self.n_events} 个项目、{self.n_countries} 个国家；"
+                f"错误 {self.error_count} 行。")
+        if self.missing_count:
+            shown = "、".join(map(str, self.missing[:10])) + ("等" if self.missing_count > 10 else "")
+            text += (f"缺少 {self.missing_count} 个项目ID（{shown}），"
+                     f"其余项目已按ID顺序重新编号为 1..{self.n_events}。")
+        return text
+
+
+class ParseError(ValueError):
+    pass
+
+
+# 一块解析结果：(行号, 项目ID, 性别码, 规则编号, 名次矩阵)
+ParsedChunk = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+# 规则写法（小写）-> 规则编号，见 RuleBook.aliases
+RuleAliases = Dict[str, int]
+
+
+def _parse_fields(event_id, gender, rule, placings: Iterable,
+                  rule_aliases: RuleAliases) -> Tuple[int, int, int, List[int]]:
+    """逐行解析（JSONL 与 CSV 慢速路径共用），出错抛 ParseError。"""
+    try:
+        eid = int(event_id)
+    except (TypeError, ValueError):
+        raise ParseError(f"项目ID无效: {event_id!r}")
+    g = GENDER_ALIASES.get(str(gender).strip().lower())
+    if g is None:
+        raise ParseError(f"性别无效: {gender!r}")
+    t = rule_aliases.get(str(rule).strip().lower())
+    if t is None:
+        raise ParseError(f"计分规则无效: {rule!r}")
+    ranks: List[int] = []
+    for p in placings:
+        p = str(p).strip() if p is not None else ""
+        if not p:
+            ranks.append(0)
+        elif p.isdigit():
+            ranks.append(int(p))
+        else:
+            raise ParseError(f"国家编号无效: {p!r}")
+    if len(ranks) > MAX_PLACES:
+        raise ParseError(f"名次超过 {MAX_PLACES} 个")
+    return eid, g, t, ranks
+
+
+def _pack(parsed: List[Tuple[int, int, int, int, List[int]]]) -> ParsedChunk:
+    k = len(parsed)
+    ranks = np.zeros((k, MAX_PLACES), dtype=np.int64)
+    for i, r in enumerate(parsed):
+        ranks[i, :len(r[4])] = r[4]
+    return (np.fromiter((r[0] for r in parsed), dtype=np.int64, count=k),
+            np.fromiter((r[1] for r in parsed), dtype=np.int64, count=k),
+            np.fromiter((r[2] for r in parsed), dtype=np.int8, count=k),
+            np.fromiter((r[3] for r in parsed), dtype=np.int16, count=k),
+            ranks)
+
+
+def _parse_rows_slow(items: List[Tuple[int, list]], errors: List[Tuple[int, str]], as_json: bool,
+                     rule_aliases: RuleAliases) -> ParsedChunk:
+    parsed = []
+    for line_no, rec in items:
+        try:
+            if as_json:
+                rec = json.loads(rec)
+                rule = rec["rule"] if "rule" in rec else rec["top_n"]
+                fields = _parse_fields(rec["event_id"], rec["gender"], rule, rec.get("placings", []), rule_aliases)
+            else:
+                fields = _parse_fields(rec[0], rec[1], rec[2], rec[3:], rule_aliases)
+            parsed.append((line_no,) + fields)
+        except ParseError as e:
+            errors.append((line_no, str(e)))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            errors.append((line_no, f"JSON 记录无效: {e}"))
+    return _pack(parsed)
+
+
+def _lookup(col: tuple, aliases: dict, dtype=np.int8) -> np.ndarray:
+    """先对去重后的取值查别名表，再整列映射；未知取值记为 -1。"""
+    mapping = {u: aliases.get(str(u).strip().lower(), -1) for u in set(col)}
+    return np.fromiter(map(mapping.__getitem__, col), dtype=dtype, count=len(col))
+
+
+def _int_column(col: tuple) -> List[int]:
+    try:
+        return list(map(int, col))
+    except ValueError:
+        # 空白单元格视为 0；其余非法值继续抛出
+        return [int(x) if x.strip() else 0 for x in col]
+
+
+@timed("io.parse_csv_chunk")
+def _parse_csv_chunk(block: List[list], line_nos: np.ndarray, errors: List[Tuple[int, str]],
+                     rule_aliases: RuleAliases) -> ParsedChunk:
+    """整块解析 CSV：各列一次性转换成数组；有任何异常值时退回逐行解析以定位坏行。"""
+    width = 3 + MAX_PLACES
+    lens = np.fromiter(map(len, block), dtype=np.int64, count=len(block))
+    ok = (lens >= 3) & (lens <= width)
+    if not ok.all():
+        for i in np.flatnonzero(~ok):
+            fields = block[i]
+            if not fields or (len(fields) == 1 and not fields[0].strip()):
+                continue  # 空行
+            msg = "字段不足" if len(fields) < 3 else f"名次超过 {MAX_PLACES} 个"
+            errors.append((int(line_nos[i]), msg))
+        block = [block[i] for i in np.flatnonzero(ok)]
+        line_nos = line_nos[ok]
+    if not block:
+        return _pack([])
+    cols = list(zip_longest(*block, fillvalue=""))
+    cols += [("",) * len(block)] * (width - len(cols))
+    try:
+        eids = np.array(list(map(int, cols[0])), dtype=np.int64)
+        places = np.array([_int_column(c) for c in cols[3:]], dtype=np.int64).T
+    except ValueError:
+        return _parse_rows_slow(list(zip(line_nos.tolist(), block)), errors, False, rule_aliases)
+    genders = _lookup(cols[1], GENDER_ALIASES)
+    rules = _lookup(cols[2], rule_aliases, np.int16)
+    if (genders < 0).any() or (rules < 0).any() or (places < 0).any():
+        return _parse_rows_slow(list(zip(line_nos.tolist(), block)), errors, False, rule_aliases)
+    return line_nos, eids, genders, rules, places
+
+
+def _is_csv_header(fields: List[str]) -> bool:
+    """首行的前三列都是已知列名时才是表头；其余非数字开头的行按数据行报错。"""
+    return len(fields) >= 3 and all(f.strip().lower() in names for f, names in zip(fields, CSV_HEADER_NAMES))
+
+
+def _iter_chunks(f, is_jsonl: bool, chunk_size: int, errors: List[Tuple[int, str]],
+                 rule_aliases: RuleAliases) -> Iterator[ParsedChunk]:
+    if is_jsonl:
+        lines = ((ln, line) for ln, line in enumerate(f, start=1) if line.strip())
+        while True:
+            items = list(islice(lines, chunk_size))
+            if not items:
+                return
+            yield _parse_rows_slow(items, errors, True, rule_aliases)
+    reader = csv.reader(f)
+    first_line = 1
+    while True:
+        block = list(islice(reader, chunk_size))
+        if not block:
+            return
+        line_nos = np.arange(first_line, first_line + len(block), dtype=np.int64)
+        if first_line == 1 and _is_csv_header(block[0]):
+            block, line_nos = block[1:], line_nos[1:]
+        first_line = int(line_nos[-1]) + 1 if len(line_nos) else first_line + 1
+        yield _parse_csv_chunk(block, line_nos, errors, rule_aliases)
+
+
+class _ResultsBuffer:
+    """按项目编号增长的结果缓冲区，容量倍增，最终直接交给引擎。"""
+
+    def __init__(self, capacity: int = 1024):
+        self.results = np.zeros((capacity, MAX_PLACES), dtype=np.int32)
+        self.gender = np.full(capacity, GENDER_MALE, dtype=np.int8)
+        self.rule = np.full(capacity, RULE_TOP3, dtype=np.int16)
+        self.seen = np.zeros(capacity, dtype=bool)
+        self.n_events = 0
+
+    def reserve(self, need: int):
+        cap = len(self.seen)
+        if need <= cap:
+            return
+        new_cap = max(need, cap * 2)
+        self.results = np.resize(self.results, (new_cap, MAX_PLACES)); self.results[cap:] = 0
+        self.gender = np.resize(self.gender, new_cap); self.gender[cap:] = GENDER_MALE
+        self.rule = np.resize(self.rule, new_cap); self.rule[cap:] = RULE_TOP3
+        self.seen = np.resize(self.seen, new_cap); self.seen[cap:] = False
+
+    def write_chunk(self, rows: np.ndarray, gender: np.ndarray, rule: np.ndarray, ranks: np.ndarray):
+        self.reserve(int(rows.max()) + 1)
+        self.results[rows] = ranks
+        self.gender[rows] = gender
+        self.rule[rows] = rule
+        self.seen[rows] = True
+        self.n_events = max(self.n_events, int(rows.max()) + 1)
+
+
+def _decoded_lines(fb, consumed: List[int]) -> Iterator[str]:
+    """逐行解码二进制文件，并在 consumed[0] 中累计已读字节数（用于进度）。"""
+    first = True
+    for raw in fb:
+        consumed[0] += len(raw)
+        if first:
+            first = False
+            yield raw.decode("utf-8-sig")
+        else:
+            yield raw.decode("utf-8")
+
+
+@timed("io.import_results")
+def import_results(path: str, engine: ScoringEngine, n_countries: Optional[int] = None,
+                   chunk_size: int = 16384, max_errors: int = 1000,
+                   progress: Optional[Callable[[int, int], None]] = None,
+                   cancelled: Optional[Callable[[], bool]] = None) -> ImportReport:
+    """流式导入成绩文件并整体替换引擎中的数据，返回导入报告。
+
+    n_countries 为空时取文件中出现的最大国家编号；计分规则按引擎当前的规则表识别。
+    出错的行（格式错误、编号超范围、项目ID重复、名次多于规则的名次数）不会导入，
+    其余行照常写入；缺名次或同一项目内国家重复交给引擎校验标出。
+    项目ID不连续（含出错行留下的空缺）时不会补出虚构的项目：导入的项目按ID顺序
+    重新编号为 1..项目数，缺少的ID记入报告。
+    每解析完一块调用 progress(已读字节, 文件字节)；cancelled() 为真时抛出
+    OperationCancelled，引擎保持不变。
+    """
+    report = ImportReport()
+
+    def bad(line_no: int, msg: str):
+        report.error_count += 1
+        if len(report.errors) < max_errors:
+            report.errors.append((line_no, msg))
+
+    parse_errors: List[Tuple[int, str]] = []
+
+    buf = _ResultsBuffer()
+    rule_aliases = engine.rules.aliases()
+    rule_places = engine.rules.places_table()
+    place_idx = np.arange(MAX_PLACES)[None, :]
+    max_country = 0
+    is_jsonl = path.lower().endswith((".jsonl", ".ndjson", ".json"))
+    total_bytes = os.path.getsize(path)
+    consumed = [0]
+    with open(path, "rb") as fb:
+        lines = _decoded_lines(fb, consumed)
+        for line_nos, eids, genders, rules, ranks in _iter_chunks(lines, is_jsonl, chunk_size, parse_errors,
+                                                                  rule_aliases):
+            if cancelled is not None and cancelled():
+                raise OperationCancelled()
+            if progress is not None:
+                progress(consumed[0], total_bytes)
+            for line_no, msg in parse_errors:
+                bad(line_no, msg)
+            parse_errors.clear()
+            if not len(line_nos):
+                continue
+
+            # 整块做范围与一致性检查
+            ok = np.ones(len(line_nos), dtype=bool)
+            checks = [
+                ((eids < 1) | (eids > MAX_EVENT_ID), f"项目ID需在 1..{MAX_EVENT_ID}"),
+                (((ranks != 0) & (place_idx >= rule_places[rules][:, None])).any(axis=1), "名次多于该计分规则的名次数"),
+            ]
+            if n_countries is not None:
+                checks.append(((ranks > n_countries).any(axis=1), f"国家编号超范围(1..{n_countries})"))
+            for mask, msg in checks:
+                for line_no in line_nos[mask & ok]:
+                    bad(int(line_no), msg)
+                ok &= ~mask
+
+            # 项目ID重复（与此前各块或本块内重复）：保留先出现的一行
+            rows = eids - 1
+            dup = np.zeros(len(line_nos), dtype=bool)
+            cand = np.flatnonzero(ok)
+            if len(cand):
+                buf.reserve(int(rows[cand].max()) + 1)
+                repeated = np.ones(len(cand), dtype=bool)
+                repeated[np.unique(rows[cand], return_index=True)[1]] = False
+                dup[cand] = buf.seen[rows[cand]] | repeated
+            for line_no in line_nos[dup]:
+                bad(int(line_no), "项目ID重复")
+            ok &= ~dup
+
+            if ok.any():
+                buf.write_chunk(rows[ok], genders[ok], rules[ok], ranks[ok].astype(np.int32))
+                max_country = max(max_country, int(ranks[ok].max()))
+                report.loaded += int(ok.sum())
+
+    n = n_countries if n_countries is not None else max(1, max_country)
+    e = buf.n_events
+    seen = buf.seen[:e]
+    if seen.all():
+        gender, rule, results = buf.gender[:e].copy(), buf.rule[:e].copy(), buf.results[:e].copy()
+    else:
+        # 空缺的ID没有真实的性别与规则，只保留导入的项目
+        missing = np.flatnonzero(~seen)
+        report.missing_count = len(missing)
+        report.missing = (missing[:max_errors] + 1).tolist()
+        gender, rule, results = buf.gender[:e][seen], buf.rule[:e][seen], buf.results[:e][seen]
+    engine.load_arrays(n, gender, rule, results)
+    report.n_countries = n
+    report.n_events = len(gender)
+    report.errors.sort()
+    return report
+
+
+# --------------------------- 二进制存档 ---------------------------
+# 文件头：魔数, 格式版本, 每项目名次数, 国家数, 男子项目数, 项目数, 规则表 JSON 字节数
+_HEADER = struct.Struct("<4sHHiiqq")
+_MAGIC = b"OLYS"
+_FORMAT_VERSION = 2
+
+
+def _layout(n: int, e: int, places: int) -> List[Tuple[str, np.dtype, tuple, int]]:
+    """各数组在文件中的 (名称, 类型, 形状, 偏移)，每段按 8 字节对齐；最后一项为规则表。"""
+    specs = [
+        ("gender", np.dtype(np.int8), (e,)),
+        ("rule", np.dtype("<i2"), (e,)),
+        ("results", np.dtype("<i4"), (e, places)),
+        ("total", np.dtype("<i8"), (n,)),
+        ("male", np.dtype("<i8"), (n,)),
+        ("female", np.dtype("<i8"), (n,)),
+    ]
+    out = []
+    offset = _HEADER.size
+    for name, dtype, shape in specs:
+        out.append((name, dtype, shape, offset))
+        size = dtype.itemsize * int(np.prod(shape))
+        offset += (size + 7) // 8 * 8
+    out.append(("rules", np.dtype(np.uint8), (0,), offset))
+    return out
+
+
+def sync_directory(directory: str):
+    """把目录项（新建、替换的文件名）落盘；不支持对目录 fsync 的平台上忽略。"""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@timed("io.save_competition")
+def save_competition(path: str, engine: ScoringEngine):
+    """把比赛规模、项目配置、成绩矩阵、当前得分与计分规则写成二进制存档。
+
+    先写临时文件并 fsync，再替换原文件并 fsync 所在目录：断电后看到的要么是旧存档，
+    要么是完整的新存档。
+    """
+    n, e = engine.n_countries, engine.n_events
+    rules_blob = engine.rules.to_json().encode("utf-8")
+    # 若引擎正映射着同一文件，先复制进内存，避免覆盖时文件仍被占用
+    engine.materialize()
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, MAX_PLACES, n, engine.m_men, e, len(rules_blob)))
+        *arrays, (_name, _dtype, _shape, rules_offset) = _layout(n, e, MAX_PLACES)
+        for name, dtype, _shape, offset in arrays:
+            f.seek(offset)
+            f.write(np.ascontiguousarray(getattr(engine, name), dtype=dtype).tobytes())
+        f.seek(rules_offset)
+        f.write(rules_blob)
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    sync_directory(os.path.dirname(path))
+
+
+@timed("io.load_competition")
+def load_competition(path: str, engine: ScoringEngine):
+    """内存映射读档并直接装入引擎；数组以写时复制方式映射，编辑不会改动存档文件。"""
+    with open(path, "rb") as f:
+        head = f.read(_HEADER.size)
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+    if len(head) < _HEADER.size:
+        raise ValueError("不是有效的比赛存档：文件过短")
+    magic, version, places, n, m, e, rules_len = _HEADER.unpack(head)
+    if magic != _MAGIC:
+        raise ValueError("不是有效的比赛存档：魔数不符")
+    if version != _FORMAT_VERSION or places != MAX_PLACES:
+        raise ValueError(f"不支持的存档版本: {version}")
+    *layout, (_name, _dtype, _shape, rules_offset) = _layout(n, e, places)
+    if file_size < rules_offset + rules_len:
+        raise ValueError("不是有效的比赛存档：文件已截断")
+
+    arrays = {}
+    for name, dtype, shape, offset in layout:
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=shape)
+    rules = RuleBook()
+    if rules_len:
+        with open(path, "rb") as f:
+            f.seek(rules_offset)
+            rules = RuleBook.from_json(f.read(rules_len).decode("utf-8"))
+    engine.load_arrays(n, arrays["gender"], arrays["rule"], arrays["results"],
+                       scores=(arrays["total"], arrays["male"], arrays["female"]), m_men=m, rules=rules)
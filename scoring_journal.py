@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""成绩日志：只追加的录入记录加定期快照，崩溃后快速恢复（不依赖 Qt）。
+
+日志目录中按代保存两类文件，代号递增：
+
+- snapshot-<代>.olys：该代开始时的完整比赛存档（格式同 save_competition）
+- journal-<代>.jsonl：此后每次改动后该项目的完整状态，一行一条
+
+    {"op": "reset"}
+    {"op": "row", "row": 12, "rule": "前五", "ranks": [3, 1, 0, 0, 0]}
+    {"op": "rule", "name": "接力", "points": [10, 6, 4], "weight": 2}
+
+记录的是改动后的状态而非差值，重复回放无害。初始化、导入、读档、换规则表等整体改动
+直接开始新的一代，该代日志以 reset 记录开头；单项改动累计到 snapshot_every 条时也开始
+新的一代，因此恢复时回放的记录数有上限，与比赛进行了多久无关。
+
+引擎线程只把记录放进队列；写盘、序列化与 fsync 都在后台线程按批进行，不拖慢录入。
+写快照时保留上一代，最新快照损坏时可从上一代快照回放两代日志；但若较新的一代
+由整体改动开始，其日志无法接在旧快照之后，回放止于该代之前。
+"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import ScoringEngine
+from scoring_io import load_competition, save_competition, sync_directory
+from scoring_profile import timed
+from scoring_rules import RuleBook, RuleSet
+
+# 单项改动累计到此数时写新快照
+SNAPSHOT_EVERY = 2000
+# 后台线程攒批的最长等待（秒）
+FLUSH_INTERVAL = 0.2
+
+_SNAPSHOT = "snapshot-{:06d}.olys"
+_JOURNAL = "journal-{:06d}.jsonl"
+_FILE_RE = re.compile(r"^(snapshot|journal)-(\d{6})\.(olys|jsonl)(\.tmp)?$")
+_RESET_LINE = b'{"op":"reset"}'
+_STOP = object()
+
+
+def default_directory() -> str:
+    """界面默认使用的日志目录（用户主目录下）。"""
+    return os.path.join(os.path.expanduser("~"), ".olympic_scoring", "journal")
+
+
+@dataclass
+class RecoveryReport:
+    generation: int = 0
+    replayed: int = 0     # 回放的日志记录数
+    discarded: int = 0    # 因残缺或无效而丢弃的行数（通常是崩溃时写了一半的最后一行）
+    stopped_at: int = 0   # 回放止于此代：它由整体改动开始而其快照不可用（0 表示未截断）
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        text = f"从第 {self.generation} 代快照恢复，回放 {self.replayed} 条记录，用时 {self.seconds:.2f} 秒"
+        if self.discarded:
+            text += f"；丢弃 {self.discarded} 行残缺记录"
+        if self.stopped_at:
+            text += (f"；第 {self.stopped_at} 代由重新初始化、导入或读档开始而其快照损坏，"
+                     "恢复的是此前的比赛，之后的改动无法恢复")
+        return text + "。"
+
+
+@dataclass
+class _Snapshot:
+    """引擎线程上截取的完整状态副本，由后台线程写盘。"""
+    n: int
+    m_men: int
+    gender: np.ndarray
+    rule: np.ndarray
+    results: np.ndarray
+    scores: Tuple[np.ndarray, np.ndarray, np.ndarray]
+    rules: RuleBook
+    reset: bool   # 是否由整体改动开始（此前各代的日志不能接续到这份快照）
+
+
+class Journal:
+    """把引擎的每次改动写入日志目录；attach 之后生效，close 时写一份最终快照。"""
+
+    def __init__(self, directory: str, snapshot_every: int = SNAPSHOT_EVERY,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.flush_interval = flush_interval
+        self.engine: Optional[ScoringEngine] = None
+        self.error: Optional[OSError] = None   # 后台写盘失败后不再记录
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+        self._generation = 0
+        self._since_snapshot = 0
+        self._known_rules: set = set()
+        self._recovered = False
+
+    # --------------------------- 目录 ---------------------------
+    def _path(self, pattern: str, generation: int) -> str:
+        return os.path.join(self.directory, pattern.format(generation))
+
+    def _generations(self) -> Dict[str, List[int]]:
+        """目录中已完成的快照与日志各有哪些代（升序）。"""
+        found: Dict[str, List[int]] = {"snapshot": [], "journal": []}
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return found
+        for name in names:
+            m = _FILE_RE.match(name)
+            if m and not m.group(4):
+                found[m.group(1)].append(int(m.group(2)))
+        for gens in found.values():
+            gens.sort()
+        return found
+
+    def has_data(self) -> bool:
+        return bool(self._generations()["snapshot"])
+
+    def last_modified(self) -> Optional[float]:
+        """最近一次写入的时间戳；目录为空时为 None。"""
+        found = self._generations()
+        times = [os.path.getmtime(self._path(_SNAPSHOT, g)) for g in found["snapshot"]]
+        times += [os.path.getmtime(self._path(_JOURNAL, g)) for g in found["journal"]]
+        return max(times) if times else None
+
+    # --------------------------- 恢复 ---------------------------
+    @timed("journal.recover")
+    def recover(self, engine: ScoringEngine) -> RecoveryReport:
+        """读入最新的有效快照并回放其后的日志，整体装入引擎（只发一次重置通知）。
+
+        须在 attach 之前调用；没有可用快照时抛出 ValueError。
+        """
+        start = time.perf_counter()
+        found = self._generations()
+        staging = ScoringEngine()
+        errors = []
+        self._recovered = False
+        for generation in reversed(found["snapshot"]):
+            try:
+                load_competition(self._path(_SNAPSHOT, generation), staging)
+                break
+            except (OSError, ValueError) as e:
+                errors.append(f"第 {generation} 代快照: {e}")
+        else:
+            raise ValueError("日志目录中没有可用的快照" + ("：" + "；".join(errors) if errors else ""))
+        staging.materialize()
+
+        report = RecoveryReport(generation=generation)
+        rows: Dict[int, Tuple[int, List[int]]] = {}
+        rules = staging.rules
+        for g in (g for g in found["journal"] if g >= generation):
+            with open(self._path(_JOURNAL, g), "rb") as f:
+                lines = [line for line in f.read().split(b"\n") if line]
+            if lines and lines[0] == _RESET_LINE:
+                if g > generation:
+                    # 这一代的日志接在另一场比赛之后，不能回放到旧快照上
+                    report.stopped_at = g
+                    break
+                lines = lines[1:]
+            for line in lines:
+                if report.discarded:
+                    # 出现无效记录后，之后的记录（含更新的各段）都不再可信
+                    report.discarded += 1
+                    continue
+                try:
+                    self._replay_line(line, staging, rules, rows)
+                    report.replayed += 1
+                except (ValueError, KeyError, TypeError):
+                    report.discarded += 1
+
+        if rows:
+            for row, (rid, ranks) in rows.items():
+                staging.rule[row] = rid
+                staging.results[row, :] = 0
+                staging.results[row, :len(ranks)] = ranks
+            scores = None   # 回放过的数据全量重算一次
+        else:
+            scores = (staging.total, staging.male, staging.female)
+        engine.load_arrays(staging.n_countries, staging.gender, staging.rule, staging.results,
+                           scores=scores, m_men=staging.m_men, rules=rules)
+        self._recovered = True
+        report.seconds = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def _replay_line(line: bytes, staging: ScoringEngine, rules: RuleBook,
+                     rows: Dict[int, Tuple[int, List[int]]]):
+        """校验并收下一条记录；同一项目只保留最后的状态。"""
+        rec = json.loads(line.decode("utf-8"))
+        op = rec["op"]
+        if op == "rule":
+            if rules.find(rec["name"]) is None:
+                rules.add(RuleSet(str(rec["name"]), tuple(rec["points"]), rec.get("weight", 1)))
+            return
+        if op != "row":
+            raise ValueError(f"未知的记录类型: {op}")
+        row, rid, ranks = int(rec["row"]), rules.find(rec["rule"]), [int(c) for c in rec["ranks"]]
+        if not 0 <= row < staging.n_events or rid is None:
+            raise ValueError("记录与快照不符")
+        if len(ranks) > rules[rid].places or any(not 0 <= c <= staging.n_countries for c in ranks):
+            raise ValueError("记录中的名次无效")
+        rows[row] = (rid, ranks)
+
+    # --------------------------- 记录 ---------------------------
+    def attach(self, engine: ScoringEngine):
+        """开始记录：先写一份当前状态的快照作为新的一代，此后的改动追加到该代日志。
+
+        紧接在 recover 之后时新的一代接续已恢复的比赛，否则视为整体改动。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        found = self._generations()
+        self._generation = max(found["snapshot"] + found["journal"], default=0)
+        self.engine = engine
+        self._thread = threading.Thread(target=self._run, name="scoring-journal", daemon=True)
+        self._thread.start()
+        self._enqueue_snapshot(reset=not self._recovered)
+        engine.add_listener(self._on_engine_changed)
+
+    def checkpoint(self):
+        """立即开始新的一代（在引擎线程调用）。"""
+        if self.engine is not None and self.error is None:
+            self._enqueue_snapshot()
+
+    def flush(self):
+        """等待已排队的记录全部写盘。"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self, final_snapshot: bool = True):
+        """停止记录与后台线程；默认先写一份最终快照，之后恢复无需回放。"""
+        if self.engine is None:
+            return
+        self.engine.remove_listener(self._on_engine_changed)
+        if final_snapshot:
+            self.checkpoint()
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.engine = None
+        self._thread = None
+
+    def _enqueue_snapshot(self, reset: bool = False):
+        eng = self.engine
+        rules = RuleBook.from_json(eng.rules.to_json())
+        self._queue.put(_Snapshot(
+            eng.n_countries, eng.m_men, np.array(eng.gender), np.array(eng.rule), np.array(eng.results),
+            (np.array(eng.total), np.array(eng.male), np.array(eng.female)), rules, reset))
+        self._known_rules = set(rules.names)
+        self._since_snapshot = 0
+
+    def _on_engine_changed(self, rows, countries):
+        if self.error is not None:
+            return
+        if rows is None:
+            self._enqueue_snapshot(reset=True)
+            return
+        eng = self.engine
+        for row in rows:
+            rule = eng.rules[int(eng.rule[row])]
+            if rule.name not in self._known_rules:
+                # 新增的规则先于引用它的记录写入
+                self._queue.put({"op": "rule", "name": rule.name, "points": list(rule.points),
+                                 "weight": rule.weight})
+                self._known_rules.add(rule.name)
+            self._queue.put({"op": "row", "row": int(row), "rule": rule.name, "ranks": eng.event_ranks(row)})
+        self._since_snapshot += len(rows)
+        if self._since_snapshot >= self.snapshot_every:
+            self._enqueue_snapshot()
+
+    # --------------------------- 后台写盘 ---------------------------
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # 攒一小段时间再写，连续录入时多条记录共用一次 fsync
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                if self.error is None:
+                    self._write_batch(batch)
+            except OSError as e:
+                self.error = e
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is _STOP:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def _write_batch(self, batch: list):
+        lines: List[str] = []
+        for item in batch:
+            if isinstance(item, _Snapshot):
+                self._append(lines)
+                lines = []
+                self._write_snapshot(item)
+            elif item is not _STOP:
+                lines.append(json.dumps(item, ensure_ascii=False, separators=(",", ":")))
+        self._append(lines)
+
+    def _append(self, lines: List[str]):
+        if not lines or self._file is None:
+            return
+        self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @timed("journal.snapshot")
+    def _write_snapshot(self, snap: _Snapshot):
+        generation = self._generation + 1
+        staging = ScoringEngine()
+        staging.load_arrays(snap.n, snap.gender, snap.rule, snap.results,
+                            scores=snap.scores, m_men=snap.m_men, rules=snap.rules)
+        save_competition(self._path(_SNAPSHOT, generation), staging)
+        new_file = open(self._path(_JOURNAL, generation), "wb")
+        # 新日志文件的目录项也须落盘，否则断电后其中已 fsync 的记录无处可寻
+        sync_directory(self.directory)
+        if self._file is not None:
+            self._file.close()
+        self._file = new_file
+        self._generation = generation
+        if snap.reset:
+            self._append([_RESET_LINE.decode("ascii")])
+        self._prune(generation - 1)
+
+    def _prune(self, keep_from: int):
+        """删除 keep_from 之前各代的文件（含写了一半的临时文件）。"""
+        for name in os.listdir(self.directory):
+            m = _FILE_RE.match(name)
+            if m and int(m.group(2)) < keep_from:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""实时排行榜（不依赖 Qt）。
+
+对总分、男团、女团三项各维护一个有序索引，随引擎的增量变更只移动得分变化的国家，
+无需整表重排。查询某国名次、前 k 名、第 i..j 名均为对数级时间。
+"""
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from scoring_engine import ScoringEngine
+
+# 排序键编码为单个整数：-得分 * _ID_SPAN + 国家编号，升序即“得分降序、同分按编号升序”
+_ID_SPAN = 1 << 24
+
+
+def _encode(score: int, cid: int) -> int:
+    return -score * _ID_SPAN + cid
+
+
+def _decode(key: int) -> Tuple[int, int]:
+    """返回 (国家编号, 得分)。"""
+    cid = key % _ID_SPAN
+    return cid, (cid - key) // _ID_SPAN
+
+
+class _SortedList:
+    """分桶有序表：各桶内有序且首尾相接，另以树状数组记录各桶长度。
+
+    插入/删除为 O(log n) 次比较加一次桶内搬移；按值求位置、按位置取值都是 O(log n)。
+    桶为紧凑的 int64 数组，上万个国家也只占几百 KB。
+    """
+
+    _LOAD = 256  # 桶长超过 2 倍时拆分
+
+    def __init__(self, items: np.ndarray):
+        """items 为已升序排列的 int64 数组。"""
+        load = self._LOAD
+        self._buckets: List[array] = [array("q", items[i:i + load].tobytes())
+                                      for i in range(0, len(items), load)]
+        self._maxes: List[int] = [b[-1] for b in self._buckets]
+        self._len = len(items)
+        self._build_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    # --------------------------- 树状数组 ---------------------------
+    def _build_tree(self):
+        m = len(self._buckets)
+        tree = [0] * (m + 1)
+        for i, b in enumerate(self._buckets, start=1):
+            tree[i] += len(b)
+            j = i + (i & -i)
+            if j <= m:
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket: int, delta: int):
+        tree = self._tree
+        i = bucket + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket: int) -> int:
+        """前 bucket 个桶的元素总数。"""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, pos: int) -> Tuple[int, int]:
+        """第 pos 个元素（0 起）所在的 (桶下标, 桶内偏移)。"""
+        tree = self._tree
+        bucket, rem = 0, pos
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(tree) and tree[nxt] <= rem:
+                bucket = nxt
+                rem -= tree[nxt]
+            step >>= 1
+        return bucket, rem
+
+    # --------------------------- 增删 ---------------------------
+    def add(self, x: int):
+        if not self._buckets:
+            self._buckets, self._maxes = [array("q", [x])], [x]
+            self._len = 1
+            self._build_tree()
+            return
+        i = bisect_left(self._maxes, x)
+        if i == len(self._maxes):
+            i -= 1
+        b = self._buckets[i]
+        insort(b, x)
+        self._maxes[i] = b[-1]
+        self._len += 1
+        if len(b) > 2 * self._LOAD:
+            half = len(b) // 2
+            self._buckets[i:i + 1] = [b[:half], b[half:]]
+            self._maxes[i:i + 1] = [b[half - 1], b[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, x: int):
+        i = bisect_left(self._maxes, x)
+        b = self._buckets[i]
+        j = bisect_left(b, x)
+        if b[j] != x:
+            raise KeyError(x)
+        del b[j]
+        self._len -= 1
+        if b:
+            self._maxes[i] = b[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i], self._maxes[i]
+            self._build_tree()
+
+    # --------------------------- 查询 ---------------------------
+    def bisect_left(self, x: int) -> int:
+        """小于 x 的元素个数。"""
+        i = bisect_left(self._maxes, x)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._buckets[i], x)
+
+    def __getitem__(self, pos: int) -> int:
+        if not 0 <= pos < self._len:
+            raise IndexError(pos)
+        bucket, offset = self._locate(pos)
+        return self._buckets[bucket][offset]
+
+    def slice(self, start: int, stop: int) -> List[int]:
+        """位置 [start, stop) 的元素。"""
+        start, stop = max(0, start), min(self._len, stop)
+        out: List[int] = []
+        if start >= stop:
+            return out
+        bucket, offset = self._locate(start)
+        while len(out) < stop - start:
+            b = self._buckets[bucket]
+            out.extend(b[offset:offset + (stop - start - len(out))].tolist())
+            bucket, offset = bucket + 1, 0
+        return out
+
+
+class Leaderboard:
+    """总分/男团/女团的实时排行。
+
+    作为引擎监听器注册，须在依赖它的视图模型之前创建，保证视图取数时索引已更新。
+    名次从 1 开始；同分时按国家编号升序排列（与统计表排序一致）。
+    """
+
+    KEYS = ("total", "male", "female")
+
+    def __init__(self, engine: ScoringEngine):
+        self.engine = engine
+        self._rebuild()
+        engine.add_listener(self._on_engine_changed)
+
+    def close(self):
+        self.engine.remove_listener(self._on_engine_changed)
+
+    # --------------------------- 引擎同步 ---------------------------
+    def _rebuild(self):
+        n = self.engine.n_countries
+        if n >= _ID_SPAN:
+            raise ValueError(f"国家数量超出排行榜上限 {_ID_SPAN - 1}")
+        cids = np.arange(1, n + 1, dtype=np.int64)
+        self._lists: Dict[str, _SortedList] = {}
+        # 上次同步时的得分：引擎通知时数组已更新，需据此找到旧的排序键
+        self._scores: Dict[str, np.ndarray] = {}
+        for key in self.KEYS:
+            col = np.array(getattr(self.engine, key), dtype=np.int64)
+            self._lists[key] = _SortedList(np.sort(-col * _ID_SPAN + cids))
+            self._scores[key] = col
+
+    def _on_engine_changed(self, rows, countries):
+        if countries is None:
+            self._rebuild()
+            return
+        for cid in countries:
+            for key in self.KEYS:
+                scores = self._scores[key]
+                new = int(getattr(self.engine, key)[cid - 1])
+                old = int(scores[cid - 1])
+                if new != old:
+                    lst = self._lists[key]
+                    lst.remove(_encode(old, cid))
+                    lst.add(_encode(new, cid))
+                    scores[cid - 1] = new
+
+    # --------------------------- 查询 ---------------------------
+    def score(self, key: str, cid: int) -> int:
+        return int(self._scores[key][cid - 1])
+
+    def position(self, key: str, cid: int) -> int:
+        """该国在排行中的位置（1 起，同分按编号先后区分）。"""
+        return self._lists[key].bisect_left(_encode(self.score(key, cid), cid)) + 1
+
+    def rank(self, key: str, cid: int) -> int:
+        """并列名次：1 + 得分严格高于该国的国家数。"""
+        return self._lists[key].bisect_left(_encode(self.score(key, cid), 0)) + 1
+
+    def country_at(self, key: str, pos: int) -> int:
+        """第 pos 位（0 起）的国家编号。"""
+        return self._lists[key][pos] % _ID_SPAN
+
+    def range(self, key: str, first: int, last: int) -> List[Tuple[int, int]]:
+        """第 first..last 位（1 起，含两端）的 [(国家编号, 得分)]。"""
+        return [_decode(k) for k in self._lists[key].slice(first - 1, last)]
+
+    def top(self, key: str, k: int) -> List[Tuple[int, int]]:
+        return self.range(key, 1, k)
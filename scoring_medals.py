@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""奖牌榜与多关键字并列名次（不依赖 Qt）。
+
+各项目的第 1/2/3 名分别记一枚金/银/铜牌（规则只录入 1~2 个名次的项目相应减少），
+按男子/女子项目分开统计；未录入(0)或超出 1..n 的国家编号不计，与计分一致。
+
+排名依据为若干关键字的序列，依次比较、均为降序：
+
+- total：范围内的积分（全部为总分，男子/女子为男团/女团总分）
+- gold / silver / bronze：范围内的金/银/铜牌数
+- medals：范围内的奖牌总数
+
+所有关键字一次 lexsort 排好，全部关键字都相同的国家并列，名次按竞赛排名记为 1, 2, 2, 4；
+并列的国家按编号升序列出。
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scoring_cache import ANY, ResultCache, gender_tag
+from scoring_engine import GENDER_FEMALE, GENDER_MALE, ScoringEngine
+from scoring_profile import timed
+
+MEDALS = ("gold", "silver", "bronze")
+MEDAL_LABELS = ("金", "银", "铜")
+SCOPES = ("all", "male", "female")
+SCOPE_LABELS = {"all": "全部", "male": "男子", "female": "女子"}
+RANK_KEYS = ("total",) + MEDALS + ("medals",)
+DEFAULT_TIEBREAK = ("total", "gold", "silver", "bronze")
+
+# 各范围依赖的缓存标签
+_SCOPE_TAGS = {
+    "all": (ANY,),
+    "male": (gender_tag(GENDER_MALE),),
+    "female": (gender_tag(GENDER_FEMALE),),
+}
+
+
+@dataclass
+class MedalTable:
+    """某范围的奖牌榜：order 为按名次排列的国家下标，rank[i] 为 order[i] 的并列名次。"""
+    scope: str
+    keys: Tuple[str, ...]
+    medals: np.ndarray    # int64[3, n]：金/银/铜
+    points: np.ndarray    # int64[n]：范围内的积分
+    order: np.ndarray
+    rank: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def country_rank(self, cid: int) -> int:
+        """国家编号 cid 的并列名次。"""
+        pos = int(np.flatnonzero(self.order == cid - 1)[0])
+        return int(self.rank[pos])
+
+
+def parse_tiebreak(text: str) -> Tuple[str, ...]:
+    """解析逗号分隔的排名依据，如 "total,gold,silver"；无效时抛出 ValueError。"""
+    keys = tuple(k.strip().lower() for k in text.split(",") if k.strip())
+    if not keys:
+        raise ValueError("排名依据不能为空")
+    unknown = [k for k in keys if k not in RANK_KEYS]
+    if unknown:
+        raise ValueError(f"未知的排名依据: {', '.join(unknown)}（可用 {', '.join(RANK_KEYS)}）")
+    if len(set(keys)) != len(keys):
+        raise ValueError("排名依据不能重复")
+    return keys
+
+
+def medal_counts(engine: ScoringEngine) -> np.ndarray:
+    """int64[2, 3, n]：[男/女, 金/银/铜, 国家下标] 的奖牌数，一次 bincount 得出。"""
+    n = engine.n_countries
+    if n <= 0:
+        return np.zeros((2, 3, 0), dtype=np.int64)
+    podium = engine.results[:, :3]
+    valid = (podium >= 1) & (podium <= n)
+    slot = np.where(engine.gender == GENDER_MALE, 0, 3)[:, None] + np.arange(3)[None, :]
+    flat = np.broadcast_to(slot, podium.shape)[valid] * n + (podium[valid] - 1)
+    return np.bincount(flat, minlength=6 * n).astype(np.int64).reshape(2, 3, n)
+
+
+def competition_ranks(columns: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """按各列依次降序排序（同值按下标升序），返回 (排列, 并列名次)。
+
+    全部列都相同的相邻行并列：名次为其中第一行的位置 + 1。
+    """
+    n = len(columns[0]) if columns else 0
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # lexsort 以最后一个键为主键：依次放入 编号、末位依据……首位依据
+    order = np.lexsort([np.arange(n)] + [-np.asarray(c) for c in reversed(columns)])
+    stacked = np.stack([np.asarray(c)[order] for c in columns])
+    new = np.ones(n, dtype=bool)
+    new[1:] = (stacked[:, 1:] != stacked[:, :-1]).any(axis=0)
+    rank = np.maximum.accumulate(np.where(new, np.arange(n), 0)) + 1
+    return order, rank
+
+
+@timed("medals.table")
+def medal_table(engine: ScoringEngine, scope: str = "all",
+                keys: Sequence[str] = DEFAULT_TIEBREAK) -> MedalTable:
+    """统计 scope（all/male/female）范围的奖牌并按 keys 排名。"""
+    if scope not in SCOPES:
+        raise ValueError(f"未知的统计范围: {scope}")
+    keys = tuple(keys)
+    counts = medal_counts(engine)
+    if scope == "all":
+        medals, points = counts.sum(axis=0), engine.total
+    elif scope == "male":
+        medals, points = counts[0], engine.male
+    else:
+        medals, points = counts[1], engine.female
+    points = np.asarray(points, dtype=np.int64)
+    columns = {"total": points, "medals": medals.sum(axis=0)}
+    columns.update(zip(MEDALS, medals))
+    order, rank = competition_ranks([columns[k] for k in keys])
+    return MedalTable(scope, keys, medals, points, order, rank)
+
+
+def cached_medal_table(engine: ScoringEngine, cache: Optional[ResultCache], scope: str = "all",
+                       keys: Sequence[str] = DEFAULT_TIEBREAK) -> MedalTable:
+    """经结果缓存取奖牌榜：男子/女子范围只在同性别项目改动时重算。"""
+    if cache is None:
+        return medal_table(engine, scope, keys)
+    return cache.get_or_compute(("medals", scope, tuple(keys)), lambda: medal_table(engine, scope, keys),
+                                _SCOPE_TAGS[scope])
+
+
+def medal_rows(table: MedalTable, limit: Optional[int] = None) -> Tuple[List[str], List[list]]:
+    """整理成表格：(表头, 行)，按名次排列。"""
+    header = ["名次", "国家编号"] + list(MEDAL_LABELS) + ["奖牌总数", "积分"]
+    count = len(table) if limit is None else min(limit, len(table))
+    rows = []
+    for pos in range(count):
+        idx = int(table.order[pos])
+        golds, silvers, bronzes = (int(v) for v in table.medals[:, idx])
+        rows.append([int(table.rank[pos]), idx + 1, golds, silvers, bronzes,
+                     golds + silvers + bronzes, int(table.points[idx])])
+    return header, rows
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""基于 ScoringEngine 的 Qt 模型与委托。
+
+表格只绘制可见行，编辑器仅在单元格处于编辑状态时创建，
+因此上万个项目的录入表也无需为每个单元格常驻一个控件。
+"""
+from typing import Tuple
+
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QIntValidator
+from PyQt5.QtWidgets import QStyledItemDelegate, QComboBox, QLineEdit, QTableView
+
+from scoring_cache import ANY, ResultCache, gender_tag
+from scoring_engine import ScoringEngine, GENDER_LABELS, GENDER_MALE, GENDER_FEMALE, MAX_PLACES
+from scoring_leaderboard import Leaderboard
+from scoring_medals import DEFAULT_TIEBREAK, MedalTable, cached_medal_table
+from scoring_profile import stage
+
+# 录入表列
+ENTRY_HEADERS = (
+    ["项目ID", "性别", "计分规则"]
+    + [f"第{n}名" for n in "一二三四五六七八九十"[:MAX_PLACES]]
+    + ["校验状态"]
+)
+COL_EVENT, COL_GENDER, COL_RULE = 0, 1, 2
+COL_FIRST_PLACE = 3
+COL_STATUS = COL_FIRST_PLACE + MAX_PLACES
+
+# 统计表列
+STATS_HEADERS = ["国家编号", "总分", "男团总分", "女团总分"]
+STATS_KEYS = ["id", "total", "male", "female"]
+
+# 奖牌榜列
+MEDAL_HEADERS = ["名次", "国家编号", "金", "银", "铜", "奖牌总数", "积分"]
+
+
+class EntryTableModel(QAbstractTableModel):
+    """成绩录入表：每行一个项目，数据直接读写引擎的数组。"""
+
+    def __init__(self, engine: ScoringEngine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        engine.add_listener(self._on_engine_changed)
+
+    # --------------------------- 引擎同步 ---------------------------
+    def _on_engine_changed(self, rows, countries):
+        if rows is None:
+            self.beginResetModel()
+            self.endResetModel()
+            return
+        last = self.columnCount() - 1
+        for row in rows:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, last))
+
+    def refresh_status(self):
+        """校验后通知视图重绘状态列（只有可见行会真正取数）。"""
+        if self.engine.n_events:
+            self.dataChanged.emit(self.index(0, COL_STATUS), self.index(self.engine.n_events - 1, COL_STATUS))
+
+    # --------------------------- 模型接口 ---------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.engine.n_events
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(ENTRY_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return ENTRY_HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        if col == COL_EVENT:
+            return str(row + 1)
+        if col == COL_GENDER:
+            return GENDER_LABELS[int(self.engine.gender[row])]
+        if col == COL_RULE:
+            rid = int(self.engine.rule[row])
+            return self.engine.rules[rid].name if role == Qt.DisplayRole else rid
+        if col == COL_STATUS:
+            return self.engine.status_message(row)
+        country = int(self.engine.results[row, col - COL_FIRST_PLACE])
+        return str(country) if country else ""
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        row, col = index.row(), index.column()
+        if col == COL_RULE:
+            return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+        if COL_FIRST_PLACE <= col < COL_STATUS:
+            # 超出规则名次数的列不可录入
+            if col - COL_FIRST_PLACE >= int(self.engine.top_n[row]):
+                return Qt.NoItemFlags
+            return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row, col = index.row(), index.column()
+        if col == COL_RULE:
+            self.engine.set_rule(row, int(value))
+            return True
+        if COL_FIRST_PLACE <= col < COL_STATUS:
+            txt = str(value).strip()
+            self.engine.set_place(row, col - COL_FIRST_PLACE, int(txt) if txt.isdigit() else 0)
+            return True
+        return False
+
+
+class RuleDelegate(QStyledItemDelegate):
+    """计分规则选择器：编辑时才创建下拉框（列出引擎当前的规则表），选中即提交。"""
+
+    def __init__(self, engine: ScoringEngine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+
+    def createEditor(self, parent, option, index):
+        combo = QComboBox(parent)
+        combo.addItems(self.engine.rules.names)
+        combo.activated.connect(lambda _i, c=combo: self._commit(c))
+        return combo
+
+    def _commit(self, combo: QComboBox):
+        self.commitData.emit(combo)
+        self.closeEditor.emit(combo)
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentIndex(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentIndex(), Qt.EditRole)
+
+
+class CountryDelegate(QStyledItemDelegate):
+    """名次列的国家编号编辑器（1..n）。"""
+
+    def __init__(self, engine: ScoringEngine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+
+    def createEditor(self, parent, option, index):
+        le = QLineEdit(parent)
+        le.setPlaceholderText("国家编号")
+        le.setValidator(QIntValidator(1, max(1, self.engine.n_countries)))
+        le.setAlignment(Qt.AlignCenter)
+        return le
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.EditRole)
+
+
+class StatsTableModel(QAbstractTableModel):
+    """排名统计表：直接读取引擎的得分数组。
+
+    按得分降序时，第 i 行的国家由实时排行榜按位置查出（对数时间），录入改动后无需重排；
+    其它排序方式的行顺序缓存为下标排列，只在其依赖的得分变化时重算：
+    按编号排序只随重置失效，男团/女团只随同性别项目的改动失效。
+    切换排序只发出一次 layoutChanged，不重新创建任何表项。
+    """
+
+    # 各排序字段依赖的缓存标签
+    _SORT_TAGS = {
+        "id": (),
+        "total": (ANY,),
+        "male": (gender_tag(GENDER_MALE),),
+        "female": (gender_tag(GENDER_FEMALE),),
+    }
+
+    def __init__(self, engine: ScoringEngine, leaderboard: Leaderboard, cache: ResultCache, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.leaderboard = leaderboard
+        self.cache = cache
+        self._sort_key: Tuple[str, bool] = ("id", True)
+        engine.add_listener(self._on_engine_changed)
+
+    # --------------------------- 排序 ---------------------------
+    def permutation(self, sort_key: Tuple[str, bool]) -> np.ndarray:
+        """返回某排序方式下的行顺序（国家下标排列）。"""
+        return self.cache.get_or_compute(("stats.sort",) + sort_key,
+                                         lambda: self.engine.sort_permutation(*sort_key),
+                                         self._SORT_TAGS[sort_key[0]])
+
+    def country_index(self, row: int) -> int:
+        """当前排序下第 row 行的国家下标（国家编号-1）。"""
+        key, asc = self._sort_key
+        if key == "id" and asc:
+            return row
+        if key in Leaderboard.KEYS and not asc:
+            return self.leaderboard.country_at(key, row) - 1
+        return int(self.permutation(self._sort_key)[row])
+
+    def set_sort(self, sort_key: Tuple[str, bool]):
+        self.layoutAboutToBeChanged.emit()
+        self._sort_key = sort_key
+        self.layoutChanged.emit()
+
+    @property
+    def sort_key(self) -> Tuple[str, bool]:
+        return self._sort_key
+
+    # --------------------------- 引擎同步 ---------------------------
+    def _on_engine_changed(self, rows, countries):
+        if countries is None:
+            self.beginResetModel()
+            self.endResetModel()
+            return
+        if not countries:
+            return
+        if self._sort_key == ("id", True):
+            for cid in countries:
+                self.dataChanged.emit(self.index(cid - 1, 1), self.index(cid - 1, 3))
+        else:
+            self.layoutAboutToBeChanged.emit()
+            self.layoutChanged.emit()
+
+    # --------------------------- 模型接口 ---------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.engine.n_countries
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(STATS_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return STATS_HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole:
+            return None
+        idx = self.country_index(index.row())
+        col = index.column()
+        if col == 0:
+            return str(idx + 1)
+        return str(int(getattr(self.engine, STATS_KEYS[col])[idx]))
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+
+class MedalTableModel(QAbstractTableModel):
+    """奖牌榜：整表由 scoring_medals 一次排好并缓存，改动后在下次绘制时重算。"""
+
+    def __init__(self, engine: ScoringEngine, cache: ResultCache, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.cache = cache
+        self._scope = "all"
+        self._keys: Tuple[str, ...] = DEFAULT_TIEBREAK
+        engine.add_listener(self._on_engine_changed)
+
+    def table(self) -> MedalTable:
+        return cached_medal_table(self.engine, self.cache, self._scope, self._keys)
+
+    def set_options(self, scope: str, keys: Tuple[str, ...]):
+        self.layoutAboutToBeChanged.emit()
+        self._scope, self._keys = scope, tuple(keys)
+        self.layoutChanged.emit()
+
+    def _on_engine_changed(self, rows, countries):
+        if rows is None:
+            self.beginResetModel()
+            self.endResetModel()
+        elif rows:
+            self.layoutAboutToBeChanged.emit()
+            self.layoutChanged.emit()
+
+    # --------------------------- 模型接口 ---------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.engine.n_countries
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(MEDAL_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return MEDAL_HEADERS[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role != Qt.DisplayRole:
+            return None
+        table = self.table()
+        pos, col = index.row(), index.column()
+        idx = int(table.order[pos])
+        if col == 0:
+            return str(int(table.rank[pos]))
+        if col == 1:
+            return str(idx + 1)
+        if col <= 4:
+            return str(int(table.medals[col - 2, idx]))
+        if col == 5:
+            return str(int(table.medals[:, idx].sum()))
+        return str(int(table.points[idx]))
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+
+class TimedTableView(QTableView):
+    """重绘耗时计入诊断数据的表格视图（阶段名为 view.paint.<名称>）。"""
+
+    def __init__(self, name: str, parent=None):
+        super().__init__(parent)
+        self._stage_name = f"view.paint.{name}"
+
+    def paintEvent(self, event):
+        with stage(self._stage_name):
+            super().paintEvent(event)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""可选的热点计时（不依赖 Qt）。
+
+用 @timed("名称") 标记函数、或用 with stage("名称") 包住一段代码，
+启用后按调用路径（用户操作 > 阶段 > 子阶段）累计次数与耗时，
+可导出为 JSON 或 cProfile/pstats 兼容的文件。未启用时只多一次布尔判断。
+"""
+import functools
+import json
+import marshal
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, Deque, Dict, List, Tuple
+
+# 调用路径，如 ("统计得分", "engine.validate")
+StagePath = Tuple[str, ...]
+
+_NULL = nullcontext()
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class _Stage:
+    """计时上下文：进入时压栈，退出时把耗时记到当前路径上。"""
+
+    __slots__ = ("inst", "name", "path", "t0")
+
+    def __init__(self, inst: "Instrumentation", name: str):
+        self.inst = inst
+        self.name = name
+
+    def __enter__(self):
+        stack = self.inst._stack()
+        stack.append(self.name)
+        self.path = tuple(stack)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        self.inst._stack().pop()
+        self.inst._record(self.path, elapsed)
+        return False
+
+
+class Instrumentation:
+    def __init__(self, history: int = 200):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats: Dict[StagePath, _StageStats] = {}
+        # 最近的顶层操作：(名称, 耗时秒, 结束时间戳)
+        self.recent: Deque[Tuple[str, float, float]] = deque(maxlen=history)
+
+    # --------------------------- 记录 ---------------------------
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, path: StagePath, elapsed: float):
+        with self._lock:
+            st = self._stats.get(path)
+            if st is None:
+                st = self._stats[path] = _StageStats()
+            st.count += 1
+            st.total += elapsed
+            if elapsed > st.max:
+                st.max = elapsed
+            if len(path) == 1:
+                self.recent.append((path[0], elapsed, time.time()))
+
+    def stage(self, name: str):
+        """计时上下文；未启用时返回空上下文。"""
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, name)
+
+    def timed(self, name: str) -> Callable:
+        """函数装饰器版本的 stage。"""
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Stage(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.recent.clear()
+
+    # --------------------------- 读取与导出 ---------------------------
+    def snapshot(self) -> List[Tuple[StagePath, int, float, float]]:
+        """[(路径, 次数, 总耗时秒, 最长单次秒)]，按路径排序，便于按树形展示。"""
+        with self._lock:
+            return sorted((path, st.count, st.total, st.max) for path, st in self._stats.items())
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": [
+                {"path": list(path), "count": count, "total_ms": round(total * 1000, 3),
+                 "avg_ms": round(total * 1000 / count, 3), "max_ms": round(mx * 1000, 3)}
+                for path, count, total, mx in self.snapshot()
+            ],
+            "recent_actions": [
+                {"action": name, "ms": round(sec * 1000, 3), "finished_at": ts} for name, sec, ts in list(self.recent)
+            ],
+        }
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def export_pstats(self, path: str):
+        """写成 pstats 可读取的文件：每个阶段名视为一个“函数”，父阶段为其调用者。
+
+        可用 python -m pstats 文件名，或 snakeviz 等工具查看。
+        """
+        snap = self.snapshot()
+        child_total: Dict[StagePath, float] = {}
+        for p, _count, total, _mx in snap:
+            if len(p) > 1:
+                child_total[p[:-1]] = child_total.get(p[:-1], 0.0) + total
+
+        def key(name: str):
+            return ("<stage>", 0, name)
+
+        stats: Dict[tuple, list] = {}
+        for p, count, total, _mx in snap:
+            own = max(0.0, total - child_total.get(p, 0.0))
+            entry = stats.setdefault(key(p[-1]), [0, 0, 0.0, 0.0, {}])
+            entry[0] += count
+            entry[1] += count
+            entry[2] += own
+            entry[3] += total
+            if len(p) > 1:
+                caller = entry[4].setdefault(key(p[-2]), [0, 0, 0.0, 0.0])
+                caller[0] += count
+                caller[1] += count
+                caller[2] += own
+                caller[3] += total
+        data = {k: (cc, nc, tt, ct, {ck: tuple(cv) for ck, cv in callers.items()})
+                for k, (cc, nc, tt, ct, callers) in stats.items()}
+        with open(path, "wb") as f:
+            marshal.dump(data, f)
+
+
+# 全局实例：各模块共用
+INSTRUMENTATION = Instrumentation()
+stage = INSTRUMENTATION.stage
+timed = INSTRUMENTATION.timed
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""形势预测：蒙特卡洛模拟尚未录入的名次，估计各国最终名次的分布（不依赖 Qt）。
+
+已录入的名次保持不变，每个项目待定的名次从尚未在该项目上榜的国家中抽取：
+
+- uniform：各国机会均等
+- strength：按实力加权，权重为 (当前得分 + 1) ** power；逐个名次不放回抽取，
+  即第一名按权重抽取，第二名在其余国家中按权重抽取，依此类推
+
+每批模拟整体向量化：一次抽出一批情景的全部待定名次，用 bincount 汇总得分，
+再对每个情景的得分排序求并列名次（同分同名次，与排行榜一致）。
+情景按固定大小分块交给进程池，各块的随机种子由总种子派生，结果与进程数无关。
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from scoring_engine import GENDER_FEMALE, GENDER_MALE, OperationCancelled, ScoringEngine
+from scoring_profile import timed
+
+MODELS = ("uniform", "strength")
+KEYS = ("total", "male", "female")
+
+# 每个进程任务模拟的情景数（固定，保证同一种子在不同进程数下结果相同）
+_CHUNK = 4096
+# 单批工作数组的元素数上限，控制内存
+_BATCH_ELEMENTS = 500_000
+# 逐名次拒绝重抽的轮数上限，之后对剩余情景改为在排除已上榜国家后的权重上直接抽取
+_REJECT_ROUNDS = 32
+
+
+@dataclass
+class ProjectionProblem:
+    """一次预测所需的全部数据（可序列化后交给子进程）。"""
+    key: str
+    model: str
+    base: np.ndarray          # int64[n]：当前得分
+    rows: np.ndarray          # 仍有待定名次的项目行号
+    fixed: np.ndarray         # int32[R, P]：这些项目已录入的有效国家（重复与越界记为 0）
+    open_mask: np.ndarray     # bool[R, P]：待定名次
+    points: np.ndarray        # int64[R, P]：各名次的分值
+    cum_weights: Optional[np.ndarray] = None  # float64[n]：strength 模型的累积权重
+
+    @property
+    def n_countries(self) -> int:
+        return len(self.base)
+
+    @property
+    def open_slots(self) -> int:
+        return int(self.open_mask.sum())
+
+
+@dataclass
+class Projection:
+    """预测结果：hist[i, r] 为国家 i+1 最终排第 r+1 名的情景数，最后一列为排在 max_rank 名之后。"""
+    problem: ProjectionProblem
+    n_sims: int
+    hist: np.ndarray      # int64[n, max_rank + 1]
+    rank_sum: np.ndarray  # float64[n]：各情景名次之和
+
+    @property
+    def max_rank(self) -> int:
+        return self.hist.shape[1] - 1
+
+    @property
+    def mean_rank(self) -> np.ndarray:
+        return self.rank_sum / max(self.n_sims, 1)
+
+    def probability(self, rank: int) -> np.ndarray:
+        """各国最终排第 rank 名（含并列）的概率。"""
+        return self.hist[:, rank - 1] / max(self.n_sims, 1)
+
+    def probability_top(self, k: int) -> np.ndarray:
+        """各国最终进入前 k 名的概率（k 不超过 max_rank）。"""
+        return self.hist[:, :k].sum(axis=1) / max(self.n_sims, 1)
+
+    def leaders(self, limit: Optional[int] = None) -> np.ndarray:
+        """按夺冠概率降序、平均名次升序排列的国家下标；只含至少一次进入前 max_rank 名的国家。"""
+        reached = np.flatnonzero(self.hist[:, :-1].sum(axis=1) > 0)
+        order = np.lexsort((reached, self.mean_rank[reached], -self.hist[reached, 0]))
+        out = reached[order]
+        return out if limit is None else out[:limit]
+
+
+# --------------------------- 建模 ---------------------------
+@timed("project.build")
+def build_problem(engine: ScoringEngine, key: str = "total", model: str = "uniform",
+                  power: float = 1.0) -> ProjectionProblem:
+    """从引擎当前数据中取出待定名次；key 为 total/male/female，决定参与的项目与排名依据。"""
+    if key not in KEYS:
+        raise ValueError(f"未知的排名依据: {key}")
+    if model not in MODELS:
+        raise ValueError(f"未知的预测模型: {model}")
+    if power < 0:
+        raise ValueError("实力权重的指数不能为负")
+    n = engine.n_countries
+    base = np.array(getattr(engine, key), dtype=np.int64)
+    results, top_n = engine.results, engine.top_n
+    places = np.arange(results.shape[1])[None, :]
+    needed = places < top_n[:, None]
+
+    in_key = np.ones(len(top_n), dtype=bool)
+    if key == "male":
+        in_key = engine.gender == GENDER_MALE
+    elif key == "female":
+        in_key = engine.gender == GENDER_FEMALE
+    rows = np.flatnonzero(in_key & ((results == 0) & needed).any(axis=1))
+    width = int(top_n[rows].max()) if len(rows) else 0
+
+    fixed = results[rows, :width].astype(np.int32)
+    need = needed[rows, :width]
+    open_mask = need & (fixed == 0)
+    fixed = np.where(need & (fixed >= 1) & (fixed <= n), fixed, 0)
+    # 同一国家重复录入时只保留第一次，用于判重
+    s = np.sort(fixed, axis=1)
+    for r in np.flatnonzero(((s[:, 1:] == s[:, :-1]) & (s[:, 1:] > 0)).any(axis=1)):
+        _, first = np.unique(fixed[r], return_index=True)
+        keep = np.zeros(width, dtype=bool)
+        keep[first] = True
+        fixed[r, ~keep] = 0
+    # 国家不够填满全部名次时，只抽取排在前面的那些名次
+    available = n - np.count_nonzero(fixed, axis=1)
+    open_mask &= np.cumsum(open_mask, axis=1) <= available[:, None]
+
+    keep_rows = open_mask.any(axis=1)
+    rows, fixed, open_mask = rows[keep_rows], fixed[keep_rows], open_mask[keep_rows]
+    points = engine.points_matrix()[rows, :width]
+
+    cum_weights = None
+    if model == "strength" and n:
+        weights = (base + 1.0) ** power
+        cum_weights = np.cumsum(weights / weights.sum())
+        cum_weights[-1] = 1.0
+    return ProjectionProblem(key, model, base, rows, fixed, open_mask, points, cum_weights)
+
+
+# --------------------------- 模拟 ---------------------------
+def _draw(rng: np.random.Generator, problem: ProjectionProblem, size) -> np.ndarray:
+    """按模型抽取国家编号（可重复）。"""
+    if problem.cum_weights is None:
+        return rng.integers(1, problem.n_countries + 1, size=size, dtype=np.int32)
+    return (np.searchsorted(problem.cum_weights, rng.random(size), side="right") + 1).astype(np.int32)
+
+
+def _draw_excluding(rng: np.random.Generator, problem: ProjectionProblem, taken: np.ndarray) -> np.ndarray:
+    """每行从未被占用的国家中抽取一个；taken 为 int32[k, P]，0 表示空位。"""
+    n = problem.n_countries
+    if problem.cum_weights is None:
+        weights = np.ones((len(taken), n))
+    else:
+        weights = np.broadcast_to(np.diff(problem.cum_weights, prepend=0.0), (len(taken), n)).copy()
+    r, c = np.nonzero(taken)
+    weights[r, taken[r, c] - 1] = 0.0
+    cum = np.cumsum(weights, axis=1)
+    u = rng.random(len(taken)) * cum[:, -1]
+    return (np.argmax(cum > u[:, None], axis=1) + 1).astype(np.int32)
+
+
+def _simulate_batch(rng: np.random.Generator, problem: ProjectionProblem, batch: int) -> np.ndarray:
+    """模拟 batch 个情景，返回各情景的最终得分 int64[batch, n]。"""
+    n = problem.n_countries
+    fixed, open_mask = problem.fixed, problem.open_mask
+    # 按名次存放：slots[c] 为第 c+1 名在各情景、各项目中的国家，逐名次处理时都是连续内存
+    slots = np.broadcast_to(fixed.T[:, None, :], (fixed.shape[1], batch, fixed.shape[0])).copy()
+    occupied = (fixed > 0).any(axis=0)
+    # 逐名次不放回抽取：抽到该项目已上榜的国家则重抽
+    for col in range(slots.shape[0]):
+        open_col = open_mask[:, col]
+        if not open_col.any():
+            continue
+        drawn = _draw(rng, problem, (batch, len(open_col)))
+        clash = np.zeros(drawn.shape, dtype=bool)
+        for c in np.flatnonzero(occupied):
+            if c != col:
+                clash |= slots[c] == drawn
+        bi, ri = np.nonzero(clash & open_col)
+        for _ in range(_REJECT_ROUNDS):
+            if not len(bi):
+                break
+            redraw = _draw(rng, problem, len(bi))
+            drawn[bi, ri] = redraw
+            clash = (slots[:, bi, ri] == redraw).any(axis=0)
+            bi, ri = bi[clash], ri[clash]
+        if len(bi):
+            drawn[bi, ri] = _draw_excluding(rng, problem, slots[:, bi, ri].T)
+        np.copyto(slots[col], drawn, where=open_col)
+        occupied[col] = True
+
+    oplace, orow = np.nonzero(open_mask.T)
+    countries = slots[oplace, :, orow]  # [待定名次, 情景]
+    flat = (np.arange(batch, dtype=np.int64)[None, :] * n + countries - 1).ravel()
+    pts = np.broadcast_to(problem.points[orow, oplace][:, None], countries.shape).ravel()
+    gained = np.bincount(flat, weights=pts, minlength=batch * n).reshape(batch, n)
+    return problem.base[None, :] + gained.astype(np.int64)
+
+
+def _competition_ranks(totals: np.ndarray) -> np.ndarray:
+    """每行（一个情景）内的并列名次：1 + 得分严格更高的国家数。"""
+    batch, n = totals.shape
+    s = np.sort(totals, axis=1)
+    # 各行加上互不重叠的偏移后首尾相接，整体有序，可一次 searchsorted
+    offset = (np.arange(batch, dtype=np.int64) * (int(s[:, -1].max()) + 1))[:, None]
+    at_most = np.searchsorted((s + offset).ravel(), (totals + offset).ravel(), side="right")
+    at_most = at_most.reshape(batch, n) - np.arange(batch, dtype=np.int64)[:, None] * n
+    return n - at_most + 1
+
+
+def _run_chunk(problem: ProjectionProblem, seed: np.random.SeedSequence, n_sims: int,
+               max_rank: int) -> Tuple[np.ndarray, np.ndarray]:
+    n = problem.n_countries
+    rng = np.random.default_rng(seed)
+    hist = np.zeros(n * (max_rank + 1), dtype=np.int64)
+    rank_sum = np.zeros(n, dtype=np.float64)
+    per_sim = max(problem.fixed.size, n, 1)
+    batch = max(1, min(n_sims, _BATCH_ELEMENTS // per_sim))
+    cells = np.arange(n, dtype=np.int64) * (max_rank + 1)
+    done = 0
+    while done < n_sims:
+        b = min(batch, n_sims - done)
+        ranks = _competition_ranks(_simulate_batch(rng, problem, b))
+        hist += np.bincount((cells + np.minimum(ranks, max_rank + 1) - 1).ravel(), minlength=len(hist))
+        rank_sum += ranks.sum(axis=0)
+        done += b
+    return hist.reshape(n, max_rank + 1), rank_sum
+
+
+# 子进程中的预测数据：由进程池初始化函数设置一次，避免每个任务重复传输
+_WORKER_PROBLEM: Optional[ProjectionProblem] = None
+
+
+def _init_worker(problem: ProjectionProblem):
+    global _WORKER_PROBLEM
+    _WORKER_PROBLEM = problem
+
+
+def _worker_chunk(seed: np.random.SeedSequence, n_sims: int, max_rank: int) -> Tuple[np.ndarray, np.ndarray]:
+    return _run_chunk(_WORKER_PROBLEM, seed, n_sims, max_rank)
+
+
+@timed("project.run")
+def run_projection(problem: ProjectionProblem, n_sims: int = 100_000, max_rank: int = 10,
+                   workers: Optional[int] = None, seed: Optional[int] = None,
+                   progress: Optional[Callable[[int, int], None]] = None,
+                   cancelled: Optional[Callable[[], bool]] = None) -> Projection:
+    """模拟 n_sims 个情景；workers 为进程数（默认全部核心，1 表示在本进程内运行）。
+
+    progress(已完成情景数, 总数) 在每块完成后调用；cancelled() 返回真时停止并抛出 OperationCancelled。
+    """
+    if n_sims < 1:
+        raise ValueError("模拟次数至少为 1")
+    if max_rank < 1:
+        raise ValueError("统计的名次数至少为 1")
+    n = problem.n_countries
+    max_rank = min(max_rank, max(n, 1))
+    hist = np.zeros((n, max_rank + 1), dtype=np.int64)
+    rank_sum = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return Projection(problem, n_sims, hist, rank_sum)
+
+    seeds = np.random.SeedSequence(seed)
+    if problem.open_slots == 0:
+        # 没有待定名次：最终名次已确定，模拟一次即可
+        one_hist, one_sum = _run_chunk(problem, seeds, 1, max_rank)
+        return Projection(problem, n_sims, one_hist * n_sims, one_sum * n_sims)
+
+    sizes = [min(_CHUNK, n_sims - start) for start in range(0, n_sims, _CHUNK)]
+    chunks = list(zip(seeds.spawn(len(sizes)), sizes))
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    done = 0
+
+    def collect(part: Tuple[np.ndarray, np.ndarray], size: int):
+        nonlocal done
+        np.add(hist, part[0], out=hist)
+        np.add(rank_sum, part[1], out=rank_sum)
+        done += size
+        if progress is not None:
+            progress(done, n_sims)
+
+    if workers <= 1:
+        for chunk_seed, size in chunks:
+            if cancelled is not None and cancelled():
+                raise OperationCancelled()
+            collect(_run_chunk(problem, chunk_seed, size, max_rank), size)
+        return Projection(problem, n_sims, hist, rank_sum)
+
+    # 用 spawn 启动子进程：界面进程里有 Qt 线程，fork 不安全
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(problem,)) as pool:
+        pending = {pool.submit(_worker_chunk, chunk_seed, size, max_rank): size for chunk_seed, size in chunks}
+        try:
+            while pending:
+                finished, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    collect(fut.result(), pending.pop(fut))
+                if cancelled is not None and cancelled():
+                    raise OperationCancelled()
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return Projection(problem, n_sims, hist, rank_sum)
+
+
+def project(engine: ScoringEngine, n_sims: int = 100_000, key: str = "total", model: str = "uniform",
+            power: float = 1.0, max_rank: int = 10, workers: Optional[int] = None,
+            seed: Optional[int] = None) -> Projection:
+    """build_problem + run_projection 的便捷入口。"""
+    return run_projection(build_problem(engine, key, model, power), n_sims, max_rank, workers, seed)
+
+
+def projection_rows(proj: Projection, limit: Optional[int] = None) -> Tuple[List[str], List[list]]:
+    """整理成表格：(表头, 行)；行按夺冠概率降序。"""
+    k = proj.max_rank
+    header = (["国家编号", "当前得分", "夺冠概率", f"前{min(3, k)}概率", "平均名次"]
+              + [f"第{r}名" for r in range(1, k + 1)] + [f"第{k}名之后"])
+    probs = proj.hist / max(proj.n_sims, 1)
+    top3 = proj.probability_top(min(3, k))
+    mean = proj.mean_rank
+    rows = []
+    for i in proj.leaders(limit).tolist():
+        rows.append([i + 1, int(proj.problem.base[i]), probs[i, 0], top3[i], mean[i]] + probs[i].tolist())
+    return header, rows
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""条件查询（不依赖 Qt）。
+
+把成绩数据看作两张列式表，条件表达式编译为 numpy 布尔掩码后整列筛选：
+
+- 名次表 placings：每个有效名次一行，列为 event/gender/rule/place/country/points
+- 国家表 countries：每个国家一行，列为 country/total/male/female/gold/silver/bronze/placings
+
+条件用 Python 表达式语法书写，只允许比较、and/or/not、in 与算术运算，例如：
+
+    country == 5 and place <= 2          # 国家 5 进入前二的项目
+    female >= 30                          # 女团得分不低于 30 的国家
+    性别 == '女' and 名次 == 1            # 列名也可用中文别名
+
+为常用的范围条件建立有序索引（create_index）后，单列比较改为二分查找取行号。
+表、索引与查询结果存放在 ResultCache 中，数据变化后首次查询时重建。
+"""
+import ast
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from scoring_cache import ResultCache
+from scoring_engine import ScoringEngine, GENDER_LABELS
+from scoring_profile import timed
+
+PLACINGS = "placings"
+COUNTRIES = "countries"
+
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    PLACINGS: ("event", "gender", "rule", "place", "country", "points"),
+    COUNTRIES: ("country", "total", "male", "female", "gold", "silver", "bronze", "placings"),
+}
+
+COLUMN_ALIASES = {
+    "项目": "event", "性别": "gender", "规则": "rule", "名次": "place", "国家": "country", "得分": "points",
+    "总分": "total", "男团": "male", "女团": "female", "金牌": "gold", "银牌": "silver", "铜牌": "bronze",
+    "上榜次数": "placings",
+}
+
+AGGREGATES = ("count", "sum", "min", "max", "mean")
+# 最多保留的编译结果数（最近最少使用的先淘汰）
+COMPILED_CAPACITY = 128
+
+Table = Dict[str, np.ndarray]
+
+
+class QueryError(ValueError):
+    pass
+
+
+@dataclass
+class QueryResult:
+    columns: List[str]
+    data: List[np.ndarray]  # 与 columns 一一对应的列
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    def rows(self) -> Iterator[tuple]:
+        return zip(*(col.tolist() for col in self.data))
+
+
+# --------------------------- 有序索引 ---------------------------
+class _SortedIndex:
+    """某列的有序索引：排序后的取值与对应行号，范围条件用二分查找取出行号。"""
+
+    def __init__(self, values: np.ndarray):
+        self.order = np.argsort(values, kind="stable")
+        self.sorted = values[self.order]
+
+    def lookup(self, op: type, value) -> np.ndarray:
+        s = self.sorted
+        if op is ast.Eq:
+            lo, hi = np.searchsorted(s, value, "left"), np.searchsorted(s, value, "right")
+        elif op is ast.Lt:
+            lo, hi = 0, np.searchsorted(s, value, "left")
+        elif op is ast.LtE:
+            lo, hi = 0, np.searchsorted(s, value, "right")
+        elif op is ast.Gt:
+            lo, hi = np.searchsorted(s, value, "right"), len(s)
+        else:  # ast.GtE
+            lo, hi = np.searchsorted(s, value, "left"), len(s)
+        return self.order[lo:hi]
+
+
+_INDEXABLE_OPS = (ast.Eq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+_FLIPPED = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Eq: ast.Eq}
+_COMPARE = {
+    ast.Eq: np.equal, ast.NotEq: np.not_equal, ast.Lt: np.less,
+    ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+}
+_ARITH = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.FloorDiv: np.floor_divide,
+          ast.Mod: np.mod}
+
+
+# --------------------------- 编译 ---------------------------
+# 编译结果：(表, 各列的有序索引) -> 掩码或数值列
+_Compiled = Callable[[Table, Dict[str, _SortedIndex]], np.ndarray]
+
+
+class _Compiler:
+    def __init__(self, columns: Sequence[str], encoders: Dict[str, Dict[str, int]]):
+        self.columns = columns
+        self.encoders = encoders
+
+    def column_name(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.Name):
+            name = COLUMN_ALIASES.get(node.id, node.id)
+            if name not in self.columns:
+                raise QueryError(f"未知的列: {node.id}（可用：{', '.join(self.columns)}）")
+            return name
+        return None
+
+    def constant(self, node: ast.AST, column: Optional[str]):
+        """整数常量；字符串按所比较列的取值表（性别、规则名称）转换为编码。"""
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = self.constant(node.operand, column)
+            return None if value is None else -value
+        if not isinstance(node, ast.Constant):
+            return None
+        value = node.value
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise QueryError(f"不支持的常量: {value!r}")
+        if isinstance(value, str):
+            table = self.encoders.get(column or "")
+            if table is None or value not in table:
+                raise QueryError(f"无法把 {value!r} 与列 {column or '表达式'} 比较")
+            return table[value]
+        return value
+
+    def compile(self, node: ast.AST) -> _Compiled:
+        if isinstance(node, ast.BoolOp):
+            parts = [self.compile(v) for v in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def bool_op(t, ix):
+                out = parts[0](t, ix)
+                for p in parts[1:]:
+                    out = combine(out, p(t, ix))
+                return out
+            return bool_op
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = self.compile(node.operand)
+            return lambda t, ix: np.logical_not(inner(t, ix))
+        if isinstance(node, ast.Compare):
+            return self.compile_compare(node)
+        if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+            left, right, fn = self.compile(node.left), self.compile(node.right), _ARITH[type(node.op)]
+            if not isinstance(node.op, (ast.FloorDiv, ast.Mod)):
+                return lambda t, ix: fn(left(t, ix), right(t, ix))
+            if self.constant(node.right, None) == 0:
+                raise QueryError("除数不能为 0")
+
+            def divide(t, ix):
+                # 列中出现 0 除数时报错，而不是以无意义的结果继续筛选
+                try:
+                    with np.errstate(divide="raise"):
+                        return fn(left(t, ix), right(t, ix))
+                except (FloatingPointError, ZeroDivisionError):
+                    raise QueryError("除数为 0") from None
+            return divide
+        name = self.column_name(node)
+        if name is not None:
+            return lambda t, ix: t[name]
+        value = self.constant(node, None)
+        if value is not None:
+            return lambda t, ix: value
+        raise QueryError(f"不支持的语法 {type(node).__name__}：只允许列名、整数/字符串常量、比较、"
+                         "and/or/not、in 与 + - * // %")
+
+    def compile_compare(self, node: ast.Compare) -> _Compiled:
+        # 链式比较 a < b <= c 拆成 (a < b) and (b <= c)
+        terms = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            terms.append(self.compile_term(left, op, right))
+            left = right
+        if len(terms) == 1:
+            return terms[0]
+        return lambda t, ix: np.logical_and.reduce([term(t, ix) for term in terms])
+
+    def compile_term(self, left: ast.AST, op: ast.cmpop, right: ast.AST) -> _Compiled:
+        lcol, rcol = self.column_name(left), self.column_name(right)
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if lcol is None or not isinstance(right, (ast.Tuple, ast.List, ast.Set)):
+                raise QueryError("in 的左边须为列名，右边须为常量列表")
+            values = [self.constant(e, lcol) for e in right.elts]
+            if any(v is None for v in values):
+                raise QueryError("in 的右边只能是常量")
+            invert = isinstance(op, ast.NotIn)
+            return lambda t, ix: np.isin(t[lcol], values, invert=invert)
+        if type(op) not in _COMPARE:
+            raise QueryError("不支持的比较运算")
+        # 单列与常量比较：可走有序索引
+        op_type = type(op)
+        column, value = None, None
+        if lcol is not None and rcol is None:
+            column, value = lcol, self.constant(right, lcol)
+        elif rcol is not None and lcol is None:
+            value = self.constant(left, rcol)
+            if value is not None:
+                column, op_type = rcol, _FLIPPED.get(op_type, op_type)
+        if column is not None and value is not None:
+            fn = _COMPARE[op_type]
+            indexable = op_type in _INDEXABLE_OPS
+
+            def term(t, ix):
+                index = ix.get(column) if indexable else None
+                if index is None:
+                    return fn(t[column], value)
+                mask = np.zeros(len(t[column]), dtype=bool)
+                mask[index.lookup(op_type, value)] = True
+                return mask
+            return term
+        lhs, rhs, fn = self.compile(left), self.compile(right), _COMPARE[op_type]
+        return lambda t, ix: fn(lhs(t, ix), rhs(t, ix))
+
+
+# --------------------------- 查询入口 ---------------------------
+class QueryEngine:
+    """在引擎数据上执行条件查询；表、索引、查询结果与编译结果都会缓存。
+
+    cache 可与界面的其它视图共用；省略时自建一个。
+    """
+
+    def __init__(self, engine: ScoringEngine, cache: Optional[ResultCache] = None):
+        self.engine = engine
+        self.cache = cache if cache is not None else ResultCache(engine)
+        self._index_columns: Dict[str, set] = {PLACINGS: set(), COUNTRIES: set()}
+        self._compiled: "OrderedDict[Tuple[str, str, Tuple[str, ...]], _Compiled]" = OrderedDict()
+
+    # --------------------------- 表与索引 ---------------------------
+    @timed("query.build_table")
+    def _build(self, name: str) -> Table:
+        eng = self.engine
+        n = eng.n_countries
+        valid = (eng.results >= 1) & (eng.results <= n)
+        rows, places = np.nonzero(valid)
+        countries = eng.results[rows, places].astype(np.int64)
+        if name == PLACINGS:
+            return {
+                "event": rows.astype(np.int64) + 1,
+                "gender": eng.gender[rows].astype(np.int64),
+                "rule": eng.rule[rows].astype(np.int64),
+                "place": places.astype(np.int64) + 1,
+                "country": countries,
+                "points": eng.points_matrix()[rows, places],
+            }
+
+        def medals(place: int) -> np.ndarray:
+            return np.bincount(countries[places == place - 1] - 1, minlength=n).astype(np.int64)
+        return {
+            "country": np.arange(1, n + 1, dtype=np.int64),
+            "total": np.asarray(eng.total, dtype=np.int64),
+            "male": np.asarray(eng.male, dtype=np.int64),
+            "female": np.asarray(eng.female, dtype=np.int64),
+            "gold": medals(1), "silver": medals(2), "bronze": medals(3),
+            "placings": np.bincount(countries - 1, minlength=n).astype(np.int64),
+        }
+
+    def table(self, name: str) -> Table:
+        if name not in TABLE_COLUMNS:
+            raise QueryError(f"未知的表: {name}")
+        return self.cache.get_or_compute(("query.table", name), lambda: self._build(name))
+
+    def create_index(self, table: str, column: str):
+        """为 table.column 建立有序索引（数据变化后按需重建）。"""
+        if table not in TABLE_COLUMNS:
+            raise QueryError(f"未知的表: {table}")
+        self._index_columns[table].add(self._resolve(table, column))
+
+    def drop_index(self, table: str, column: str):
+        column = COLUMN_ALIASES.get(column, column)
+        self._index_columns[table].discard(column)
+
+    def _table_indexes(self, table: str) -> Dict[str, _SortedIndex]:
+        t = self.table(table)
+        return {column: self.cache.get_or_compute(("query.index", table, column),
+                                                  lambda: _SortedIndex(t[column]))
+                for column in self._index_columns[table]}
+
+    def _encoders(self) -> Dict[str, Dict[str, int]]:
+        return {
+            "gender": {label: code for code, label in enumerate(GENDER_LABELS)},
+            "rule": {name: rid for rid, name in enumerate(self.engine.rules.names)},
+        }
+
+    def compile(self, table: str, where: str) -> _Compiled:
+        # 规则名称编译成规则编号，规则表变了须重新编译，故连同规则名称一起作键
+        key = (table, where, tuple(self.engine.rules.names))
+        fn = self._compiled.get(key)
+        if fn is not None:
+            self._compiled.move_to_end(key)
+            return fn
+        try:
+            tree = ast.parse(where, mode="eval")
+        except SyntaxError as e:
+            raise QueryError(f"条件语法错误: {e.msg}")
+        fn = _Compiler(TABLE_COLUMNS[table], self._encoders()).compile(tree.body)
+        self._compiled[key] = fn
+        if len(self._compiled) > COMPILED_CAPACITY:
+            self._compiled.popitem(last=False)
+        return fn
+
+    @timed("query.mask")
+    def mask(self, table: str, where: str = "") -> np.ndarray:
+        """满足条件的行的布尔掩码；条件为空时全选。"""
+        t = self.table(table)
+        n_rows = len(next(iter(t.values())))
+        if not where.strip():
+            return np.ones(n_rows, dtype=bool)
+        out = np.broadcast_to(self.compile(table, where)(t, self._table_indexes(table)), (n_rows,))
+        if out.dtype != bool:
+            raise QueryError("条件的结果应为真/假")
+        return out
+
+    # --------------------------- 查询 ---------------------------
+    def _resolve(self, table: str, column: str) -> str:
+        name = COLUMN_ALIASES.get(column.strip(), column.strip())
+        if name not in TABLE_COLUMNS[table]:
+            raise QueryError(f"未知的列: {column}")
+        return name
+
+    def select(self, table: str, where: str = "", order_by: Optional[str] = None, desc: bool = False,
+               limit: Optional[int] = None) -> QueryResult:
+        """筛选行；可按某列排序（稳定排序，同值保持原顺序）并限制行数。"""
+        return self.cache.get_or_compute(("query.select", table, where, order_by, desc, limit),
+                                         lambda: self._select(table, where, order_by, desc, limit))
+
+    @timed("query.select")
+    def _select(self, table: str, where: str, order_by: Optional[str], desc: bool,
+                limit: Optional[int]) -> QueryResult:
+        t = self.table(table)
+        rows = np.flatnonzero(self.mask(table, where))
+        if order_by:
+            col = t[self._resolve(table, order_by)][rows]
+            rows = rows[np.argsort(-col if desc else col, kind="stable")]
+        if limit is not None:
+            rows = rows[:limit]
+        columns = list(TABLE_COLUMNS[table])
+        return QueryResult(columns, [t[c][rows] for c in columns])
+
+    def aggregate(self, table: str, where: str = "", group_by: Sequence[str] = (),
+                  agg: str = "count", value: Optional[str] = None) -> QueryResult:
+        """按 group_by 各列分组，对 value 列做 count/sum/min/max/mean。"""
+        return self.cache.get_or_compute(("query.aggregate", table, where, tuple(group_by), agg, value),
+                                         lambda: self._aggregate(table, where, group_by, agg, value))
+
+    @timed("query.aggregate")
+    def _aggregate(self, table: str, where: str, group_by: Sequence[str], agg: str,
+                   value: Optional[str]) -> QueryResult:
+        if agg not in AGGREGATES:
+            raise QueryError(f"未知的统计方式: {agg}")
+        if agg != "count" and not value:
+            raise QueryError(f"{agg} 需要指定统计列")
+        t = self.table(table)
+        rows = np.flatnonzero(self.mask(table, where))
+        keys = [self._resolve(table, c) for c in group_by if c.strip()]
+        if keys:
+            groups, inverse = np.unique(np.stack([t[c][rows] for c in keys], axis=1), axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            key_cols = [groups[:, i] for i in range(len(keys))]
+            n_groups = len(groups)
+        else:
+            inverse, key_cols = np.zeros(len(rows), dtype=np.intp), []
+            n_groups = 1 if len(rows) else 0
+
+        if agg == "count":
+            result = np.bincount(inverse, minlength=n_groups).astype(np.int64)
+        else:
+            vals = t[self._resolve(table, value)][rows]
+            if agg in ("sum", "mean"):
+                result = np.bincount(inverse, weights=vals, minlength=n_groups)
+                if agg == "mean":
+                    result = result / np.maximum(np.bincount(inverse, minlength=n_groups), 1)
+                else:
+                    result = result.astype(np.int64)
+            else:
+                ufunc = np.minimum if agg == "min" else np.maximum
+                result = np.full(n_groups, vals.max() if agg == "min" else vals.min(), dtype=np.int64) \
+                    if len(vals) else np.zeros(n_groups, dtype=np.int64)
+                ufunc.at(result, inverse, vals)
+        label = agg if agg == "count" else f"{agg}({self._resolve(table, value)})"
+        return QueryResult(keys + [label], key_cols + [result])
+
+    # --------------------------- 显示 ---------------------------
+    def format_value(self, column: str, value) -> str:
+        """把编码列转成界面文字（性别、规则名称），其余原样输出。"""
+        if column == "gender":
+            return GENDER_LABELS[int(value)]
+        if column == "rule":
+            return self.engine.rules[int(value)].name
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return str(value)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""计分规则（不依赖 Qt）。
+
+每条规则给出第 1..k 名的分值（k 即该规则需录入的名次数）与整数倍率，
+团体项目等可用倍率加权。规则表整体编译为 int64[规则数, MAX_PLACES] 的分值矩阵，
+引擎按每个项目的规则编号取行，计分始终是一次“取值 + 求和”，与规则种类多少无关。
+
+规则文件为 JSON 数组，追加在内置的“前三”“前五”之后：
+
+    [{"name": "前八", "points": [10, 8, 6, 5, 4, 3, 2, 1]},
+     {"name": "团体前三", "points": [5, 3, 2], "weight": 2}]
+"""
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 每个项目最多录入的名次数（成绩矩阵的列数）
+MAX_PLACES = 8
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    name: str
+    points: Tuple[int, ...]  # 第1..k名的分值
+    weight: int = 1          # 倍率
+
+    @property
+    def places(self) -> int:
+        return len(self.points)
+
+    def scaled_points(self) -> List[int]:
+        return [p * self.weight for p in self.points]
+
+
+BUILTIN_RULES = (
+    RuleSet("前三", (5, 3, 2)),
+    RuleSet("前五", (7, 5, 3, 2, 1)),
+)
+RULE_TOP3 = 0
+RULE_TOP5 = 1
+
+# 内置规则的其它写法（导入文件时使用）
+_BUILTIN_ALIASES = {"3": RULE_TOP3, "5": RULE_TOP5, "top3": RULE_TOP3, "top5": RULE_TOP5}
+
+
+def _check_rule(rule: RuleSet):
+    if not rule.name.strip():
+        raise ValueError("规则名称不能为空")
+    if not 1 <= rule.places <= MAX_PLACES:
+        raise ValueError(f"规则 {rule.name} 的名次数需在 1..{MAX_PLACES}")
+    if any(not isinstance(p, int) or p < 0 for p in rule.points):
+        raise ValueError(f"规则 {rule.name} 的分值需为非负整数")
+    if not isinstance(rule.weight, int) or rule.weight < 1:
+        raise ValueError(f"规则 {rule.name} 的倍率需为正整数")
+
+
+class RuleBook:
+    """有序规则表，规则编号即下标；内置规则固定占前两个编号。"""
+
+    def __init__(self, extra: Sequence[RuleSet] = ()):
+        self.rules: List[RuleSet] = list(BUILTIN_RULES)
+        for rule in extra:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def __getitem__(self, rid: int) -> RuleSet:
+        return self.rules[rid]
+
+    @property
+    def names(self) -> List[str]:
+        return [r.name for r in self.rules]
+
+    def add(self, rule: RuleSet) -> int:
+        """追加一条规则并返回其编号；名称不可重复。"""
+        _check_rule(rule)
+        if self.find(rule.name) is not None:
+            raise ValueError(f"规则名称重复: {rule.name}")
+        self.rules.append(rule)
+        return len(self.rules) - 1
+
+    def find(self, name: str) -> Optional[int]:
+        for rid, rule in enumerate(self.rules):
+            if rule.name == name:
+                return rid
+        return None
+
+    def aliases(self) -> Dict[str, int]:
+        """导入时识别的写法（小写）-> 规则编号。"""
+        out = dict(_BUILTIN_ALIASES)
+        out.update((r.name.strip().lower(), rid) for rid, r in enumerate(self.rules))
+        return out
+
+    # --------------------------- 编译 ---------------------------
+    def points_table(self) -> np.ndarray:
+        """int64[规则数, MAX_PLACES]：已乘倍率的分值，未计分的名次为 0。"""
+        table = np.zeros((len(self.rules), MAX_PLACES), dtype=np.int64)
+        for rid, rule in enumerate(self.rules):
+            table[rid, :rule.places] = rule.scaled_points()
+        return table
+
+    def places_table(self) -> np.ndarray:
+        """int8[规则数]：每条规则需录入的名次数。"""
+        return np.array([r.places for r in self.rules], dtype=np.int8)
+
+    # --------------------------- 读写 ---------------------------
+    def extra_rules(self) -> List[dict]:
+        return [{"name": r.name, "points": list(r.points), "weight": r.weight}
+                for r in self.rules[len(BUILTIN_RULES):]]
+
+    def to_json(self) -> str:
+        return json.dumps(self.extra_rules(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "RuleBook":
+        """从 JSON 数组构造规则表；格式错误时抛出 ValueError。"""
+        try:
+            items = json.loads(text) if text.strip() else []
+            if not isinstance(items, list):
+                raise TypeError("顶层应为数组")
+            extra = [RuleSet(str(it["name"]), tuple(it["points"]), it.get("weight", 1)) for it in items]
+        except (KeyError, TypeError, AttributeError, json.JSONDecodeError) as e:
+            raise ValueError(f"规则定义无效: {e}")
+        return cls(extra)
+
+
+def load_rules(path: str) -> RuleBook:
+    with open(path, encoding="utf-8") as f:
+        return RuleBook.from_json(f.read())
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""实时成绩发布：基于 asyncio 的 HTTP/WebSocket 服务（只用标准库，不依赖 Qt）。
+
+服务端持有一份成绩镜像，随引擎的变更通知增量更新；客户端请求只读镜像，
+不会触发任何计分。快照按版本序列化一次后供所有请求共用，
+录入新成绩时只把变化的国家与项目合并成一条增量消息推送给全部订阅者。
+
+    GET /standings[?sort=id|total|male|female&top=K]   排名快照，支持 ETag / If-None-Match
+    GET /events                                        全部项目名次
+    GET /events/<项目ID>                               单个项目
+    GET /live  (WebSocket)                             先收到 snapshot，之后为 delta
+
+消息均为 JSON 文本：
+
+    {"type": "snapshot", "version": 12, "standings": [[国家, 总分, 男团, 女团], ...],
+     "events": [[项目ID, 性别, 规则, [名次...]], ...]}
+    {"type": "delta", "version": 15, "standings": [...变化的国家...], "events": [...变化的项目...]}
+
+增量中的值都是最新状态而非差值，重复应用无害；客户端忽略版本不高于已有数据的增量。
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from scoring_engine import GENDER_LABELS, ScoringEngine
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+_SORT_KEYS = {"id": None, "total": 1, "male": 2, "female": 3}
+# 订阅者积压的消息超过此数时丢弃积压，改发一份最新快照
+_MAX_BACKLOG = 32
+_MAX_HEADER = 8192
+# 客户端只会发关闭、ping/pong 等控制帧，单帧超过此字节数即以 1009 关闭连接
+MAX_CLIENT_FRAME = 64 * 1024
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+EventRow = list  # [项目ID, 性别, 规则名称, [名次...]]
+
+
+# --------------------------- WebSocket 帧 ---------------------------
+def encode_frame(payload: bytes, opcode: int = 0x1, mask: bool = False) -> bytes:
+    """编码一个完整帧；客户端发送的帧须加掩码。"""
+    head = bytes([0x80 | opcode])
+    n = len(payload)
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([bit | n])
+    elif n < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", n)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", n)
+    if not mask:
+        return head + payload
+    key = os.urandom(4)
+    masked = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(key, np.uint8), n)).tobytes()
+    return head + key + masked
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+async def read_frame(reader: asyncio.StreamReader, max_size: Optional[int] = None) -> Tuple[int, bytes]:
+    """读取一个帧，返回 (opcode, 负载)；不支持分片（本协议的消息都是单帧）。
+
+    负载长度超过 max_size 时不读负载，直接抛出 FrameTooLarge。
+    """
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if max_size is not None and n > max_size:
+        raise FrameTooLarge(f"帧长 {n} 字节，超过上限 {max_size}")
+    key = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    if key is not None:
+        payload = (np.frombuffer(payload, np.uint8) ^ np.resize(np.frombuffer(key, np.uint8), n)).tobytes()
+    return b0 & 0x0F, payload
+
+
+def _accept_key(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + _WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+# --------------------------- 订阅者 ---------------------------
+class _Subscriber:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.backlog: Deque[bytes] = deque()
+        self.ready = asyncio.Event()
+
+    def push(self, frame: bytes, snapshot: Callable[[], bytes]):
+        if len(self.backlog) >= _MAX_BACKLOG:
+            # 客户端跟不上：积压的增量已无意义，直接给最新快照
+            self.backlog.clear()
+            frame = snapshot()
+        self.backlog.append(frame)
+        self.ready.set()
+
+
+# --------------------------- 服务端 ---------------------------
+class LiveServer:
+    """在引擎之上发布实时成绩。
+
+    引擎变更通知在引擎所在线程中读出变化的数据，交给事件循环线程更新镜像；
+    网络与序列化都在事件循环线程中进行，不会阻塞界面。
+    interval 秒内的多次改动合并为一条增量消息。
+    """
+
+    def __init__(self, engine: ScoringEngine, host: str = "127.0.0.1", port: int = 8765,
+                 interval: float = 0.05):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._subscribers: Set[_Subscriber] = set()
+        # 以下镜像只在事件循环线程中读写
+        self._version = 0
+        self._scores = np.zeros((0, 4), dtype=np.int64)
+        self._events: List[EventRow] = []
+        self._pending_countries: Dict[int, List[int]] = {}
+        self._pending_events: Dict[int, EventRow] = {}
+        self._flush_scheduled = False
+        self._cache: Dict[tuple, bytes] = {}
+        self._cache_version = -1
+
+    # --------------------------- 启停 ---------------------------
+    def start(self):
+        """在后台线程中运行事件循环；端口被占用等错误在此抛出。"""
+        started = threading.Event()
+        errors: List[BaseException] = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self._open())
+            except OSError as e:
+                errors.append(e)
+                started.set()
+                loop.close()
+                return
+            started.set()
+            try:
+                loop.run_until_complete(self._stopped.wait())
+                loop.run_until_complete(self._close())
+            finally:
+                loop.close()
+
+        self._reset_mirror(self._capture_all())
+        self._thread = threading.Thread(target=run, name="live-server", daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            self._thread = None
+            raise errors[0]
+        self.engine.add_listener(self._on_engine_changed)
+
+    def stop(self):
+        self.engine.remove_listener(self._on_engine_changed)
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join(5)
+        self._thread = None
+
+    def serve_forever(self):
+        """在当前线程运行（命令行使用），直到被中断。"""
+        self._reset_mirror(self._capture_all())
+        self.engine.add_listener(self._on_engine_changed)
+
+        async def main():
+            await self._open()
+            try:
+                await self._stopped.wait()
+            finally:
+                await self._close()
+        try:
+            asyncio.run(main())
+        finally:
+            self.engine.remove_listener(self._on_engine_changed)
+
+    async def _open(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # 端口为 0 时由系统分配，回填实际端口
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _close(self):
+        self._server.close()
+        for sub in list(self._subscribers):
+            sub.writer.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # --------------------------- 引擎同步（引擎线程） ---------------------------
+    def _capture_all(self) -> Tuple[int, np.ndarray, List[EventRow]]:
+        eng = self.engine
+        n = eng.n_countries
+        scores = np.column_stack([np.arange(1, n + 1), eng.total, eng.male, eng.female]).astype(np.int64)
+        return eng.version, scores, [self._event_row(row) for row in range(eng.n_events)]
+
+    def _event_row(self, row: int) -> EventRow:
+        eng = self.engine
+        return [row + 1, GENDER_LABELS[int(eng.gender[row])], eng.rules[int(eng.rule[row])].name,
+                eng.event_ranks(row)]
+
+    def _on_engine_changed(self, rows, countries):
+        if self._loop is None:
+            return
+        if rows is None:
+            self._loop.call_soon_threadsafe(self._reset_and_broadcast, self._capture_all())
+            return
+        eng = self.engine
+        scores = {cid: [cid, int(eng.total[cid - 1]), int(eng.male[cid - 1]), int(eng.female[cid - 1])]
+                  for cid in countries or ()}
+        events = {row: self._event_row(row) for row in rows}
+        self._loop.call_soon_threadsafe(self._apply_delta, eng.version, scores, events)
+
+    # --------------------------- 镜像与推送（事件循环线程） ---------------------------
+    def _reset_mirror(self, state: Tuple[int, np.ndarray, List[EventRow]]):
+        self._version, self._scores, self._events = state
+        self._pending_countries.clear()
+        self._pending_events.clear()
+
+    def _reset_and_broadcast(self, state):
+        self._reset_mirror(state)
+        frame = self._snapshot_frame()
+        for sub in self._subscribers:
+            sub.backlog.clear()
+            sub.push(frame, self._snapshot_frame)
+
+    def _apply_delta(self, version: int, scores: Dict[int, List[int]], events: Dict[int, EventRow]):
+        self._version = max(self._version, version)
+        for cid, row in scores.items():
+            self._scores[cid - 1] = row
+        for r, ev in events.items():
+            self._events[r] = ev
+        if not self._subscribers:
+            return
+        self._pending_countries.update(scores)
+        self._pending_events.update(events)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_later(self.interval, self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if not (self._pending_countries or self._pending_events):
+            return
+        msg = {"type": "delta", "version": self._version,
+               "standings": [self._pending_countries[c] for c in sorted(self._pending_countries)],
+               "events": [self._pending_events[r] for r in sorted(self._pending_events)]}
+        self._pending_countries.clear()
+        self._pending_events.clear()
+        # 只序列化一次，所有订阅者共用同一帧
+        frame = encode_frame(json.dumps(msg, ensure_ascii=False).encode("utf-8"))
+        for sub in self._subscribers:
+            sub.push(frame, self._snapshot_frame)
+
+    def _cached(self, key: tuple, build) -> bytes:
+        if self._cache_version != self._version:
+            self._cache.clear()
+            self._cache_version = self._version
+        data = self._cache.get(key)
+        if data is None:
+            data = self._cache[key] = build()
+        return data
+
+    def _standings(self, sort: str = "id", top: Optional[int] = None) -> List[List[int]]:
+        col = _SORT_KEYS[sort]
+        scores = self._scores
+        if col is not None:
+            scores = scores[np.lexsort((scores[:, 0], -scores[:, col]))]
+        return scores[:top].tolist()
+
+    def _snapshot_frame(self) -> bytes:
+        def build():
+            msg = {"type": "snapshot", "version": self._version,
+                   "standings": self._standings(), "events": self._events}
+            return encode_frame(json.dumps(msg, ensure_ascii=False).encode("utf-8"))
+        return self._cached(("ws",), build)
+
+    # --------------------------- HTTP ---------------------------
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            if len(head) > _MAX_HEADER:
+                raise ValueError("header too large")
+            request_line, *lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+            method, target, _version = request_line.split(" ", 2)
+            headers = {}
+            for line in lines:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            writer.close()
+            return
+
+        path, _, query = target.partition("?")
+        try:
+            if path == "/live" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers)
+                return
+            status, body, etag = self._route(method, path, parse_qs(query))
+            if etag is not None and headers.get("if-none-match") == etag:
+                status, body = 304, b""
+            extra = f"ETag: {etag}\r\n" if etag is not None else ""
+            writer.write((f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                          f"Content-Type: application/json; charset=utf-8\r\n"
+                          f"Content-Length: {len(body)}\r\n{extra}"
+                          f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str, query: Dict[str, List[str]]) -> Tuple[int, bytes, Optional[str]]:
+        def error(status: int, msg: str):
+            return status, json.dumps({"error": msg}, ensure_ascii=False).encode("utf-8"), None
+
+        if method != "GET":
+            return error(405, "只支持 GET")
+        etag = f'"{self._version}"'
+        if path == "/standings":
+            sort = query.get("sort", ["id"])[0]
+            top_text = query.get("top", [""])[0]
+            if sort not in _SORT_KEYS or (top_text and (not top_text.isdigit() or int(top_text) < 1)):
+                return error(400, "sort 应为 id/total/male/female，top 应为正整数")
+            top = int(top_text) if top_text else None
+
+            def build():
+                return json.dumps({"version": self._version, "sort": sort,
+                                   "standings": self._standings(sort, top)}).encode("utf-8")
+            return 200, self._cached(("standings", sort, top), build), etag
+        if path == "/events":
+            def build():
+                return json.dumps({"version": self._version, "events": self._events},
+                                  ensure_ascii=False).encode("utf-8")
+            return 200, self._cached(("events",), build), etag
+        if path.startswith("/events/"):
+            eid = path[len("/events/"):]
+            if not eid.isdigit() or not 1 <= int(eid) <= len(self._events):
+                return error(404, f"没有项目 {eid}")
+            return 200, json.dumps({"version": self._version, "event": self._events[int(eid) - 1]},
+                                   ensure_ascii=False).encode("utf-8"), etag
+        return error(404, "可用路径：/standings、/events、/events/<项目ID>、/live")
+
+    async def _websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         headers: Dict[str, str]):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {_accept_key(key)}\r\n\r\n").encode("latin-1"))
+        sub = _Subscriber(writer)
+        sub.push(self._snapshot_frame(), self._snapshot_frame)
+        self._subscribers.add(sub)
+        sender = asyncio.ensure_future(self._send_loop(sub))
+        try:
+            while True:
+                opcode, payload = await read_frame(reader, MAX_CLIENT_FRAME)
+                if opcode == 0x8:
+                    sub.push(encode_frame(payload[:2], 0x8), self._snapshot_frame)
+                    break
+                if opcode == 0x9:
+                    sub.push(encode_frame(payload, 0xA), self._snapshot_frame)
+                # 客户端的其它消息（文本、pong）一律忽略
+        except FrameTooLarge:
+            # 1009：消息过大
+            sub.push(encode_frame(struct.pack("!H", 1009), 0x8), self._snapshot_frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._subscribers.discard(sub)
+            # 让发送循环把剩余的帧（如关闭应答）发完再退出
+            sub.backlog.append(b"")
+            sub.ready.set()
+            try:
+                await asyncio.wait_for(sender, 5)
+            except (asyncio.TimeoutError, ConnectionError):
+                sender.cancel()
+
+    async def _send_loop(self, sub: _Subscriber):
+        while True:
+            await sub.ready.wait()
+            sub.ready.clear()
+            while sub.backlog:
+                frame = sub.backlog.popleft()
+                if not frame:
+                    return
+                sub.writer.write(frame)
+                await sub.writer.drain()
+
+
+# --------------------------- 测试用客户端 ---------------------------
+class LiveClient:
+    """最小的 WebSocket 订阅端：维护一份与服务端同步的排名与项目镜像（供测试与命令行查看）。"""
+
+    def __init__(self):
+        self.version = -1
+        self.standings: Dict[int, Tuple[int, int, int]] = {}
+        self.events: Dict[int, EventRow] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self, host: str = "127.0.0.1", port: int = 8765, path: str = "/live"):
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        self._writer.write((f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUpgrade: websocket\r\n"
+                            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                            "Sec-WebSocket-Version: 13\r\n\r\n").encode("latin-1"))
+        await self._writer.drain()
+        head = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        if not head.startswith("HTTP/1.1 101") or _accept_key(key) not in head:
+            raise ConnectionError(f"WebSocket 握手失败: {head.splitlines()[0] if head else ''}")
+
+    async def receive(self) -> Optional[dict]:
+        """读取下一条消息并应用到镜像；连接关闭时返回 None。"""
+        while True:
+            try:
+                opcode, payload = await read_frame(self._reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return None
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self._writer.write(encode_frame(payload, 0xA, mask=True))
+                continue
+            if opcode == 0x1:
+                msg = json.loads(payload.decode("utf-8"))
+                self.apply(msg)
+                return msg
+
+    def apply(self, msg: dict):
+        if msg["type"] == "snapshot":
+            self.standings.clear()
+            self.events.clear()
+        elif msg["version"] <= self.version:
+            return
+        for cid, total, male, female in msg["standings"]:
+            self.standings[cid] = (total, male, female)
+        for ev in msg["events"]:
+            self.events[ev[0]] = ev
+        self.version = msg["version"]
+
+    async def close(self):
+        if self._writer is not None:
+            try:
+                self._writer.write(encode_frame(struct.pack("!H", 1000), 0x8, mask=True))
+                await self._writer.drain()
+                await asyncio.wait_for(self._reader.read(), 2)
+            except (ConnectionError, asyncio.TimeoutError):
+                pass
+            self._writer.close()
+
+
+async def fetch(host: str, port: int, path: str, headers: Optional[Dict[str, str]] = None
+                ) -> Tuple[int, Dict[str, str], bytes]:
+    """发送一个 GET 请求，返回 (状态码, 响应头, 正文)。"""
+    reader, writer = await asyncio.open_connection(host, port)
+    extra = "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{extra}Connection: close\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    status_line, *lines = head.decode("latin-1").split("\r\n")
+    resp_headers = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        resp_headers[name.strip().lower()] = value.strip()
+    return int(status_line.split()[1]), resp_headers, body
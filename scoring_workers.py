@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""在线程池中执行耗时操作（导入、校验等），结果回到界面线程处理。
+
+每个操作归属一个通道（如 "import"、"validate"）：同一通道上正在运行的任务
+被新请求取代时会收到取消信号，且排队中的请求只保留最新的一个。
+"""
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from scoring_engine import OperationCancelled
+from scoring_profile import stage
+
+# 任务函数：fn(progress, cancelled) -> 结果
+TaskFn = Callable[[Callable[[int, int], None], Callable[[], bool]], Any]
+
+
+class _TaskSignals(QObject):
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class _Task(QRunnable):
+    def __init__(self, fn: TaskFn, stage_name: str):
+        super().__init__()
+        self.fn = fn
+        self.stage_name = stage_name
+        self.signals = _TaskSignals()
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        try:
+            with stage(self.stage_name):
+                result = self.fn(self.signals.progress.emit, self.cancel_event.is_set)
+        except OperationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:  # 在后台线程里，只能把错误转交界面
+            self.signals.failed.emit(f"{type(e).__name__}: {e}")
+        else:
+            self.signals.finished.emit(result)
+
+
+# 排队中的请求：(说明文字, 任务函数, 完成回调, 出错回调, 计时阶段名)
+_Request = Tuple[str, TaskFn, Callable[[Any], None], Optional[Callable[[str], None]], Optional[str]]
+
+
+class TaskRunner(QObject):
+    """按通道调度后台任务；所有回调都在界面线程中调用。"""
+
+    # (说明文字, 已完成, 总量)；总量为 0 表示进度未知
+    progress = pyqtSignal(str, int, int)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, pool: Optional[QThreadPool] = None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._running: Dict[str, Tuple[_Task, _Request]] = {}
+        self._pending: Dict[str, _Request] = {}
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._running)
+
+    def submit(self, channel: str, label: str, fn: TaskFn, on_done: Callable[[Any], None],
+               on_error: Optional[Callable[[str], None]] = None, stage_name: Optional[str] = None):
+        """提交任务；该通道已有任务在运行时，取消它并让本请求排队（只保留最新）。
+
+        任务在工作线程中按 stage_name（默认 task.<通道>）计时。
+        """
+        request: _Request = (label, fn, on_done, on_error, stage_name)
+        if channel in self._running:
+            self._running[channel][0].cancel_event.set()
+            self._pending[channel] = request
+            return
+        self._start(channel, request)
+
+    def cancel(self, channel: Optional[str] = None):
+        """取消指定通道（或全部通道）正在运行和排队的任务。"""
+        channels = [channel] if channel is not None else list(self._running)
+        for ch in channels:
+            self._pending.pop(ch, None)
+            if ch in self._running:
+                self._running[ch][0].cancel_event.set()
+
+    def wait(self, msecs: int = -1) -> bool:
+        """等待线程池空闲（供批处理与测试使用）。"""
+        return self.pool.waitForDone(msecs)
+
+    def _start(self, channel: str, request: _Request):
+        label, fn, _on_done, _on_error, stage_name = request
+        task = _Task(fn, stage_name or f"task.{channel}")
+        was_busy = self.busy
+        self._running[channel] = (task, request)
+        task.signals.progress.connect(lambda done, total, lb=label: self.progress.emit(lb, done, total))
+        task.signals.finished.connect(lambda result, ch=channel, t=task: self._on_finished(ch, t, result))
+        task.signals.failed.connect(lambda msg, ch=channel, t=task: self._on_failed(ch, t, msg))
+        task.signals.cancelled.connect(lambda ch=channel, t=task: self._on_ended(ch, t))
+        if not was_busy:
+            self.busy_changed.emit(True)
+        self.progress.emit(label, 0, 0)
+        self.pool.start(task)
+
+    def _on_finished(self, channel: str, task: _Task, result: Any):
+        on_done = self._running[channel][1][2]
+        # 已被取代的任务即使跑完，结果也已过期，直接丢弃
+        if not task.cancel_event.is_set():
+            on_done(result)
+        self._on_ended(channel, task)
+
+    def _on_failed(self, channel: str, task: _Task, msg: str):
+        on_error = self._running[channel][1][3]
+        if on_error is not None and not task.cancel_event.is_set():
+            on_error(msg)
+        self._on_ended(channel, task)
+
+    def _on_ended(self, channel: str, task: _Task):
+        if channel in self._running and self._running[channel][0] is task:
+            del self._running[channel]
+        pending = self._pending.pop(channel, None)
+        if pending is not None:
+            self._start(channel, pending)
+        elif not self.busy:
+            self.busy_changed.emit(False)
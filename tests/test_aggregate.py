@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""多场比赛累计（scoring_aggregate）。"""
+from scoring_aggregate import aggregate, aggregate_rows, load_country_map, make_shards
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_shard_without_valid_rows_is_skipped(tmp_path):
+    a = _write(tmp_path, "a.csv", "1,男,前三,2,1,3\n")
+    b = _write(tmp_path, "b.csv", "event_id,gender,rule,p1,p2,p3\n")
+    c = _write(tmp_path, "c.csv", "1,X,前三,1,2,3\n")
+    agg = aggregate(make_shards([a, b, c]), workers=1)
+
+    assert agg.n_shards == 1
+    assert [path for path, _ in agg.failed] == [b, c]
+    assert agg.import_errors == 1
+    assert "累计 1 场比赛" in agg.summary()
+    assert dict(zip(agg.keys, agg.shards.tolist())) == {1: 1, 2: 1, 3: 1}
+
+
+def test_sums_across_shards(tmp_path):
+    a = _write(tmp_path, "a.csv", "1,男,前三,1,2,3\n2,女,前三,3,2,1\n")
+    b = _write(tmp_path, "b.csv", "1,男,前五,4,1,2,3,5\n")
+    agg = aggregate(make_shards([a, b]), workers=1)
+
+    assert agg.n_shards == 2 and not agg.failed
+    by_key = {k: (t, m, f, s) for k, t, m, f, s in zip(agg.keys, agg.total.tolist(), agg.male.tolist(),
+                                                        agg.female.tolist(), agg.shards.tolist())}
+    # a: 国家1 5+2，国家2 3+3，国家3 2+5；b: 4→7 1→5 2→3 3→2 5→1
+    assert by_key == {1: (12, 10, 2, 2), 2: (9, 6, 3, 2), 3: (9, 4, 5, 2), 4: (7, 7, 0, 1), 5: (1, 1, 0, 1)}
+    perm = agg.sort_permutation("total", False)
+    assert [agg.keys[i] for i in perm] == [1, 2, 3, 4, 5]
+    header, rows = aggregate_rows(agg, perm)
+    assert header[0] == "国家" and rows[0][:2] == [1, 12]
+
+
+def test_country_map_with_codes(tmp_path):
+    a = _write(tmp_path, "a.csv", "1,男,前三,1,2,3\n")
+    b = _write(tmp_path, "b.csv", "1,男,前三,2,1,3\n")
+    table = _write(tmp_path, "map.csv", "file,local_id,country\na.csv,1,CHN\na.csv,2,USA\n"
+                                        "b.csv,1,USA\nb.csv,2,CHN\nb.csv,3,7\n")
+    agg = aggregate(make_shards([a, b], load_country_map(table)), workers=1)
+
+    totals = dict(zip(agg.keys, agg.total.tolist()))
+    # a: CHN 5、USA 3、国家3 2；b: 第 1 名本场 2 号(CHN) 5、USA 3、本场 3 号对应全局 7 号 2
+    assert totals == {"CHN": 10, "USA": 6, 3: 2, 7: 2}
+    assert dict(zip(agg.keys, agg.shards.tolist())) == {"CHN": 2, "USA": 2, 3: 1, 7: 1}
+    # 数字编号排在代码之前
+    assert [agg.keys[i] for i in agg.sort_permutation("id", True)] == [3, 7, "CHN", "USA"]
+
+
+def test_merged_local_ids_count_one_appearance(tmp_path):
+    a = _write(tmp_path, "a.csv", "1,男,前三,1,2,3\n")
+    table = _write(tmp_path, "map.csv", "a.csv,1,EUN\na.csv,2,EUN\n")
+    agg = aggregate(make_shards([a], load_country_map(table)), workers=1)
+
+    assert dict(zip(agg.keys, agg.total.tolist())) == {"EUN": 8, 3: 2}
+    assert dict(zip(agg.keys, agg.shards.tolist())) == {"EUN": 1, 3: 1}
+
+
+def test_worker_processes_match_inline(tmp_path):
+    paths = [_write(tmp_path, f"s{i}.csv", f"1,男,前三,{i % 4 + 1},{(i + 1) % 4 + 1},{(i + 2) % 4 + 1}\n")
+             for i in range(6)]
+    inline = aggregate(make_shards(paths), workers=1)
+    pooled = aggregate(make_shards(paths), workers=2)
+    assert pooled.n_shards == inline.n_shards == 6
+    assert sorted(zip(pooled.keys, pooled.total.tolist(), pooled.shards.tolist())) == \
+        sorted(zip(inline.keys, inline.total.tolist(), inline.shards.tolist()))
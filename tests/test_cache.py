@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""查询结果缓存（scoring_cache.ResultCache）。"""
+from scoring_cache import ANY, ResultCache, country_tag, event_tag, gender_tag
+from scoring_engine import GENDER_FEMALE, GENDER_MALE, ScoringEngine
+
+
+def _setup():
+    engine = ScoringEngine()
+    engine.initialize(4, 2, 1)      # 行 0、1 为男子项目，行 2 为女子项目
+    engine.set_event(0, 0, [1, 2, 3])
+    engine.set_event(2, 0, [4, 3, 2])
+    cache = ResultCache(engine)
+    for key, tags in (("any", (ANY,)), ("row0", (event_tag(0),)), ("row2", (event_tag(2),)),
+                      ("male", (gender_tag(GENDER_MALE),)), ("female", (gender_tag(GENDER_FEMALE),)),
+                      ("c1", (country_tag(1),)), ("c4", (country_tag(4),)), ("static", ())):
+        cache.put(key, key, tags)
+    return engine, cache
+
+
+def _alive(cache: ResultCache):
+    return {key for key in ("any", "row0", "row2", "male", "female", "c1", "c4", "static") if key in cache}
+
+
+def test_edit_invalidates_only_intersecting_tags():
+    engine, cache = _setup()
+    engine.set_place(0, 0, 4)       # 男子项目 1：第 1 名由国家 1 改为国家 4
+    assert _alive(cache) == {"row2", "female", "static"}
+
+
+def test_edit_in_other_gender_keeps_unrelated_entries():
+    engine, cache = _setup()
+    engine.set_place(2, 2, 0)       # 女子项目：清空第 3 名（国家 2）
+    assert _alive(cache) == {"row0", "male", "c1", "c4", "static"}
+
+
+def test_unchanged_write_keeps_everything():
+    engine, cache = _setup()
+    engine.set_place(0, 0, 1)
+    assert len(_alive(cache)) == 8
+
+
+def test_reset_clears_untagged_entries():
+    engine, cache = _setup()
+    engine.recompute()
+    assert len(cache) == 0
+
+
+def test_stale_compute_is_not_stored():
+    engine, cache = _setup()
+
+    def compute():
+        engine.set_place(1, 0, 2)   # 计算期间数据有变
+        return "stale"
+
+    assert cache.get_or_compute("late", compute, (event_tag(3),)) == "stale"
+    assert "late" not in cache
+    assert cache.get_or_compute("fresh", lambda: 1, (event_tag(3),)) == 1
+    assert cache.get_or_compute("fresh", lambda: 2, (event_tag(3),)) == 1
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_eviction():
+    engine = ScoringEngine()
+    engine.initialize(2, 1, 0)
+    cache = ResultCache(engine, capacity=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert ("a" in cache, "b" in cache, "c" in cache) == (True, False, True)
+    assert cache.evictions == 1
+    cache.close()
+    engine.set_place(0, 0, 1)
+    assert "a" in cache
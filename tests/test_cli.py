@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""命令行批处理（olympic_scoring）。"""
+import pytest
+
+import olympic_scoring
+
+RESULTS = "1,男,前三,1,2,3\n2,女,前三,3,2,1\n3,男,前五,2,1,3,4,5\n"
+
+
+@pytest.fixture
+def results_csv(tmp_path):
+    path = tmp_path / "r.csv"
+    path.write_text(RESULTS, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("command", ["score", "medals", "aggregate", "project"])
+@pytest.mark.parametrize("top", ["0", "-3"])
+def test_top_below_one_is_rejected(results_csv, command, top, capsys):
+    with pytest.raises(SystemExit) as exc:
+        olympic_scoring.main([command, results_csv, "--top", top])
+    assert exc.value.code == 2
+    assert "不小于 1" in capsys.readouterr().err
+
+
+def test_top_limits_rows(results_csv, capsys):
+    assert olympic_scoring.main(["score", results_csv, "--sort", "total", "--top", "2"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split("\t")[0] for line in lines] == ["国家编号", "2", "1"]
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""计分引擎（scoring_engine.ScoringEngine）。"""
+import random
+
+import numpy as np
+
+from scoring_engine import (GENDER_FEMALE, GENDER_MALE, STATUS_DUPLICATE, STATUS_MISSING, STATUS_OK,
+                            STATUS_OUT_OF_RANGE, ScoringEngine, check_rows)
+from scoring_rules import MAX_PLACES, RULE_TOP3, RULE_TOP5, RuleSet
+
+
+def _example() -> ScoringEngine:
+    """3 个国家、男 2 女 1：手算得分见各测试。"""
+    engine = ScoringEngine()
+    engine.initialize(3, 2, 1)
+    engine.set_event(0, RULE_TOP3, [1, 2, 3])
+    engine.set_event(1, RULE_TOP5, [2, 1, 3, 0, 0])
+    engine.set_event(2, RULE_TOP3, [3, 1, 2])
+    return engine
+
+
+def test_initialize_layout():
+    engine = ScoringEngine()
+    engine.initialize(4, 2, 3)
+    assert engine.n_events == 5
+    assert engine.gender.tolist() == [GENDER_MALE] * 2 + [GENDER_FEMALE] * 3
+    assert engine.rule.tolist() == [RULE_TOP3] * 5
+    assert engine.results.shape[0] == 5 and not engine.results.any()
+    assert engine.total.tolist() == [0, 0, 0, 0]
+
+
+def test_compute_scores_by_hand():
+    engine = _example()
+    total, male, female = engine.compute_scores()
+    # 男子：项目1 1/2/3 得 5/3/2；项目2（前五）2/1/3 得 7/5/3
+    assert male.tolist() == [5 + 5, 3 + 7, 2 + 3]
+    # 女子：项目3 3/1/2 得 5/3/2
+    assert female.tolist() == [3, 2, 5]
+    assert total.tolist() == (male + female).tolist()
+
+
+def test_out_of_range_and_empty_places_score_nothing():
+    engine = ScoringEngine()
+    engine.initialize(2, 1, 0)
+    engine.results[0, :3] = [0, 9, 2]
+    total, _male, _female = engine.compute_scores()
+    assert total.tolist() == [0, 2]
+
+
+def test_sort_permutation_is_stable():
+    engine = _example()
+    # 总分 13/12/10
+    assert engine.sort_permutation("total", False).tolist() == [0, 1, 2]
+    assert engine.sort_permutation("female", False).tolist() == [2, 0, 1]
+    assert engine.sort_permutation("id", False).tolist() == [2, 1, 0]
+    engine.initialize(3, 1, 0)
+    assert engine.sort_permutation("total", False).tolist() == [0, 1, 2]
+
+
+def test_event_reads():
+    engine = _example()
+    config = engine.event_config(1)
+    assert (config.event_id, config.gender, config.rule, config.top_n) == (2, "男", "前五", 5)
+    assert engine.event_ranks(1) == [2, 1, 3, 0, 0]
+    assert engine.event_points(1) == [7, 5, 3, 2, 1]
+
+
+def test_load_arrays_any_gender_order():
+    engine = ScoringEngine()
+    gender = np.array([GENDER_FEMALE, GENDER_MALE], dtype=np.int8)
+    rule = np.array([RULE_TOP3, RULE_TOP3], dtype=np.int16)
+    results = np.zeros((2, engine.results.shape[1]), dtype=np.int32)
+    results[:, :3] = [[1, 2, 3], [2, 1, 3]]
+    engine.load_arrays(3, gender, rule, results)
+    assert (engine.m_men, engine.w_women) == (1, 1)
+    assert engine.male.tolist() == [3, 5, 2]
+    assert engine.female.tolist() == [5, 3, 2]
+
+
+# --------------------------- 增量计分 ---------------------------
+def _assert_totals_match(engine: ScoringEngine):
+    total, male, female = engine.compute_scores()
+    assert engine.total.tolist() == total.tolist()
+    assert engine.male.tolist() == male.tolist()
+    assert engine.female.tolist() == female.tolist()
+
+
+def _random_edits(engine: ScoringEngine, rng: random.Random, count: int):
+    """随机改名次、整行与规则；国家编号含 0（清空）与超范围值。"""
+    n = engine.n_countries
+    n_rules = len(engine.rules)
+    for _ in range(count):
+        row = rng.randrange(engine.n_events)
+        op = rng.random()
+        if op < 0.6:
+            place = rng.randrange(int(engine.top_n[row]))
+            engine.set_place(row, place, rng.randint(0, n + 1))
+        elif op < 0.85:
+            rid = rng.randrange(n_rules)
+            places = engine.rules[rid].places
+            engine.set_event(row, rid, [rng.randint(0, n) for _ in range(rng.randint(0, places))])
+        else:
+            engine.set_rule(row, rng.randrange(n_rules))
+
+
+def test_incremental_totals_match_full_recompute():
+    engine = ScoringEngine()
+    engine.initialize(12, 6, 5)
+    engine.add_rule(RuleSet("前八", (9, 7, 6, 5, 4, 3, 2, 1), weight=2))
+    rng = random.Random(20240601)
+    for _ in range(10):
+        _random_edits(engine, rng, 40)
+        _assert_totals_match(engine)
+
+
+def test_incremental_totals_after_load_arrays():
+    engine = ScoringEngine()
+    rng = np.random.default_rng(7)
+    gender = rng.integers(0, 2, size=30).astype(np.int8)
+    rule = rng.integers(0, 2, size=30).astype(np.int16)
+    results = np.zeros((30, MAX_PLACES), dtype=np.int32)
+    results[:, :3] = rng.integers(0, 9, size=(30, 3))
+    engine.load_arrays(8, gender, rule, results)
+    _assert_totals_match(engine)
+    _random_edits(engine, random.Random(3), 100)
+    _assert_totals_match(engine)
+
+
+def test_listener_receives_touched_countries():
+    engine = _example()
+    seen = []
+    engine.add_listener(lambda rows, countries: seen.append((rows, countries)))
+    engine.set_place(0, 0, 3)      # 第 1 名由国家 1 改为国家 3
+    engine.set_place(0, 0, 3)      # 未变化：不通知
+    engine.recompute()
+    assert seen == [({0}, {1, 3}), (None, None)]
+
+
+# --------------------------- 倒排索引 ---------------------------
+def _brute_placings(engine: ScoringEngine, cid: int):
+    points = engine.points_matrix()
+    out = []
+    for row in range(engine.n_events):
+        for place in range(MAX_PLACES):
+            if engine.results[row, place] == cid:
+                out.append((row + 1, place + 1, int(points[row, place])))
+    return out
+
+
+def test_country_placings_by_hand():
+    engine = _example()
+    assert engine.country_placings(1) == [(1, 1, 5), (2, 2, 5), (3, 2, 3)]
+    assert engine.country_placings(3) == [(1, 3, 2), (2, 3, 3), (3, 1, 5)]
+    assert engine.country_placings(4) == []
+
+
+def test_country_placings_follow_edits():
+    engine = ScoringEngine()
+    engine.initialize(10, 5, 5)
+    rng = random.Random(11)
+    engine.country_placings(1)          # 先建好索引，之后靠增量维护
+    for _ in range(8):
+        _random_edits(engine, rng, 30)
+        for cid in range(1, engine.n_countries + 1):
+            assert engine.country_placings(cid) == _brute_placings(engine, cid)
+
+
+def test_country_placings_rebuilt_after_bulk_load():
+    engine = _example()
+    engine.country_placings(1)
+    engine.results[0, :3] = [2, 2, 2]
+    engine.recompute()
+    assert engine.country_placings(1) == _brute_placings(engine, 1)
+    assert engine.country_placings(2) == _brute_placings(engine, 2)
+
+
+# --------------------------- 校验 ---------------------------
+def _check_one(ranks, top_n: int, n: int):
+    """逐名次的参照实现：按名次顺序报告第一个问题。"""
+    seen = set()
+    for place in range(top_n):
+        country = int(ranks[place])
+        if country == 0:
+            return STATUS_MISSING, place + 1
+        if not 1 <= country <= n:
+            return STATUS_OUT_OF_RANGE, place + 1
+    for place in range(top_n):
+        country = int(ranks[place])
+        if country in seen:
+            return STATUS_DUPLICATE, country
+        seen.add(country)
+    return STATUS_OK, 0
+
+
+def test_check_rows_codes():
+    ranks = np.zeros((5, MAX_PLACES), dtype=np.int32)
+    ranks[0, :3] = [1, 2, 3]
+    ranks[1, :3] = [1, 0, 3]
+    ranks[2, :3] = [1, 2, 9]
+    ranks[3, :3] = [2, 1, 2]
+    ranks[4, :5] = [1, 2, 3, 4, 1]
+    top_n = np.array([3, 3, 3, 3, 3])
+    code, detail = check_rows(ranks, top_n, 4)
+    assert code.tolist() == [STATUS_OK, STATUS_MISSING, STATUS_OUT_OF_RANGE, STATUS_DUPLICATE, STATUS_OK]
+    assert detail.tolist()[:4] == [0, 2, 3, 2]
+    # 前五规则下第 5 名与第 1 名重复
+    code, detail = check_rows(ranks[4:], np.array([5]), 4)
+    assert (code[0], detail[0]) == (STATUS_DUPLICATE, 1)
+
+
+def test_check_rows_matches_reference():
+    rng = np.random.default_rng(5)
+    ranks = rng.integers(-1, 8, size=(400, MAX_PLACES)).astype(np.int32)
+    top_n = rng.choice([3, 5, 8], size=400)
+    code, detail = check_rows(ranks, top_n, 6)
+    for i in range(400):
+        assert (int(code[i]), int(detail[i])) == _check_one(ranks[i], int(top_n[i]), 6)
+
+
+def _complete() -> ScoringEngine:
+    engine = ScoringEngine()
+    engine.initialize(3, 1, 2)
+    for row, ranks in enumerate(([1, 2, 3], [2, 1, 3], [3, 1, 2])):
+        engine.set_event(row, RULE_TOP3, ranks)
+    return engine
+
+
+def test_validate_dirty_only_rechecks_changed_rows():
+    engine = _complete()
+    assert engine.validate_dirty()
+    assert engine.dirty_rows().tolist() == []
+    engine.set_place(2, 1, 3)
+    assert engine.dirty_rows().tolist() == [2]
+    assert not engine.validate_dirty()
+    assert engine.status[2] == STATUS_DUPLICATE
+    assert engine.status_message(2) == "国家编号重复: 3"
+    engine.set_place(2, 1, 1)
+    assert engine.validate_dirty()
+
+
+def test_apply_status_with_stale_version_keeps_dirty_rows():
+    engine = _complete()
+    engine.validate_dirty()
+    engine.set_place(0, 1, 0)
+    rows = engine.dirty_rows()
+    version = engine.version
+    code, detail = check_rows(engine.results[rows], engine.top_n[rows], engine.n_countries)
+    engine.set_place(1, 0, 0)           # 后台校验期间又有改动
+    assert not engine.apply_status(rows, code, detail, version)
+    assert engine.status[0] == STATUS_MISSING
+    assert sorted(engine.dirty_rows().tolist()) == [0, 1]
+    assert not engine.validate_dirty()
+    assert engine.dirty_rows().tolist() == []
+    assert engine.status[1] == STATUS_MISSING
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""流式导出（scoring_export）。"""
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from scoring_engine import MAX_PLACES, OperationCancelled, ScoringEngine
+from scoring_export import export, read_columns
+from scoring_io import import_results
+
+
+def _engine() -> ScoringEngine:
+    """20 个国家、25 个项目的随机成绩；名次含未录入(0)。"""
+    engine = ScoringEngine()
+    rng = np.random.default_rng(4)
+    gender = rng.integers(0, 2, size=25).astype(np.int8)
+    rule = rng.integers(0, 2, size=25).astype(np.int16)
+    results = np.zeros((25, MAX_PLACES), dtype=np.int32)
+    results[:, :5] = rng.integers(0, 21, size=(25, 5))
+    results[rule == 0, 3:] = 0
+    engine.load_arrays(20, gender, rule, results)
+    return engine
+
+
+def test_standings_columns_match_engine(tmp_path):
+    engine = _engine()
+    path = str(tmp_path / "s.olyc")
+    assert export(engine, path, "standings", sort=("total", False), chunk_rows=7) == 20
+    cols, meta = read_columns(path)
+    perm = engine.sort_permutation("total", False)
+    assert cols["country"].tolist() == (perm + 1).tolist()
+    for key in ("total", "male", "female"):
+        assert cols[key].tolist() == getattr(engine, key)[perm].tolist()
+
+
+def test_results_columns_match_engine(tmp_path):
+    engine = _engine()
+    path = str(tmp_path / "r.olyc")
+    export(engine, path, "results", chunk_rows=7)
+    cols, meta = read_columns(path)
+    assert cols["event_id"].tolist() == list(range(1, 26))
+    assert cols["gender"].tolist() == engine.gender.tolist()
+    assert cols["rule"].tolist() == engine.rule.tolist()
+    ranks = np.stack([cols[f"p{i + 1}"] for i in range(MAX_PLACES)], axis=1)
+    assert (ranks == engine.results).all()
+    assert meta["labels"]["rule"] == engine.rules.names
+
+
+def test_placings_points_sum_to_totals(tmp_path):
+    engine = _engine()
+    path = str(tmp_path / "p.olyc")
+    rows = export(engine, path, "placings", chunk_rows=MAX_PLACES * 3)
+    cols, _meta = read_columns(path)
+    assert rows == int(np.count_nonzero(engine.results)) == len(cols["country"])
+    total = np.bincount(cols["country"] - 1, weights=cols["points"], minlength=20).astype(np.int64)
+    assert total.tolist() == engine.total.tolist()
+    male = cols["gender"] == 0
+    assert np.bincount(cols["country"][male] - 1, weights=cols["points"][male],
+                       minlength=20).astype(np.int64).tolist() == engine.male.tolist()
+
+
+@pytest.mark.parametrize("ext", ["csv", "jsonl"])
+def test_results_reimport_identically(tmp_path, ext):
+    engine = _engine()
+    path = str(tmp_path / f"r.{ext}")
+    export(engine, path, "results", chunk_rows=4)
+    again = ScoringEngine()
+    report = import_results(path, again, n_countries=engine.n_countries)
+    assert report.error_count == 0
+    assert (again.results == engine.results).all()
+    assert again.gender.tolist() == engine.gender.tolist()
+    assert again.rule.tolist() == engine.rule.tolist()
+    assert again.total.tolist() == engine.total.tolist()
+
+
+def test_text_formats_agree(tmp_path):
+    engine = _engine()
+    csv_path, jsonl_path = str(tmp_path / "p.csv"), str(tmp_path / "p.jsonl")
+    export(engine, csv_path, "placings", chunk_rows=5)
+    export(engine, jsonl_path, "placings", chunk_rows=5)
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    with open(jsonl_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [{k: str(v) for k, v in rec.items()} for rec in records] == rows
+
+
+def test_cancel_keeps_existing_file(tmp_path):
+    engine = _engine()
+    path = tmp_path / "s.csv"
+    path.write_text("old\n", encoding="utf-8")
+    with pytest.raises(OperationCancelled):
+        export(engine, str(path), "standings", chunk_rows=3, cancelled=lambda: True)
+    assert path.read_text(encoding="utf-8") == "old\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["s.csv"]
+
+
+def test_read_columns_rejects_other_files(tmp_path):
+    path = tmp_path / "x.olyc"
+    path.write_bytes(b"PK\x03\x04" + bytes(40))
+    with pytest.raises(ValueError):
+        read_columns(str(path))
+    path.write_bytes(b"OL")
+    with pytest.raises(ValueError):
+        read_columns(str(path))
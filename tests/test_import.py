@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""成绩文件导入（scoring_io.import_results）。"""
+from scoring_engine import GENDER_FEMALE, GENDER_MALE, ScoringEngine
+from scoring_export import export
+from scoring_io import import_results
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_bad_line_in_middle_is_not_loaded_as_event(tmp_path):
+    path = _write(tmp_path, "r.csv", "\n".join([
+        "event_id,gender,rule,p1,p2,p3",
+        "1,男,前三,1,2,3",
+        "2,女,前三,2,3,1",
+        "3,男,前三,x,2,3",      # 坏行
+        "4,女,前五,3,1,2,4,5",
+    ]) + "\n")
+    engine = ScoringEngine()
+    report = import_results(path, engine)
+
+    assert report.loaded == 3
+    assert report.errors[0][0] == 4
+    assert report.missing == [3]
+    assert engine.n_events == report.n_events == 3
+    assert (engine.m_men, engine.w_women) == (1, 2)
+    assert engine.gender.tolist() == [GENDER_MALE, GENDER_FEMALE, GENDER_FEMALE]
+    assert engine.event_ranks(2) == [3, 1, 2, 4, 5]
+    assert engine.total.tolist() == [5 + 2 + 5, 3 + 5 + 3, 2 + 3 + 7, 2, 1]
+
+
+def test_gaps_are_compacted_and_export_has_no_placeholder_rows(tmp_path):
+    path = _write(tmp_path, "r.jsonl", "\n".join([
+        '{"event_id": 2, "gender": "女", "rule": "前三", "placings": [1, 2, 3]}',
+        '{"event_id": 5, "gender": "男", "rule": "前三", "placings": [3, 2, 1]}',
+    ]) + "\n")
+    engine = ScoringEngine()
+    report = import_results(path, engine)
+
+    assert report.missing == [1, 3, 4]
+    assert "缺少 3 个项目ID" in report.summary()
+    assert engine.n_events == 2
+
+    out = tmp_path / "out.csv"
+    export(engine, str(out), "results")
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert lines[1:] == ["1,女,前三,1,2,3,,,,,", "2,男,前三,3,2,1,,,,,"]
+
+
+def test_contiguous_ids_report_nothing_missing(tmp_path):
+    path = _write(tmp_path, "r.csv", "1,男,前三,1,2,3\n2,女,前三,3,2,1\n")
+    engine = ScoringEngine()
+    report = import_results(path, engine)
+
+    assert report.missing_count == 0
+    assert "缺少" not in report.summary()
+    assert engine.n_events == 2
+
+
+def test_known_header_is_skipped(tmp_path):
+    path = _write(tmp_path, "r.csv", "﻿Event_ID, 性别 ,rule,p1,p2,p3\n1,男,前三,1,2,3\n")
+    engine = ScoringEngine()
+    report = import_results(path, engine)
+
+    assert report.loaded == 1
+    assert report.error_count == 0
+
+
+def test_malformed_first_row_is_reported(tmp_path):
+    path = _write(tmp_path, "r.csv", "x,男,前三,1\n2,女,前三,3,2,1\n")
+    engine = ScoringEngine()
+    report = import_results(path, engine)
+
+    assert report.loaded == 1
+    assert report.errors == [(1, "项目ID无效: 'x'")]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""实时排行榜（scoring_leaderboard.Leaderboard）。"""
+import random
+
+import numpy as np
+
+from scoring_engine import ScoringEngine
+from scoring_leaderboard import Leaderboard
+
+
+def _expected(engine: ScoringEngine, key: str):
+    """参照排序：得分降序、同分按编号升序的 [(国家编号, 得分)]。"""
+    col = getattr(engine, key)
+    return sorted(((cid, int(col[cid - 1])) for cid in range(1, engine.n_countries + 1)),
+                  key=lambda item: (-item[1], item[0]))
+
+
+def _assert_board(board: Leaderboard, engine: ScoringEngine):
+    n = engine.n_countries
+    for key in Leaderboard.KEYS:
+        expected = _expected(engine, key)
+        assert board.range(key, 1, n) == expected
+        assert board.top(key, 3) == expected[:3]
+        assert board.range(key, 4, 7) == expected[3:7]
+        for pos, (cid, score) in enumerate(expected):
+            assert board.country_at(key, pos) == cid
+            assert board.position(key, cid) == pos + 1
+            higher = sum(1 for _, s in expected if s > score)
+            assert board.rank(key, cid) == higher + 1
+
+
+def _edit(engine: ScoringEngine, rng: random.Random, count: int):
+    for _ in range(count):
+        row = rng.randrange(engine.n_events)
+        engine.set_place(row, rng.randrange(int(engine.top_n[row])), rng.randint(0, engine.n_countries))
+
+
+def test_ties_share_rank():
+    engine = ScoringEngine()
+    engine.initialize(4, 1, 1)
+    engine.set_event(0, 0, [1, 2, 3])
+    engine.set_event(1, 0, [2, 1, 4])
+    board = Leaderboard(engine)
+    # 总分 8/8/2/2：并列者名次相同，位置按编号先后
+    assert board.top("total", 4) == [(1, 8), (2, 8), (3, 2), (4, 2)]
+    assert [board.rank("total", c) for c in (1, 2, 3, 4)] == [1, 1, 3, 3]
+    assert [board.position("total", c) for c in (1, 2, 3, 4)] == [1, 2, 3, 4]
+
+
+def test_follows_incremental_edits():
+    engine = ScoringEngine()
+    engine.initialize(30, 8, 8)
+    board = Leaderboard(engine)
+    rng = random.Random(9)
+    for _ in range(6):
+        _edit(engine, rng, 25)
+        _assert_board(board, engine)
+
+
+def test_bucket_splits_keep_order():
+    # 国家数为数个桶长，得分者集中挤进首桶，迫使其拆分
+    engine = ScoringEngine()
+    engine.initialize(1500, 300, 0)
+    board = Leaderboard(engine)
+    rng = random.Random(2)
+    for _ in range(1500):
+        engine.set_place(rng.randrange(300), rng.randrange(3), rng.randint(1, 1500))
+    expected = _expected(engine, "total")
+    assert board.range("total", 1, 1500) == expected
+    assert board.range("total", 600, 610) == expected[599:610]
+
+
+def test_rebuilds_on_reset_and_close_detaches():
+    engine = ScoringEngine()
+    engine.initialize(5, 2, 0)
+    board = Leaderboard(engine)
+    engine.results[0, :3] = [5, 4, 3]
+    engine.recompute()
+    assert board.top("male", 2) == [(5, 5), (4, 3)]
+    engine.initialize(7, 1, 1)
+    assert board.range("total", 1, 7) == [(c, 0) for c in range(1, 8)]
+    board.close()
+    engine.set_place(0, 0, 7)
+    assert board.score("total", 7) == 0
+    assert int(np.asarray(engine.total)[6]) == 5
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""奖牌榜与并列名次（scoring_medals）。"""
+import numpy as np
+import pytest
+
+from scoring_cache import ResultCache
+from scoring_engine import ScoringEngine
+from scoring_medals import cached_medal_table, competition_ranks, medal_counts, medal_table, parse_tiebreak
+from scoring_rules import RULE_TOP5
+
+
+def _engine() -> ScoringEngine:
+    """5 个国家、男 2 女 1；国家 5 只有一个超出前三的名次。"""
+    engine = ScoringEngine()
+    engine.initialize(5, 2, 1)
+    engine.set_event(0, 0, [1, 2, 3])
+    engine.set_event(1, RULE_TOP5, [2, 1, 4, 5, 0])
+    engine.set_event(2, 0, [3, 4, 9])       # 编号 9 超范围，不计
+    return engine
+
+
+def test_competition_ranks_ties():
+    order, rank = competition_ranks([np.array([5, 7, 7, 3, 5])])
+    assert order.tolist() == [1, 2, 0, 4, 3]
+    assert rank.tolist() == [1, 1, 3, 3, 5]
+    order, rank = competition_ranks([np.array([9, 8, 8, 1]), np.array([0, 1, 1, 0])])
+    assert rank.tolist() == [1, 2, 2, 4]
+    assert competition_ranks([np.zeros(0)])[0].tolist() == []
+
+
+def test_counts_and_scopes():
+    engine = _engine()
+    counts = medal_counts(engine)
+    # 男子：金 1、2；银 2、1；铜 3、4
+    assert counts[0].tolist() == [[1, 1, 0, 0, 0], [1, 1, 0, 0, 0], [0, 0, 1, 1, 0]]
+    assert counts[1].tolist() == [[0, 0, 1, 0, 0], [0, 0, 0, 1, 0], [0, 0, 0, 0, 0]]
+
+    table = medal_table(engine, "female")
+    assert table.points.tolist() == engine.female.tolist()
+    assert [int(i) + 1 for i in table.order[:2]] == [3, 4]
+    # 女子榜上 1、2、5 号积分与奖牌都为 0，并列第 3
+    assert [table.country_rank(c) for c in (1, 2, 5)] == [3, 3, 3]
+    with pytest.raises(ValueError):
+        medal_table(engine, "mixed")
+
+
+def test_tiebreak_keys_change_order():
+    engine = _engine()
+    by_total = medal_table(engine, "all")
+    # 总分：1 号 5+5=10，2 号 3+7=10，3 号 2+5=7，4 号 3+3=6，5 号 2
+    assert (by_total.country_rank(1), by_total.country_rank(2)) == (1, 1)
+    # 铜牌：3、4 号各 1 枚；奖牌总数：1~4 号各 2 枚
+    by_medals = medal_table(engine, "all", parse_tiebreak("bronze,medals"))
+    assert [int(i) + 1 for i in by_medals.order] == [3, 4, 1, 2, 5]
+    assert by_medals.rank.tolist() == [1, 1, 3, 3, 5]
+
+
+def test_parse_tiebreak_errors():
+    assert parse_tiebreak(" Gold , total") == ("gold", "total")
+    for text in ("", " , ", "gold,points", "gold,gold"):
+        with pytest.raises(ValueError):
+            parse_tiebreak(text)
+
+
+def test_cached_table_follows_gender_edits():
+    engine = _engine()
+    cache = ResultCache(engine)
+    male = cached_medal_table(engine, cache, "male")
+    female = cached_medal_table(engine, cache, "female")
+    engine.set_place(2, 0, 5)               # 女子项目冠军改为 5 号
+    assert cached_medal_table(engine, cache, "male") is male
+    fresh = cached_medal_table(engine, cache, "female")
+    assert fresh is not female
+    assert fresh.country_rank(5) == 1
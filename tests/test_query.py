@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""条件查询（scoring_query 与 query 子命令）。"""
+import pytest
+
+import olympic_scoring
+from scoring_engine import ScoringEngine
+from scoring_io import import_results
+from scoring_query import COUNTRIES, PLACINGS, QueryEngine, QueryError
+
+RESULTS = "1,男,前三,1,2,3\n2,女,前三,3,2,1\n3,男,前五,2,1,3,4,5\n"
+
+
+@pytest.fixture
+def results_csv(tmp_path):
+    path = tmp_path / "r.csv"
+    path.write_text(RESULTS, encoding="utf-8")
+    return str(path)
+
+
+def test_cli_where_after_other_options(results_csv, capsys):
+    code = olympic_scoring.main(["query", results_csv, "-n", "7", "--table", "countries",
+                                 "--where", "total > 10", "--order-by", "country"])
+    assert code == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split("\t")[0] for line in lines[1:]] == ["1", "2"]
+
+
+def test_cli_without_where_lists_all_placings(results_csv, capsys):
+    assert olympic_scoring.main(["query", results_csv]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 1 + 11
+
+
+@pytest.mark.parametrize("where", ["total // 0 > 1", "total % 0 == 0", "total // (male - male) > 1"])
+def test_zero_divisor_is_query_error(results_csv, where):
+    engine = ScoringEngine()
+    import_results(results_csv, engine, n_countries=7)
+    with pytest.raises(QueryError):
+        QueryEngine(engine).select(COUNTRIES, where)
+
+
+def test_cli_zero_divisor_exits_with_error(results_csv, capsys):
+    code = olympic_scoring.main(["query", results_csv, "--table", "countries", "--where", "total // female > 1"])
+    assert code == 2
+    assert "除数" in capsys.readouterr().err
+
+
+def test_compiled_conditions_follow_rule_table(results_csv):
+    from scoring_rules import RuleBook, RuleSet
+
+    eight, relay = RuleSet("前八", (10, 8, 6, 5, 4, 3, 2, 1)), RuleSet("接力", (10, 6, 4))
+    engine = ScoringEngine()
+    engine.set_rules(RuleBook([eight, relay]))
+    import_results(results_csv, engine, n_countries=7)
+    engine.set_event(0, engine.rules.find("接力"), [4, 5, 6])
+    query = QueryEngine(engine)
+    where = "rule == '接力' and place == 1"
+    assert query.compile(PLACINGS, where) is query.compile(PLACINGS, where)
+    assert query.select(PLACINGS, where).data[4].tolist() == [4]
+
+    # 规则顺序变了，接力 换了编号：条件须按新编号重新编译
+    engine.set_rules(RuleBook([relay, eight]))
+    assert query.select(PLACINGS, where).data[4].tolist() == [4]
+
+
+def test_compiled_cache_is_bounded(results_csv, monkeypatch):
+    import scoring_query
+
+    monkeypatch.setattr(scoring_query, "COMPILED_CAPACITY", 4)
+    engine = ScoringEngine()
+    import_results(results_csv, engine, n_countries=7)
+    query = QueryEngine(engine)
+    first = query.compile("placings", "place == 0")
+    for k in range(1, 10):
+        query.compile("placings", f"place == {k}")
+    assert len(query._compiled) == 4
+    assert query.compile("placings", "place == 0") is not first
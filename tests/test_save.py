@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""比赛存档与录入日志的落盘顺序（scoring_io.save_competition、scoring_journal）。"""
+import os
+import stat
+
+import scoring_io
+from scoring_engine import ScoringEngine
+from scoring_journal import Journal
+
+
+def _record_calls(monkeypatch):
+    calls = []
+    real_fsync, real_replace = os.fsync, os.replace
+
+    def fsync(fd):
+        calls.append(("fsync", stat.S_ISDIR(os.fstat(fd).st_mode)))
+        real_fsync(fd)
+
+    def replace(src, dst):
+        calls.append(("replace", os.path.basename(dst)))
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "fsync", fsync)
+    monkeypatch.setattr(os, "replace", replace)
+    return calls
+
+
+def test_save_syncs_file_before_replace_and_directory_after(tmp_path, monkeypatch):
+    engine = ScoringEngine()
+    engine.initialize(4, 1, 1)
+    calls = _record_calls(monkeypatch)
+    scoring_io.save_competition(str(tmp_path / "game.olys"), engine)
+
+    assert calls == [("fsync", False), ("replace", "game.olys"), ("fsync", True)]
+
+
+def test_journal_snapshot_is_durable_and_recoverable(tmp_path, monkeypatch):
+    engine = ScoringEngine()
+    engine.initialize(4, 1, 1)
+    calls = _record_calls(monkeypatch)
+    journal = Journal(str(tmp_path), flush_interval=0)
+    journal.attach(engine)
+    engine.set_place(0, 0, 3)
+    journal.close()
+
+    replaced = [i for i, c in enumerate(calls) if c[0] == "replace"]
+    assert replaced and all(calls[i - 1][0] == "fsync" and calls[i + 1][0] == "fsync" for i in replaced)
+
+    restored = ScoringEngine()
+    Journal(str(tmp_path)).recover(restored)
+    assert restored.event_ranks(0)[0] == 3
+
+
+def _write_journal(directory, steps, snapshot_every=2000):
+    engine = ScoringEngine()
+    engine.initialize(20, 6, 4)
+    journal = Journal(str(directory), snapshot_every=snapshot_every, flush_interval=0)
+    journal.attach(engine)
+    for step in steps:
+        step(engine)
+    journal.close(final_snapshot=False)
+    return engine
+
+
+def _corrupt(path):
+    with open(path, "wb") as f:
+        f.write(b"OLYS")
+
+
+def test_fallback_does_not_replay_across_reset(tmp_path):
+    def reinitialize(engine):
+        engine.set_place(0, 0, 17)
+        engine.initialize(10, 3, 2)
+        engine.set_place(0, 0, 4)
+        engine.set_place(1, 0, 5)
+
+    _write_journal(tmp_path, [reinitialize])
+    _corrupt(tmp_path / "snapshot-000002.olys")
+
+    restored = ScoringEngine()
+    report = Journal(str(tmp_path)).recover(restored)
+    # 回到重新初始化之前的比赛，而不是把新比赛的名次写到旧比赛上
+    assert report.generation == 1 and report.stopped_at == 2
+    assert "无法恢复" in report.summary()
+    assert (restored.n_countries, restored.n_events) == (20, 10)
+    assert restored.event_ranks(0)[0] == 17
+    assert restored.event_ranks(1)[0] == 0
+
+
+def test_fallback_replays_across_rotation(tmp_path):
+    def edits(engine):
+        for row in range(5):
+            engine.set_place(row, 0, row + 1)
+
+    engine = _write_journal(tmp_path, [edits], snapshot_every=3)
+    _corrupt(tmp_path / "snapshot-000002.olys")
+
+    restored = ScoringEngine()
+    report = Journal(str(tmp_path)).recover(restored)
+    assert report.generation == 1 and report.stopped_at == 0
+    assert restored.results.tolist() == engine.results.tolist()
+    assert restored.total.tolist() == engine.total.tolist()
+
+
+def test_attach_after_recover_continues_generation(tmp_path):
+    _write_journal(tmp_path, [lambda engine: engine.set_place(0, 0, 9)])
+    restored = ScoringEngine()
+    journal = Journal(str(tmp_path), flush_interval=0)
+    journal.recover(restored)
+    journal.attach(restored)
+    restored.set_place(1, 0, 8)
+    journal.close(final_snapshot=False)
+    _corrupt(tmp_path / "snapshot-000002.olys")
+
+    again = ScoringEngine()
+    report = Journal(str(tmp_path)).recover(again)
+    assert report.generation == 1 and report.stopped_at == 0
+    assert [again.event_ranks(r)[0] for r in (0, 1)] == [9, 8]
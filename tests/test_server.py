@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""实时成绩发布（scoring_server）。"""
+import asyncio
+import struct
+
+import pytest
+
+from scoring_engine import ScoringEngine
+from scoring_server import MAX_CLIENT_FRAME, LiveClient, LiveServer, fetch, read_frame
+
+
+@pytest.fixture
+def server():
+    engine = ScoringEngine()
+    engine.initialize(5, 2, 2)
+    srv = LiveServer(engine, port=0, interval=0.01)
+    srv.start()
+    yield srv
+    srv.stop()
+
+
+@pytest.mark.parametrize("top", ["0", "00", "-1", "x"])
+def test_standings_rejects_top_below_one(server, top):
+    status, _headers, _body = asyncio.run(fetch("127.0.0.1", server.port, f"/standings?top={top}"))
+    assert status == 400
+
+
+def test_standings_accepts_positive_top(server):
+    status, _headers, _body = asyncio.run(fetch("127.0.0.1", server.port, "/standings?top=1"))
+    assert status == 200
+
+
+def test_oversized_client_frame_closes_with_1009(server):
+    async def run():
+        client = LiveClient()
+        await client.connect("127.0.0.1", server.port)
+        assert (await client.receive())["type"] == "snapshot"
+        # 只发帧头声明超长负载，服务端不应等待或分配负载
+        head = bytes([0x81, 0x80 | 127]) + struct.pack("!Q", MAX_CLIENT_FRAME + 1) + b"\0\0\0\0"
+        client._writer.write(head)
+        await client._writer.drain()
+        opcode, payload = await asyncio.wait_for(read_frame(client._reader), 5)
+        client._writer.close()
+        return opcode, payload
+
+    opcode, payload = asyncio.run(run())
+    assert opcode == 0x8
+    assert struct.unpack("!H", payload[:2])[0] == 1009